@@ -2,7 +2,7 @@ import argparse
 import glob
 import json
 from pathlib import Path
-from typing import List, Dict, Tuple, Union, Callable
+from typing import List, Dict, Tuple, Union, Callable, Optional
 
 from yk_gmd_blender.structurelib.primitives import c_uint16
 from yk_gmd_blender.gmdlib.abstract.gmd_scene import GMDScene
@@ -10,26 +10,39 @@ from yk_gmd_blender.gmdlib.abstract.nodes.gmd_object import GMDUnskinnedObject,
 from yk_gmd_blender.gmdlib.converters.common.to_abstract import VertexImportMode, FileImportMode
 from yk_gmd_blender.gmdlib.errors.error_classes import GMDImportExportError
 from yk_gmd_blender.gmdlib.errors.error_reporter import LenientErrorReporter
-from yk_gmd_blender.gmdlib.io import read_gmd_structures, read_abstract_scene_from_filedata_object
+from yk_gmd_blender.gmdlib.io import read_gmd_structures, read_abstract_scene_from_filedata_object, \
+    probe_gmd_headers_in_dir
+from yk_gmd_blender.gmdlib.structure.common.file import FileUnpackError
 from yk_gmd_blender.gmdlib.structure.common.node import NodeType
 from yk_gmd_blender.gmdlib.structure.kenzan.file import FileData_Kenzan
 from yk_gmd_blender.gmdlib.structure.yk1.file import FileData_YK1
 from yk_gmd_blender.gmdlib.structure.yk1.mesh import MeshStruct_YK1
 
 
-def batch_process_files(args, f: Callable[[str, Union[FileData_Kenzan, FileData_YK1], GMDScene], None]):
+def batch_process_files(args, f: Callable[[str, Union[FileData_Kenzan, FileData_YK1], Optional[GMDScene]], None],
+                        needs_scene: bool = True):
     error_reporter = LenientErrorReporter(allowed_categories=set())
     for gmd_path in glob.iglob(str(args.glob_folder / "**" / "*.gmd"), recursive=True):
         skin_mode = FileImportMode.SKINNED if "-Skinned" in gmd_path else FileImportMode.UNSKINNED
         print(f"Parsing {gmd_path} as {skin_mode}")
         try:
-            version_props, header, file_data = read_gmd_structures(gmd_path, error_reporter)
-            scene = read_abstract_scene_from_filedata_object(version_props, skin_mode,
-                                                             VertexImportMode.NO_VERTICES, file_data, error_reporter)
+            if needs_scene:
+                version_props, header, file_data = read_gmd_structures(gmd_path, error_reporter)
+                scene = read_abstract_scene_from_filedata_object(version_props, skin_mode,
+                                                                 VertexImportMode.NO_VERTICES, file_data,
+                                                                 error_reporter)
+            else:
+                # Only unpack the sections f() actually looks at
+                version_props, header, file_data = read_gmd_structures(gmd_path, error_reporter, lazy=True)
+                scene = None
         except GMDImportExportError as ex:
             print(ex)
             continue
-        f(gmd_path, file_data, scene)
+        try:
+            f(gmd_path, file_data, scene)
+        except FileUnpackError as ex:
+            # Lazily unpacked sections raise errors on first access
+            print(ex)
 
 
 def print_flags(args):
@@ -38,7 +51,7 @@ def print_flags(args):
     def process_file_flags(_, file_data, __):
         file_flags.add(tuple(file_data.flags))
 
-    batch_process_files(args, process_file_flags)
+    batch_process_files(args, process_file_flags, needs_scene=False)
 
     for flags in file_flags:
         print(list(flags))
@@ -70,7 +83,7 @@ def print_attrs(args):
 
             all_attrs.add((attr.flags, shader_name))
 
-    batch_process_files(args, process_file_attrs)
+    batch_process_files(args, process_file_attrs, needs_scene=False)
 
     shader_name_pairs = [(name, unk1) for unk1, name in all_attrs]  # if "s_o1dzt" in name]
     shader_name_pairs.sort()  # key=lambda data: data[1])
@@ -120,7 +133,7 @@ def print_meshes(args):
             mesh_files[file_data.name.text] = [(mesh_to_object_name[mesh_idx], mesh) for mesh_idx, mesh in
                                                enumerate(file_data.mesh_arr)]
 
-    batch_process_files(args, process_meshes)
+    batch_process_files(args, process_meshes, needs_scene=False)
 
     # for name in sorted(mesh_files.keys()):
     #     print(f"{name}")
@@ -174,6 +187,18 @@ def check_bonecounts(args):
     print(json.dumps(file_max_bonecounts, indent=4))
 
 
+def print_header_summary(args):
+    # Only reads the header of each file, so this is fast even for whole game folders
+    error_reporter = LenientErrorReporter(allowed_categories=set())
+    probes = probe_gmd_headers_in_dir(args.glob_folder, error_reporter)
+    for path, probe in probes.items():
+        print(f"{probe.version_props.version_str:>5} {'BE' if probe.file_is_big_endian else 'LE'} "
+              f"{probe.file_size:>10d} nodes={probe.section_counts['node_arr']:<5d} "
+              f"meshes={probe.section_counts['mesh_arr']:<5d} vertex_bytes={probe.section_sizes['vertex_data']:<10d} "
+              f"{probe.name} ({path})")
+    print(f"Probed {len(probes)} files")
+
+
 # "D:\Games\SteamLibrary\steamapps\common\Yakuza Kiwami\media\data\stage"
 # "D:\Games\SteamLibrary\steamapps\common\Yakuza Kiwami 2\data\stage_lexus2\st_o_grand.par.unpack\stage\file_common\common\"
 if __name__ == '__main__':
@@ -184,4 +209,5 @@ if __name__ == '__main__':
     args = parser.parse_args()
 
     # check_vertex_layouts(args)
+    # print_header_summary(args)
     check_bonecounts(args)
@@ -0,0 +1,43 @@
+import argparse
+from pathlib import Path
+
+from yk_gmd_blender.gmdlib.batch import run_batch, BatchOperation, find_gmd_files, BatchFileResult
+from yk_gmd_blender.gmdlib.converters.common.to_abstract import VertexImportMode
+from yk_gmd_blender.gmdlib.errors.error_reporter import LenientErrorReporter
+
+
+def main():
+    parser = argparse.ArgumentParser("GMD Batch Validator",
+                                     description="Imports (and optionally re-exports) every GMD in a folder tree "
+                                                 "in parallel. Files in folders with -Skinned in the name are "
+                                                 "imported as skinned.")
+
+    parser.add_argument("model_root_dir", type=Path)
+    parser.add_argument("--export", action="store_true", help="Re-export each file after importing it")
+    parser.add_argument("--output_dir", type=Path, help="Where to write re-exported files")
+    parser.add_argument("--no_vertices", action="store_true", help="Don't import vertex data")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--timeout", type=float, default=None, help="Per-file timeout in seconds")
+    parser.add_argument("--strict", action="store_true", help="Treat recoverable errors as failures")
+
+    args = parser.parse_args()
+
+    def print_result(result: BatchFileResult):
+        status = "OK  " if result.success else ("TIME" if result.timed_out else "FAIL")
+        print(f"[{status}] {result.duration:7.2f}s {result.path}")
+
+    results = run_batch(
+        find_gmd_files(args.model_root_dir),
+        BatchOperation.IMPORT_EXPORT if args.export else BatchOperation.IMPORT,
+        vertex_import_mode=VertexImportMode.NO_VERTICES if args.no_vertices else VertexImportMode.IMPORT_VERTICES,
+        output_dir=args.output_dir,
+        workers=args.workers,
+        timeout=args.timeout,
+        strict=args.strict,
+        on_result=print_result,
+    )
+    results.report(LenientErrorReporter(allowed_categories=set()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+import argparse
+import time
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+from yk_gmd_blender.gmdlib.errors.error_reporter import LenientErrorReporter
+from yk_gmd_blender.gmdlib.io import read_gmd_structures
+from yk_gmd_blender.structurelib.base import StructureUnpacker
+
+
+def best_time(func: Callable[[], object], repeats: int) -> float:
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def benchmark_section(unpacker: StructureUnpacker, big_endian: bool, items: List, repeats: int) \
+        -> Tuple[float, float, float, float]:
+    """
+    Times packing and unpacking a list of items with the per-field path and the compiled path,
+    and checks both paths produce identical results.
+    :return: (per-field pack, compiled pack, per-field unpack, compiled unpack) times in seconds
+    """
+
+    def pack_per_field():
+        data = bytearray()
+        for item in items:
+            unpacker.pack_per_field(big_endian, item, data)
+        return data
+
+    def pack_compiled():
+        data = bytearray()
+        for item in items:
+            unpacker.pack(big_endian, item, data)
+        return data
+
+    data = pack_per_field()
+    if pack_compiled() != data:
+        raise Exception(f"Compiled pack of {unpacker.python_type.__name__} doesn't match per-field pack")
+
+    def unpack_per_field():
+        offset = 0
+        values = []
+        for _ in items:
+            value, offset = unpacker.unpack_per_field(big_endian, data, offset)
+            values.append(value)
+        return values
+
+    def unpack_compiled():
+        offset = 0
+        values = []
+        for _ in items:
+            value, offset = unpacker.unpack(big_endian, data, offset)
+            values.append(value)
+        return values
+
+    if unpack_compiled() != unpack_per_field():
+        raise Exception(f"Compiled unpack of {unpacker.python_type.__name__} doesn't match per-field unpack")
+
+    return (
+        best_time(pack_per_field, repeats),
+        best_time(pack_compiled, repeats),
+        best_time(unpack_per_field, repeats),
+        best_time(unpack_compiled, repeats),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser("GMD structurelib benchmark",
+                                     description="Compares per-field and compiled (un)packing of every structure "
+                                                 "array in the given GMD files.")
+
+    parser.add_argument("input_files", type=Path, nargs="+")
+    parser.add_argument("--repeats", type=int, default=5)
+
+    args = parser.parse_args()
+
+    error = LenientErrorReporter()
+
+    for input_file in args.input_files:
+        version_props, header, file_data = read_gmd_structures(input_file, error)
+        big_endian = file_data.file_is_big_endian()
+        print(f"{input_file} ({version_props.major_version.name}, {'big' if big_endian else 'little'} endian)")
+        print(f"\t{'section':<20} {'count':>8} {'pack':>10} {'compiled':>10} {'unpack':>10} {'compiled':>10}")
+
+        totals = [0.0, 0.0, 0.0, 0.0]
+        for name, unpacker in file_data.header_pointer_fields():
+            if not isinstance(unpacker, StructureUnpacker):
+                continue
+            items = getattr(file_data, name)
+            times = benchmark_section(unpacker, big_endian, items, args.repeats)
+            totals = [t + x for t, x in zip(totals, times)]
+            print(f"\t{name:<20} {len(items):>8} " + " ".join(f"{t * 1000:>8.2f}ms" for t in times))
+
+        print(f"\t{'total':<20} {'':>8} " + " ".join(f"{t * 1000:>8.2f}ms" for t in totals))
+        print(f"\tpack speedup {totals[0] / max(totals[1], 1e-9):.2f}x, "
+              f"unpack speedup {totals[2] / max(totals[3], 1e-9):.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+import argparse
+import array
+import time
+from typing import List, Tuple, Callable
+
+import numpy as np
+
+from yk_gmd_blender.gmdlib.abstract.gmd_shader import GMDVertexBuffer, GMDVertexBufferLayout, VecStorage, \
+    VecCompFmt
+from yk_gmd_blender.meshlib.vertex_fusion import vertex_fusion, fuse_adjacent_vertices, \
+    detect_fully_fused_triangles, decide_on_unfusions, solve_unfusion
+
+
+def make_vertex_buffer(pos: np.ndarray) -> GMDVertexBuffer:
+    layout = GMDVertexBufferLayout.make_vertex_buffer_layout(
+        assume_skinned=False,
+
+        pos_storage=VecStorage(VecCompFmt.Float32, 3),
+        weights_storage=None,
+        bones_storage=None,
+        normal_storage=None,
+        tangent_storage=None,
+        unk_storage=None,
+        col0_storage=None,
+        col1_storage=None,
+        uv_storages=[],
+
+        packing_flags=0,
+    )
+    return GMDVertexBuffer(
+        layout=layout,
+
+        pos=pos,
+
+        weight_data=None,
+        bone_data=None,
+        normal=None,
+        tangent=None,
+        unk=None,
+        col0=None,
+        col1=None,
+        uvs=[],
+    )
+
+
+def make_grid(width: int, height: int, x_offset: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    A grid of width*height quads, each split into two triangles.
+    :return: ((N, 3) vertex positions, (T, 3) triangles)
+    """
+    xs, ys = np.meshgrid(np.arange(width + 1, dtype=np.float32) + x_offset, np.arange(height + 1, dtype=np.float32))
+    pos = np.stack([xs.reshape(-1), ys.reshape(-1), np.zeros(xs.size, dtype=np.float32)], axis=1)
+
+    quad_x, quad_y = np.meshgrid(np.arange(width), np.arange(height))
+    a = (quad_y * (width + 1) + quad_x).reshape(-1)
+    b = a + 1
+    c = a + width + 1
+    d = c + 1
+    tris = np.stack([np.stack([a, b, c], axis=1), np.stack([b, d, c], axis=1)], axis=1).reshape(-1, 3)
+    return pos, tris
+
+
+def make_split_grids(n_tris: int, grid_size: int) -> Tuple[List[array.ArrayType], List[GMDVertexBuffer]]:
+    """
+    Scaled-up version of the "split center" fixture: many grids side by side, one per buffer,
+    where each grid's edge vertices are duplicated in the neighbouring grid and should be fused.
+    No fully-fused duplicate triangles are created.
+    """
+    idx_bufs = []
+    vertices = []
+    tris_per_grid = 2 * grid_size * grid_size
+    for i in range((n_tris + tris_per_grid - 1) // tris_per_grid):
+        pos, tris = make_grid(grid_size, grid_size, x_offset=i * grid_size)
+        idx_bufs.append(array.array("H", tris.astype(np.uint16).tobytes()))
+        vertices.append(make_vertex_buffer(pos))
+    return idx_bufs, vertices
+
+
+def make_two_layer_grids(n_tris: int, grid_size: int) -> Tuple[List[array.ArrayType], List[GMDVertexBuffer]]:
+    """
+    Scaled-up version of the "two layer" fixtures: split grids, where each grid has the interior
+    of the grid overlaid on itself with separate vertices.
+    This creates fully-fused duplicate triangles, which must be unfused.
+    """
+    idx_bufs = []
+    vertices = []
+    inner_size = grid_size - 2
+    tris_per_grid = 2 * (grid_size * grid_size + inner_size * inner_size)
+    for i in range((n_tris + tris_per_grid - 1) // tris_per_grid):
+        pos, tris = make_grid(grid_size, grid_size, x_offset=i * grid_size)
+        layer_pos, layer_tris = make_grid(inner_size, inner_size, x_offset=i * grid_size + 1)
+        layer_pos[:, 1] += 1
+        idx_bufs.append(array.array("H", np.concatenate([tris, layer_tris + len(pos)]).astype(np.uint16).tobytes()))
+        vertices.append(make_vertex_buffer(np.concatenate([pos, layer_pos])))
+    return idx_bufs, vertices
+
+
+def time_call(func: Callable, repeats: int):
+    best = None
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+
+def benchmark(name: str, idx_bufs: List[array.ArrayType], vertices: List[GMDVertexBuffer], repeats: int):
+    n_tris = sum(len(idx_buf) // 3 for idx_buf in idx_bufs)
+    n_verts = sum(len(buf) for buf in vertices)
+    print(f"{name}: {n_tris} triangles, {n_verts} vertices, {len(vertices)} buffers")
+
+    t_fuse, (fused_idx_to_buf_idx, buf_idx_to_fused_idx, _) = time_call(
+        lambda: fuse_adjacent_vertices(vertices), repeats)
+    print(f"\t{'fuse_adjacent_vertices':<30} {t_fuse * 1000:>10.2f}ms")
+
+    t_detect, fully_fused_tri_set = time_call(
+        lambda: detect_fully_fused_triangles(idx_bufs, fused_idx_to_buf_idx, buf_idx_to_fused_idx), repeats)
+    n_dupes = sum(1 for tris in fully_fused_tri_set.values() if len(tris) > 1)
+    print(f"\t{'detect_fully_fused_triangles':<30} {t_detect * 1000:>10.2f}ms ({n_dupes} duplicated triangles)")
+
+    if n_dupes:
+        t_decide, unfuse_verts_with = time_call(
+            lambda: decide_on_unfusions(idx_bufs, fused_idx_to_buf_idx, fully_fused_tri_set), repeats)
+        print(f"\t{'decide_on_unfusions':<30} {t_decide * 1000:>10.2f}ms ({len(unfuse_verts_with)} unfused vertices)")
+
+        t_solve, _ = time_call(
+            lambda: solve_unfusion(vertices, fused_idx_to_buf_idx, unfuse_verts_with), repeats)
+        print(f"\t{'solve_unfusion':<30} {t_solve * 1000:>10.2f}ms")
+
+    t_total, (fused_idx_to_buf_idx, _, _) = time_call(lambda: vertex_fusion(idx_bufs, vertices), repeats)
+    print(f"\t{'vertex_fusion':<30} {t_total * 1000:>10.2f}ms ({len(fused_idx_to_buf_idx)} fused vertices)")
+
+
+def main():
+    parser = argparse.ArgumentParser("Vertex fusion benchmark",
+                                     description="Times each stage of vertex fusion on scaled-up versions of the "
+                                                 "vertex fusion test fixtures.")
+
+    parser.add_argument("--triangles", type=int, default=1_000_000)
+    parser.add_argument("--grid_size", type=int, default=150, help="Quads along each side of each buffer's grid")
+    parser.add_argument("--repeats", type=int, default=3)
+
+    args = parser.parse_args()
+
+    benchmark("split grids", *make_split_grids(args.triangles, args.grid_size), repeats=args.repeats)
+    benchmark("two-layer grids", *make_two_layer_grids(args.triangles, args.grid_size), repeats=args.repeats)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,9 @@
 import argparse
 import cProfile
+import mmap
 import pstats
 from pathlib import Path
-from typing import TypeVar, Callable
+from typing import TypeVar, Callable, Union
 
 from yk_gmd_blender.gmdlib.converters.common.to_abstract import FileImportMode, VertexImportMode
 from yk_gmd_blender.gmdlib.errors.error_reporter import LenientErrorReporter
@@ -25,7 +26,7 @@ def profile(func: Callable[..., T], *args, **kwargs) -> T:
     return retval
 
 
-def import_file(path: Path, skinned: bool, error: LenientErrorReporter):
+def import_file(path: Union[Path, mmap.mmap], skinned: bool, error: LenientErrorReporter):
     version_props, header, file_data = read_gmd_structures(path, error)
     scene = read_abstract_scene_from_filedata_object(version_props,
                                                      FileImportMode.SKINNED if skinned else FileImportMode.UNSKINNED,
@@ -48,15 +49,22 @@ def main():
                         help="Choose whether to profile import, export, or both.")
     parser.add_argument("input_file", type=Path)
     parser.add_argument("--skinned", action="store_true")
+    parser.add_argument("--mmap", action="store_true", help="Memory-map the input file instead of reading it")
 
     args = parser.parse_args()
 
     error = LenientErrorReporter()
 
+    input_data = args.input_file
+    if args.mmap:
+        # Kept open until the process exits, because the imported data may reference it
+        with open(args.input_file, "rb") as in_file:
+            input_data = mmap.mmap(in_file.fileno(), 0, access=mmap.ACCESS_READ)
+
     if args.to_profile in ["import", "import_export"]:
-        version_props, header, file_data, scene = profile(import_file, args.input_file, args.skinned, error)
+        version_props, header, file_data, scene = profile(import_file, input_data, args.skinned, error)
     else:
-        version_props, header, file_data, scene = import_file(args.input_file, args.skinned, error)
+        version_props, header, file_data, scene = import_file(input_data, args.skinned, error)
 
     if args.to_profile in ["import_export", "export"]:
         profile(export_file, version_props, file_data, scene, error)
@@ -0,0 +1,93 @@
+import time
+from pathlib import Path
+
+import pytest
+
+from yk_gmd_blender.gmdlib import batch
+from yk_gmd_blender.gmdlib.batch import run_batch, BatchOperation, BatchResults, BatchFileResult
+from yk_gmd_blender.gmdlib.errors.error_classes import GMDImportExportError
+from yk_gmd_blender.gmdlib.errors.error_reporter import RecordingErrorReporter
+
+
+def touch_gmd(tmp_path: Path, name: str) -> Path:
+    path = tmp_path / name
+    path.write_bytes(b"")
+    return path
+
+
+@pytest.mark.order(2)
+def test_batch_success(tmp_path, monkeypatch):
+    def read_gmd_structures(path, error):
+        error.debug("GMD", f"read {path.name}")
+        error.info("read structures")
+        return None, None, None
+
+    monkeypatch.setattr(batch, "read_gmd_structures", read_gmd_structures)
+    monkeypatch.setattr(batch, "read_abstract_scene_from_filedata_object", lambda *args: None)
+
+    path = touch_gmd(tmp_path, "a.gmd")
+    seen = []
+    results = run_batch([path], BatchOperation.IMPORT, workers=1, debug_categories={"GMD"}, on_result=seen.append)
+
+    assert len(results.results) == 1
+    result = results.results[0]
+    assert seen == [result]
+    assert result.success
+    assert not result.timed_out
+    assert result.path == path
+    assert result.info_msgs == ["read structures"]
+    assert result.debug_msgs == [("GMD", "read a.gmd")]
+    assert results.succeeded == [result]
+    assert results.failed == []
+
+
+@pytest.mark.order(2)
+def test_batch_import_error(tmp_path):
+    # Missing files are reported through ErrorReporter.fatal()
+    path = tmp_path / "missing.gmd"
+    results = run_batch([path], BatchOperation.IMPORT, workers=1, sort_by_size=False)
+
+    result = results.results[0]
+    assert not result.success
+    assert not result.timed_out
+    assert "missing.gmd" in result.error
+    assert results.failed == [result]
+
+
+@pytest.mark.order(2)
+def test_batch_timeout(tmp_path, monkeypatch):
+    def read_gmd_structures(path, error):
+        # Like FilePacker, which wraps any Exception raised while unpacking
+        try:
+            time.sleep(5)
+        except Exception as e:
+            raise GMDImportExportError(f"Exception while unpacking: {e}")
+
+    monkeypatch.setattr(batch, "read_gmd_structures", read_gmd_structures)
+
+    path = touch_gmd(tmp_path, "slow.gmd")
+    results = run_batch([path], BatchOperation.IMPORT, workers=1, timeout=0.05)
+
+    result = results.results[0]
+    assert not result.success
+    assert result.timed_out
+    assert result.duration < 5
+
+
+@pytest.mark.order(2)
+def test_batch_report_forwards_debug_categories():
+    results = BatchResults(
+        results=[
+            BatchFileResult(path=Path("a.gmd"), error=None, timed_out=False, duration=0.1,
+                            debug_msgs=[("MESH", "mesh msg"), ("GMD", "gmd msg")]),
+            BatchFileResult(path=Path("b.gmd"), error="bad file", timed_out=False, duration=0.1),
+        ],
+        duration=0.2
+    )
+
+    error = RecordingErrorReporter(strict=False, allowed_categories={"MESH"})
+    results.report(error)
+
+    assert error.debug_msgs == [("MESH", "a.gmd: mesh msg")]
+    assert error.recoverable_msgs == ["b.gmd failed: bad file"]
+    assert error.info_msgs == ["Processed 2 files in 0.20s: 1 succeeded, 1 failed"]
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from yk_gmd_blender.meshlib.bone_palettes import triangle_bone_masks, count_mask_bits, partition_by_bone_limit, \
+    mask_to_bones
+
+
+def partition_with_sets(tri_vertices, vertex_bones, n_weights, max_bones):
+    # The original set-based greedy partitioning
+    partitions = []
+    pending_start = 0
+    pending_vgs = set()
+    for i, t in enumerate(tri_vertices):
+        triangle_vgs = set()
+        for v in t:
+            triangle_vgs.update(vertex_bones[v, :n_weights[v]].tolist())
+        combined_vgs = triangle_vgs.union(pending_vgs)
+        if len(combined_vgs) > max_bones:
+            partitions.append((pending_start, i, sorted(pending_vgs)))
+            pending_start = i
+            pending_vgs = triangle_vgs
+        else:
+            pending_vgs = combined_vgs
+    if pending_start < len(tri_vertices):
+        partitions.append((pending_start, len(tri_vertices), sorted(pending_vgs)))
+    return partitions
+
+
+@pytest.mark.order(3)
+def test_triangle_bone_masks():
+    vertex_bones = np.array([[5, 200, 0, 0], [5, 7, 9, 11], [70, 0, 0, 0]], dtype=np.uint16)
+    n_weights = np.array([2, 1, 1], dtype=np.uint8)
+    masks, bones = triangle_bone_masks(np.array([[0, 1, 2], [1, 1, 2]]), vertex_bones, n_weights)
+    assert bones.tolist() == [5, 70, 200]
+    assert count_mask_bits(masks).tolist() == [3, 2]
+    assert mask_to_bones(masks[0], bones).tolist() == [5, 70, 200]
+    assert mask_to_bones(masks[1], bones).tolist() == [5, 70]
+
+
+@pytest.mark.order(3)
+@pytest.mark.parametrize("n_bones", [20, 300])
+def test_partition_by_bone_limit_matches_sets(n_bones):
+    rng = np.random.default_rng(n_bones)
+    n_verts = 2000
+    vertex_bones = rng.integers(0, n_bones, size=(n_verts, 4)).astype(np.uint16)
+    n_weights = rng.integers(1, 5, size=n_verts).astype(np.uint8)
+    tri_vertices = rng.integers(0, n_verts, size=(3000, 3))
+    max_bones = 32
+
+    masks, bones = triangle_bone_masks(tri_vertices, vertex_bones, n_weights)
+    partitions = [
+        (start, end, mask_to_bones(mask, bones).tolist())
+        for start, end, mask in partition_by_bone_limit(masks, max_bones)
+    ]
+    assert partitions == partition_with_sets(tri_vertices, vertex_bones, n_weights, max_bones)
+
+
+@pytest.mark.order(3)
+def test_partition_by_bone_limit_empty():
+    masks, bones = triangle_bone_masks(np.zeros((0, 3), dtype=np.int64), np.zeros((0, 4)), np.zeros(0))
+    assert len(bones) == 0
+    assert partition_by_bone_limit(masks, 32) == []
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from yk_gmd_blender.meshlib.bone_weights import build_bone_remap_lut, remap_weighted_bones, select_top4_weights, \
+    MIN_WEIGHT
+
+
+@pytest.mark.order(3)
+def test_build_bone_remap_lut():
+    assert build_bone_remap_lut({5: 0, 2: 1, 9: 2}).tolist() == [-1, -1, 1, -1, -1, 0, -1, -1, -1, 2]
+    assert len(build_bone_remap_lut({})) == 0
+
+
+@pytest.mark.order(3)
+def test_remap_weighted_bones_matches_dict():
+    rng = np.random.default_rng(0)
+    bone_remapper = {int(b): i for i, b in enumerate(rng.permutation(300)[:32])}
+    bones = rng.choice(list(bone_remapper.keys()), size=(1000, 4)).astype(np.uint16)
+    weights = rng.random((1000, 4)).astype(np.float32)
+    weights[rng.random((1000, 4)) < 0.3] = 0
+    # Unweighted bones don't have to be in the mapping
+    bones[weights == 0] = 299
+
+    expected = np.zeros((1000, 4), dtype=np.int64)
+    for i in range(1000):
+        for j in range(4):
+            if weights[i, j] > 0:
+                expected[i, j] = bone_remapper[bones[i, j]]
+
+    remapped = remap_weighted_bones(bones, weights, build_bone_remap_lut(bone_remapper))
+    assert np.array_equal(remapped, expected)
+
+
+@pytest.mark.order(3)
+def test_remap_weighted_bones_missing_bone():
+    lut = build_bone_remap_lut({0: 0, 1: 1})
+    weights = np.array([[1, 0, 0, 0]], dtype=np.float32)
+    with pytest.raises(KeyError):
+        remap_weighted_bones(np.array([[2, 0, 0, 0]]), weights, lut)
+    with pytest.raises(KeyError):
+        remap_weighted_bones(np.array([[500, 0, 0, 0]]), weights, lut)
+
+
+def reference_top4_weights(vertex_groups, relevant_groups):
+    # Per-vertex implementation, sorting each vertex's groups with Python's stable sort
+    n = len(vertex_groups)
+    bones = np.zeros((n, 4), np.uint16)
+    weights = np.zeros((n, 4), np.float32)
+    n_weights = np.zeros(n, np.uint8)
+    for v, groups in enumerate(vertex_groups):
+        gs = sorted([(g, w) for g, w in groups if g in relevant_groups and w >= MIN_WEIGHT],
+                    key=lambda gw: gw[1], reverse=True)
+        for i, (g, w) in enumerate(gs[:4]):
+            weights[v, i] = min(1.0, w)
+            bones[v, i] = g
+            n_weights[v] = i + 1
+    return bones, weights, n_weights
+
+
+@pytest.mark.order(3)
+def test_select_top4_weights_matches_reference():
+    rng = np.random.default_rng(0)
+    relevant_groups = set(range(0, 40, 2))
+    vertex_groups = []
+    for _ in range(500):
+        n_groups = rng.integers(0, 8)
+        groups = rng.choice(40, size=n_groups, replace=False).tolist()
+        # Quantized weights, so there are plenty of ties and weights below MIN_WEIGHT
+        weights = (rng.integers(0, 20, size=n_groups) / 20).astype(np.float32).tolist()
+        vertex_groups.append(list(zip(groups, weights)))
+
+    vertex_idx = [v for v, groups in enumerate(vertex_groups) for _ in groups]
+    groups = [g for gs in vertex_groups for g, _ in gs]
+    weights = [w for gs in vertex_groups for _, w in gs]
+    top = select_top4_weights(len(vertex_groups), np.array(vertex_idx), np.array(groups), np.array(weights),
+                              np.array(sorted(relevant_groups)))
+
+    bones, expected_weights, n_weights = reference_top4_weights(vertex_groups, relevant_groups)
+    assert np.array_equal(top.bones, bones)
+    assert np.array_equal(top.weights, expected_weights)
+    assert np.array_equal(top.n_weights, n_weights)
+    assert not top.any_over_one
+    assert not top.any_negative
+
+
+@pytest.mark.order(3)
+def test_select_top4_weights_checks():
+    # Vertex 0 has 5 major influences, vertex 1 has a weight > 1, vertex 2 has a negative weight on an irrelevant group
+    vertex_idx = np.array([0, 0, 0, 0, 0, 1, 2])
+    groups = np.array([0, 1, 2, 3, 4, 0, 9])
+    weights = np.array([0.2, 0.2, 0.2, 0.2, 0.2, 1.5, -0.5])
+    top = select_top4_weights(3, vertex_idx, groups, weights, np.arange(5))
+    assert top.n_verts_with_extra_major_influences == 1
+    assert top.any_over_one
+    assert top.any_negative
+    # Weights > 1 are clamped
+    assert top.weights[1].tolist() == [1, 0, 0, 0]
+    assert top.n_weights.tolist() == [4, 1, 0]
@@ -0,0 +1,153 @@
+from dataclasses import dataclass
+from typing import List, Tuple, Union, Type
+
+import numpy as np
+import pytest
+
+from yk_gmd_blender.gmdlib.structure.common.array_pointer import ArrayPointerStruct, ArrayPointerStruct_Unpack
+from yk_gmd_blender.gmdlib.structure.common.checksum_str import ChecksumStrStruct, ChecksumStrStruct_Unpack
+from yk_gmd_blender.gmdlib.structure.common.file import FileData_Common, FilePacker, FileUnpackError
+from yk_gmd_blender.gmdlib.structure.common.header import GMDHeaderStruct, GMDHeaderStruct_Unpack
+from yk_gmd_blender.gmdlib.structure.common.sized_pointer import SizedPointerStruct, SizedPointerStruct_Unpack
+from yk_gmd_blender.structurelib.base import BaseUnpacker, StructureUnpacker, PackingValidationError
+from yk_gmd_blender.structurelib.primitives import c_uint16
+
+
+# This module tests FilePacker on a minimal file layout, which doesn't need mathutils.
+
+@dataclass(frozen=True)
+class _TestHeader(GMDHeaderStruct):
+    name_arr: ArrayPointerStruct[ChecksumStrStruct]
+    index_data: ArrayPointerStruct[int]
+    byte_data: SizedPointerStruct
+
+
+_TestHeader_Unpack = StructureUnpacker(
+    _TestHeader,
+    fields=[
+        ("name_arr", ArrayPointerStruct_Unpack),
+        ("index_data", ArrayPointerStruct_Unpack),
+        ("byte_data", SizedPointerStruct_Unpack),
+    ],
+    base_class_unpackers={
+        GMDHeaderStruct: GMDHeaderStruct_Unpack
+    }
+)
+
+
+@dataclass(repr=False)
+class _TestFileData(FileData_Common):
+    name_arr: List[ChecksumStrStruct]
+    index_data: List[int]
+    byte_data: bytes
+
+    @classmethod
+    def header_pointer_fields(cls) -> List[Tuple[str, Union[BaseUnpacker, Type[bytes]]]]:
+        return FileData_Common.header_pointer_fields() + [
+            ("name_arr", ChecksumStrStruct_Unpack),
+            ("index_data", c_uint16),
+            ("byte_data", bytes),
+        ]
+
+
+_TestFilePacker = FilePacker(_TestFileData, _TestHeader_Unpack)
+
+
+def _example_file_data(big_endian: bool) -> _TestFileData:
+    return _TestFileData(
+        magic="GSGM",
+        file_endian_check=1 if big_endian else 0,
+        vertex_endian_check=1 if big_endian else 0,
+        version_combined=0x00030004,
+        name=ChecksumStrStruct.make_from_str("test_file"),
+
+        name_arr=[ChecksumStrStruct.make_from_str("a"), ChecksumStrStruct.make_from_str("bone_1")],
+        index_data=[0, 1, 2, 0xFFFF, 3],
+        byte_data=bytes(range(13)),
+    )
+
+
+@pytest.mark.order(2)
+@pytest.mark.parametrize("big_endian", [False, True])
+def test_file_packer_roundtrip(big_endian):
+    file_data = _example_file_data(big_endian)
+    data = bytearray()
+    _TestFilePacker.pack(big_endian, file_data, data)
+
+    unpacked, _ = _TestFilePacker.unpack(big_endian, bytes(data), 0)
+    assert unpacked == file_data
+
+
+@pytest.mark.order(2)
+@pytest.mark.parametrize("big_endian", [False, True])
+def test_file_packer_lazy_matches_eager(big_endian):
+    file_data = _example_file_data(big_endian)
+    data = bytearray()
+    _TestFilePacker.pack(big_endian, file_data, data)
+
+    lazy, _ = _TestFilePacker.unpack_lazy(big_endian, bytes(data), 0)
+    # Header copies are available immediately, sections only on access
+    assert lazy.name == file_data.name
+    assert set(lazy._lazy_sections.keys()) == {"name_arr", "index_data", "byte_data"}
+
+    assert lazy.index_data == file_data.index_data
+    assert "index_data" not in lazy._lazy_sections
+    # Cached after the first access
+    assert lazy.index_data is lazy.index_data
+
+    assert lazy == file_data
+    assert not lazy._lazy_sections
+
+    with pytest.raises(AttributeError):
+        _ = lazy.not_a_field
+
+
+@pytest.mark.order(2)
+def test_file_packer_lazy_defers_errors():
+    file_data = _example_file_data(False)
+    data = bytearray()
+    _TestFilePacker.pack(False, file_data, data)
+    # Cut off the end of the file, which contains the index data
+    data = bytes(data[:-len(file_data.byte_data) - 4])
+
+    lazy, _ = _TestFilePacker.unpack_lazy(False, data, 0)
+    assert lazy.name_arr == file_data.name_arr
+    with pytest.raises(FileUnpackError):
+        _ = lazy.index_data
+
+
+@pytest.mark.order(2)
+@pytest.mark.parametrize("big_endian", [False, True])
+def test_file_packer_numpy_array_matches_list(big_endian):
+    file_data = _example_file_data(big_endian)
+    expected = bytearray()
+    _TestFilePacker.pack(big_endian, file_data, expected)
+
+    file_data.index_data = np.array(file_data.index_data, dtype=np.uint16)
+    data = bytearray()
+    _TestFilePacker.pack(big_endian, file_data, data)
+    assert data == expected
+
+
+@pytest.mark.order(2)
+def test_file_packer_numpy_array_rejects_lossy_dtype():
+    file_data = _example_file_data(False)
+    file_data.index_data = np.array([0, 1, 0x10000], dtype=np.uint32)
+    with pytest.raises(PackingValidationError):
+        _TestFilePacker.pack(False, file_data, bytearray())
+
+
+@pytest.mark.order(2)
+def test_file_packer_chunks_match_pack():
+    file_data = _example_file_data(False)
+    file_data.byte_data = bytearray(file_data.byte_data)
+    data = bytearray()
+    _TestFilePacker.pack(False, file_data, data)
+
+    chunks = _TestFilePacker.pack_chunks(False, file_data)
+    # One chunk for the header, then one per section
+    assert len(chunks) == 4
+    assert b"".join(chunks) == data
+    # Byte sections aren't copied
+    file_data.byte_data[0] = 0xFF
+    assert chunks[-1][0] == 0xFF
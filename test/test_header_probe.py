@@ -0,0 +1,97 @@
+import dataclasses
+
+import pytest
+
+from yk_gmd_blender.gmdlib.errors.error_classes import GMDImportExportError
+from yk_gmd_blender.gmdlib.errors.error_reporter import StrictErrorReporter, RecordingErrorReporter
+from yk_gmd_blender.gmdlib.io import probe_gmd_header, probe_gmd_headers_in_dir, GMDHeaderProbe, _MAX_HEADER_SIZE
+from yk_gmd_blender.gmdlib.structure.common.checksum_str import ChecksumStrStruct
+from yk_gmd_blender.gmdlib.structure.common.header import GMDHeaderStruct_Unpack
+from yk_gmd_blender.gmdlib.structure.common.sized_pointer import SizedPointerStruct
+from yk_gmd_blender.gmdlib.structure.version import combine_versions, GMDVersion
+from yk_gmd_blender.gmdlib.structure.yk1.header import GMDHeader_YK1_Unpack
+from yk_gmd_blender.gmdlib.structure.yk1.mesh import MeshStruct_YK1_Unpack
+
+
+def make_yk1_header() -> bytes:
+    # Start from an all-zero header, then fill in the fields the probe looks at
+    zero_header, _ = GMDHeader_YK1_Unpack.unpack(True, data=bytes(GMDHeader_YK1_Unpack.sizeof()), offset=0)
+    header = dataclasses.replace(
+        zero_header,
+        magic="GSGM",
+        vertex_endian_check=1,
+        file_endian_check=1,
+        version_combined=combine_versions(3, 0),
+        file_size=0x1234,
+        name=ChecksumStrStruct.make_from_str("test_mesh"),
+        mesh_arr=dataclasses.replace(zero_header.mesh_arr, sized_ptr=SizedPointerStruct(ptr=0x400, size=2)),
+        vertex_data=SizedPointerStruct(ptr=0x800, size=100),
+    )
+    data = bytearray()
+    GMDHeader_YK1_Unpack.pack(True, header, data)
+    return bytes(data)
+
+
+@pytest.mark.order(2)
+def test_probe_gmd_header():
+    probe = probe_gmd_header(make_yk1_header(), StrictErrorReporter(set()))
+
+    assert isinstance(probe, GMDHeaderProbe)
+    assert probe.version_props.major_version == GMDVersion.Kiwami1
+    assert probe.file_is_big_endian
+    assert probe.vertices_are_big_endian
+    assert probe.name == "test_mesh"
+    assert probe.file_size == 0x1234
+    assert probe.section_counts["mesh_arr"] == 2
+    assert probe.section_sizes["mesh_arr"] == 2 * MeshStruct_YK1_Unpack.sizeof()
+    assert probe.section_counts["vertex_data"] == 100
+    assert probe.section_sizes["vertex_data"] == 100
+    assert probe.section_counts["node_arr"] == 0
+
+
+@pytest.mark.order(2)
+def test_probe_gmd_header_only_reads_header(tmp_path):
+    assert _MAX_HEADER_SIZE >= GMDHeader_YK1_Unpack.sizeof()
+
+    # Data after the header isn't read, so it doesn't matter that it isn't valid
+    path = tmp_path / "a.gmd"
+    path.write_bytes(make_yk1_header() + b"\xff" * 4096)
+    probe = probe_gmd_header(path, StrictErrorReporter(set()))
+    assert probe.name == "test_mesh"
+
+
+@pytest.mark.order(2)
+def test_probe_truncated_gmd_header():
+    header = make_yk1_header()
+    # Enough for the base header, but not the YK1 header
+    with pytest.raises(GMDImportExportError, match="too small to contain a v3"):
+        probe_gmd_header(header[:GMDHeaderStruct_Unpack.sizeof() + 4], StrictErrorReporter(set()))
+    with pytest.raises(GMDImportExportError, match="too small to contain a GMD header"):
+        probe_gmd_header(header[:8], StrictErrorReporter(set()))
+
+
+@pytest.mark.order(2)
+def test_probe_non_gmd_file():
+    with pytest.raises(GMDImportExportError):
+        probe_gmd_header(b"This is not a GMD file, but it is long enough to look like a header" * 20,
+                         StrictErrorReporter(set()))
+
+
+@pytest.mark.order(2)
+def test_probe_gmd_headers_in_dir(tmp_path):
+    good = tmp_path / "good.gmd"
+    good.write_bytes(make_yk1_header())
+    (tmp_path / "sub").mkdir()
+    bad = tmp_path / "sub" / "bad.gmd"
+    bad.write_bytes(b"not a gmd")
+    # Can't be opened as a file, which raises an OSError
+    unreadable = tmp_path / "unreadable.gmd"
+    unreadable.mkdir()
+
+    error = RecordingErrorReporter(strict=False)
+    probes = probe_gmd_headers_in_dir(tmp_path, error)
+
+    assert list(probes.keys()) == [good]
+    assert len(error.recoverable_msgs) == 2
+    assert any(str(bad) in msg for msg in error.recoverable_msgs)
+    assert any(str(unreadable) in msg for msg in error.recoverable_msgs)
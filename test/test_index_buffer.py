@@ -0,0 +1,35 @@
+import array
+
+import numpy as np
+import pytest
+
+from yk_gmd_blender.gmdlib.converters.common.from_abstract import IndexBufferBuilder
+from yk_gmd_blender.gmdlib.errors.error_classes import GMDImportExportError
+from yk_gmd_blender.gmdlib.errors.error_reporter import StrictErrorReporter
+from yk_gmd_blender.gmdlib.structure.common.mesh import IndicesStruct
+
+
+@pytest.mark.order(2)
+def test_index_buffer_offsets_and_reset():
+    index_buffer = IndexBufferBuilder()
+    tris = index_buffer.add(array.array("H", [0, 1, 2]), 10)
+    strip = index_buffer.add(array.array("H", [0, 1, 2, 0xFFFF, 2, 1, 3]), 10)
+    relative = index_buffer.add(array.array("H", [0, 1, 2]))
+    empty = index_buffer.add(array.array("H"), 5)
+
+    assert tris == IndicesStruct(index_offset=0, index_count=3)
+    assert strip == IndicesStruct(index_offset=3, index_count=7)
+    assert relative == IndicesStruct(index_offset=10, index_count=3)
+    assert empty == IndicesStruct(index_offset=13, index_count=0)
+
+    data = index_buffer.build(StrictErrorReporter(set()))
+    assert data.dtype == np.uint16
+    assert data.tolist() == [10, 11, 12, 10, 11, 12, 0xFFFF, 12, 11, 13, 0, 1, 2]
+
+
+@pytest.mark.order(2)
+def test_index_buffer_out_of_range():
+    index_buffer = IndexBufferBuilder()
+    index_buffer.add(array.array("H", [0, 0xFFFF, 0xFFFE]), 2)
+    with pytest.raises(GMDImportExportError):
+        index_buffer.build(StrictErrorReporter(set()))
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from yk_gmd_blender.meshlib.mesh_arrays import build_merged_mesh_topology, gather_vertex_data, gather_loop_data, \
+    gmd_to_blender_xyz, deform_weight_triples, normalize_rows
+
+
+@pytest.mark.order(3)
+def test_topology_skips_invalid_triangles():
+    idx_bufs = [
+        [0, 1, 2, 0xFFFF, 1, 2, 1, 2, 3, 2, 1, 0],
+        [0, 1, 2, 0, 0, 1],
+    ]
+    # Buffer 1 is appended after buffer 0, without fusion
+    topology = build_merged_mesh_topology(idx_bufs, [np.arange(4), np.arange(4, 7)])
+    assert topology.n_reset_index_tris == 1
+    # The second triangle of buffer 0 contains the reset index, the fourth is a duplicate of the first,
+    # and the second triangle of buffer 1 is degenerate
+    assert topology.face_verts.tolist() == [[0, 1, 2], [1, 2, 3], [4, 5, 6]]
+    assert topology.face_buf.tolist() == [0, 0, 1]
+    assert topology.loop_src_idx.tolist() == [0, 1, 2, 1, 2, 3, 0, 1, 2]
+    assert topology.loop_buf_ranges() == [(0, 6), (6, 9)]
+    assert topology.n_vertices == 7
+
+
+@pytest.mark.order(3)
+def test_topology_fused_vertices():
+    # Vertex 0 of buffer 1 was fused into vertex 2 of buffer 0
+    buf_idx_to_merged_idx = [[0, 1, 2], [2, 3, 4]]
+    is_fused = [[False, False, False], [True, False, False]]
+    topology = build_merged_mesh_topology([[0, 1, 2], [0, 1, 2]], buf_idx_to_merged_idx, is_fused)
+    assert topology.face_verts.tolist() == [[0, 1, 2], [2, 3, 4]]
+    assert topology.vertex_src_buf.tolist() == [0, 0, 0, 1, 1]
+    assert topology.vertex_src_idx.tolist() == [0, 1, 2, 1, 2]
+
+    pos = [np.array([[0, 0, 0], [1, 0, 0], [2, 0, 0]]), np.array([[9, 9, 9], [3, 0, 0], [4, 0, 0]])]
+    assert gather_vertex_data(topology, pos, 3)[:, 0].tolist() == [0, 1, 2, 3, 4]
+
+    # Per-loop data is kept for the fused vertex, and missing data is filled with the default
+    col = [np.array([[0.5, 0.5], [0.5, 0.5], [0.5, 0.5]]), None]
+    loops = gather_loop_data(topology, col, 4, default=1.0)
+    assert loops.shape == (6, 4)
+    assert loops.tolist() == [[0.5, 0.5, 1.0, 1.0]] * 3 + [[1.0] * 4] * 3
+
+
+@pytest.mark.order(3)
+def test_gmd_to_blender_xyz():
+    assert gmd_to_blender_xyz(np.array([[1, 2, 3, 4]])).tolist() == [[-1, 3, 2]]
+
+
+@pytest.mark.order(3)
+def test_normalize_rows():
+    normals = normalize_rows(np.array([[3, 0, 4], [0, 0, 0], [0, -2, 0]], dtype=np.float32))
+    assert normals.dtype == np.float32
+    assert normals.tolist() == [[0.6000000238418579, 0, 0.800000011920929], [0, 0, 0], [0, -1, 0]]
+
+
+@pytest.mark.order(3)
+def test_deform_weight_triples_stops_at_first_zero():
+    bones = np.array([[0, 1, 2, 3], [2, 0, 1, 0]])
+    weights = np.array([[0.5, 0.25, 0, 0.25], [1.0, 0, 0, 0]])
+    vertex, group, weight = deform_weight_triples(bones, weights, np.array([10, 11, 12, 13]))
+    assert vertex.tolist() == [0, 0, 1]
+    assert group.tolist() == [10, 11, 12]
+    assert weight.tolist() == [0.5, 0.25, 1.0]
@@ -1,9 +1,11 @@
 from typing import List, Tuple, Iterable, Dict
 
+import numpy as np
 import pytest
 
 from yk_gmd_blender.meshlib.export_submeshing import MeshLoopIdx, dedupe_loops, convert_meshloop_tris_to_tsubmeshes, \
-    DedupedVertIdx, MeshLoopTri, SubmeshTri
+    dedupe_packed_loops, SubmeshingStats, count_vertex_cache_misses, \
+    DedupedVertIdx, MeshLoopTri, SubmeshTri, partition_triangles_by_material
 
 
 @pytest.mark.order(3)
@@ -124,6 +126,32 @@ def gen_fake_deduped_verts(n_verts: int, n_dupes_per_vert: int) -> Tuple[
     return deduped_verts, deduped_map
 
 
+@pytest.mark.order(3)
+def test_dedupe_packed_matches_byte_dict():
+    rng = np.random.default_rng(0)
+    bytes_per_vertex = 6
+    # Few distinct vertices, so there are lots of duplicates
+    distinct = rng.integers(0, 256, size=(20, bytes_per_vertex), dtype=np.uint8)
+    packed = distinct[rng.integers(0, len(distinct), size=500)].tobytes()
+    loops_with_dupes = [MeshLoopIdx(int(i)) for i in rng.permutation(1000)[:500]]
+
+    # Reference: keep the first loop with each unique byte string
+    expected_verts = []
+    bytes_to_deduped_idx = {}
+    expected_dict = {}
+    for i, loop in enumerate(loops_with_dupes):
+        vertex = packed[i * bytes_per_vertex:(i + 1) * bytes_per_vertex]
+        if vertex not in bytes_to_deduped_idx:
+            bytes_to_deduped_idx[vertex] = len(expected_verts)
+            expected_verts.append(loop)
+        expected_dict[loop] = bytes_to_deduped_idx[vertex]
+
+    assert dedupe_packed_loops(loops_with_dupes, packed, bytes_per_vertex) == (expected_verts, expected_dict)
+    vertex_bytes = [packed[i:i + bytes_per_vertex] for i in range(0, len(packed), bytes_per_vertex)]
+    assert dedupe_loops(loops_with_dupes, vertex_bytes) == (expected_verts, expected_dict)
+    assert dedupe_packed_loops([], b"", bytes_per_vertex) == ([], {})
+
+
 @pytest.mark.order(3)
 def test_submeshing_no_split():
     # The identity case: not enough vertices to hit the limit
@@ -294,3 +322,85 @@ def test_submeshing_split_shared_with_dupes():
     assert tri_2_tris == [
         (0, 1, 2),
     ]
+
+
+@pytest.mark.order(3)
+def test_submeshing_locality_reduces_duplicates():
+    # A 60x60 grid of quads with the triangles shuffled, so filling submeshes in order shares few vertices
+    size = 60
+    deduped_verts, loop_idx_to_deduped_verts_idx = gen_fake_deduped_verts(n_verts=(size + 1) ** 2, n_dupes_per_vert=1)
+    loop_positions = np.array([(x, y, 0) for y in range(size + 1) for x in range(size + 1)], dtype=np.float32)
+    grid_tris = []
+    for y in range(size):
+        for x in range(size):
+            a = y * (size + 1) + x
+            grid_tris += [(a, a + 1, a + size + 1), (a + 1, a + size + 2, a + size + 1)]
+    rng = np.random.default_rng(0)
+    triangles = gen_triangles(grid_tris[i] for i in rng.permutation(len(grid_tris)))
+
+    def split(positions):
+        stats = SubmeshingStats(unique_verts=len(deduped_verts))
+        submeshes = convert_meshloop_tris_to_tsubmeshes(
+            deduped_verts,
+            loop_idx_to_deduped_verts_idx,
+            triangles,
+            dummy_submesh,
+            max_verts_per_submesh=500,
+            loop_positions=positions,
+            stats=stats,
+        )
+        # Every triangle is exported exactly once, with the same vertices
+        exported_tris = sorted(
+            tuple(loops[i] for i in t)
+            for loops, tris in submeshes
+            for t in tris
+        )
+        assert exported_tris == sorted(triangles)
+        assert all(len(loops) <= 500 for loops, _ in submeshes)
+        assert stats.triangles == len(triangles)
+        # Unique vertices are counted by the caller
+        assert stats.unique_verts == len(deduped_verts)
+        assert stats.exported_verts == sum(len(loops) for loops, _ in submeshes)
+        return stats
+
+    in_order = split(None)
+    by_locality = split(loop_positions)
+    assert by_locality.duplicated_verts < in_order.duplicated_verts / 2
+    assert by_locality.acmr < in_order.acmr
+
+
+@pytest.mark.order(3)
+def test_count_vertex_cache_misses():
+    # Each vertex misses once while it fits in the cache
+    assert count_vertex_cache_misses([(0, 1, 2), (2, 1, 3), (2, 3, 4)], cache_size=8) == 5
+    # With a 3-vertex FIFO, vertex 0 is evicted by vertex 3, and reloading it evicts 1 and then 2
+    assert count_vertex_cache_misses([(0, 1, 2), (1, 2, 3), (0, 1, 2)], cache_size=3) == 7
+
+
+@pytest.mark.order(3)
+def test_partition_triangles_by_material():
+    tri_loops = np.arange(18).reshape(6, 3)
+    material_indices = np.array([1, 0, 1, 3, 0, 1])
+    # Material 2 has no triangles, and material 3 is out of range
+    partitions = partition_triangles_by_material(tri_loops, material_indices, n_materials=3)
+    assert len(partitions) == 3
+    assert partitions[0].tolist() == [[3, 4, 5], [12, 13, 14]]
+    assert partitions[1].tolist() == [[0, 1, 2], [6, 7, 8], [15, 16, 17]]
+    assert partitions[2].shape == (0, 3)
+
+
+@pytest.mark.order(3)
+def test_submeshing_array_triangles_match_list():
+    deduped_verts, loop_idx_to_deduped_verts_idx = gen_fake_deduped_verts(n_verts=99, n_dupes_per_vert=2)
+    triangles = gen_triangles(
+        (i + 0, i + 1, i + 2)
+        for i in range(97)
+    )
+
+    expected = convert_meshloop_tris_to_tsubmeshes(
+        deduped_verts, loop_idx_to_deduped_verts_idx, triangles, dummy_submesh, max_verts_per_submesh=30,
+    )
+    submeshes = convert_meshloop_tris_to_tsubmeshes(
+        deduped_verts, loop_idx_to_deduped_verts_idx, np.array(triangles), dummy_submesh, max_verts_per_submesh=30,
+    )
+    assert submeshes == expected
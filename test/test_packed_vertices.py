@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from yk_gmd_blender.gmdlib.abstract.gmd_shader import GMDVertexBufferLayout, GMDVertexBuffer, VecStorage, VecCompFmt
+
+
+def _layout() -> GMDVertexBufferLayout:
+    return GMDVertexBufferLayout.make_vertex_buffer_layout(
+        assume_skinned=False,
+
+        pos_storage=VecStorage(VecCompFmt.Float32, 3),
+        weights_storage=None,
+        bones_storage=None,
+        normal_storage=VecStorage(VecCompFmt.Byte_Minus1_1, 4),
+        tangent_storage=None,
+        unk_storage=None,
+        col0_storage=None,
+        col1_storage=None,
+        uv_storages=[VecStorage(VecCompFmt.Float16, 2)],
+
+        packing_flags=0,
+    )
+
+
+def _packed_vertices(big_endian: bool, count: int) -> bytes:
+    layout = _layout()
+    rng = np.random.default_rng(0)
+    vertices = GMDVertexBuffer(
+        layout=layout,
+        pos=rng.random((count, 3), dtype=np.float32),
+        weight_data=None,
+        bone_data=None,
+        normal=rng.random((count, 4), dtype=np.float32) * 2 - 1,
+        tangent=None,
+        unk=None,
+        col0=None,
+        col1=None,
+        uvs=[rng.random((count, 2), dtype=np.float32)],
+    )
+    data = bytearray()
+    layout.pack_into(big_endian, vertices, data)
+    return bytes(data)
+
+
+@pytest.mark.order(2)
+def test_packed_source_reused():
+    layout = _layout()
+    data = _packed_vertices(False, 10)
+    vertices, _ = layout.unpack_from(False, 10, data, 0)
+    vertices.track_packed_source(False, memoryview(data))
+
+    mesh_vertices = vertices.copy_as_generic(slice(2, 7)).track_packed_source_of(vertices, slice(2, 7))
+    bpv = layout.bytes_per_vertex()
+    assert mesh_vertices.get_packed_source(False) == data[2 * bpv:7 * bpv]
+    # Different endianness can't reuse the bytes
+    assert mesh_vertices.get_packed_source(True) is None
+
+    buffer = bytearray(5 * bpv)
+    assert layout.pack_into_buffer(False, mesh_vertices, buffer, 0) == len(buffer)
+    assert buffer == data[2 * bpv:7 * bpv]
+
+
+@pytest.mark.order(2)
+def test_packed_source_invalidated_by_changes():
+    layout = _layout()
+    data = _packed_vertices(False, 10)
+    vertices, _ = layout.unpack_from(False, 10, data, 0)
+    vertices.track_packed_source(False, memoryview(data))
+
+    # Tracked arrays can't be modified in-place
+    with pytest.raises(ValueError):
+        vertices.pos[0, 0] = 1.0
+
+    # Replacing an array invalidates the packed source, so the new data is packed
+    vertices.pos = vertices.pos.copy()
+    vertices.pos[0, 0] = 100.0
+    assert vertices.get_packed_source(False) is None
+
+    buffer = bytearray(len(data))
+    layout.pack_into_buffer(False, vertices, buffer, 0)
+    repacked, _ = layout.unpack_from(False, 10, buffer, 0)
+    assert repacked.pos[0, 0] == 100.0
+
+    # Copies don't inherit the packed source
+    assert vertices.copy_as_generic().packed_source is None
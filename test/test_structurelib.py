@@ -1,7 +1,11 @@
+from typing import List
+
 import pytest
 
+from yk_gmd_blender.structurelib.base import StructureUnpacker, FixedSizeASCIIUnpacker, ValueAdaptor, \
+    structure_data, PackingValidationError, FixedSizeArrayUnpacker
 from yk_gmd_blender.structurelib.primitives import c_uint8, c_uint16, c_uint32, c_uint64, c_int8, c_int32, c_int64, \
-    c_int16, c_unorm8, c_u8_Minus1_1
+    c_int16, c_unorm8, c_u8_Minus1_1, c_float16, c_float32
 
 
 # This module tests the structurelib finite-range primitive types,
@@ -256,3 +260,123 @@ def test_prim_u8_Minus1_1_exhaustive_repack():
         t.pack(True, d, b_prime)
 
     assert list(b_prime) == list(b)
+
+
+# Structures used to check the compiled StructureUnpacker path matches the per-field path
+
+@structure_data()
+class _InnerStruct:
+    checksum: int
+    text: str
+
+
+_InnerStruct_Unpack = StructureUnpacker(
+    _InnerStruct,
+    fields=[
+        ("checksum", c_uint16),
+        ("text", FixedSizeASCIIUnpacker(6)),
+    ]
+)
+
+
+@structure_data()
+class _OuterStruct:
+    a: int
+    inner: _InnerStruct
+    floats: List[float]
+    half: float
+    color: List[float]
+    doubled: int
+    signed: int
+
+
+_OuterStruct_Unpack = StructureUnpacker(
+    _OuterStruct,
+    fields=[
+        ("a", c_uint32),
+        ("inner", _InnerStruct_Unpack),
+        ("floats", c_float32.array_of(3)),
+        ("half", c_float16),
+        ("color", c_unorm8.array_of(4)),
+        ("doubled", ValueAdaptor(int, c_uint8, lambda x: x * 2, lambda x: x // 2)),
+        ("signed", c_int8),
+    ]
+)
+
+
+def _example_outer_struct():
+    return _OuterStruct(
+        a=0xDEADBEEF,
+        inner=_InnerStruct(checksum=1234, text="abc"),
+        floats=[1.0, -2.5, 0.125],
+        half=0.5,
+        color=[0.0, 1.0, 51 / 255, 204 / 255],
+        doubled=200,
+        signed=-5,
+    )
+
+
+@pytest.mark.order(2)
+def test_structure_compiled_matches_per_field():
+    t = _OuterStruct_Unpack
+    assert t.flat_struct_fmt() is not None
+    value = _example_outer_struct()
+
+    for big_endian in (False, True):
+        b_compiled = bytearray()
+        t.pack(big_endian, value, b_compiled)
+        b_per_field = bytearray()
+        t.pack_per_field(big_endian, value, b_per_field)
+        assert b_compiled == b_per_field
+        assert len(b_compiled) == t.sizeof()
+
+        # Offset the data to make sure offsets are respected
+        data = bytes(3) + bytes(b_compiled)
+        v_compiled, off_compiled = t.unpack(big_endian, data, 3)
+        v_per_field, off_per_field = t.unpack_per_field(big_endian, data, 3)
+        assert v_compiled == v_per_field == value
+        assert off_compiled == off_per_field == 3 + t.sizeof()
+
+
+@pytest.mark.order(2)
+def test_structure_compiled_validates():
+    value = _example_outer_struct()
+    bad_inner = _InnerStruct(checksum=70000, text="abc")
+    with pytest.raises(PackingValidationError):
+        _OuterStruct_Unpack.pack(False, _OuterStruct(**{**value.__dict__, "inner": bad_inner}), bytearray())
+    with pytest.raises(PackingValidationError):
+        _OuterStruct_Unpack.pack(False, _OuterStruct(**{**value.__dict__, "floats": [1.0]}), bytearray())
+
+
+@pytest.mark.order(2)
+def test_array_bulk_matches_per_element():
+    # Each array unpacker should produce the same list as unpacking each element in turn
+    prims = [0, 1, 0xFFFF, 1234, 65534]
+    records = [_example_outer_struct(), _OuterStruct(**{**_example_outer_struct().__dict__, "a": 7, "signed": 100})]
+
+    for big_endian in (False, True):
+        for elem_type, values in ((c_uint16, prims), (_OuterStruct_Unpack, records)):
+            data = bytearray(b"\xAA")
+            for v in values:
+                elem_type.pack(big_endian, v, data)
+            data = bytes(data)
+
+            per_element = []
+            off = 1
+            for _ in values:
+                v, off = elem_type.unpack(big_endian, data, off)
+                per_element.append(v)
+
+            bulk, bulk_off = FixedSizeArrayUnpacker(elem_type, len(values)).unpack(big_endian, data, 1)
+            assert isinstance(bulk, list)
+            assert bulk == per_element == values
+            assert bulk_off == off == len(data)
+
+
+@pytest.mark.order(2)
+def test_array_bulk_truncated_data():
+    data = bytes(10)
+    with pytest.raises(Exception):
+        FixedSizeArrayUnpacker(c_uint16, 6).unpack(False, data, 0)
+    with pytest.raises(Exception):
+        FixedSizeArrayUnpacker(_InnerStruct_Unpack, 2).unpack(False, data, 0)
@@ -0,0 +1,173 @@
+import array
+import random
+from typing import Iterable, Tuple, List
+
+import numpy as np
+import pytest
+
+from yk_gmd_blender.meshlib.triangle_strips import RESET_INDEX, triangles_to_array, build_triangle_strips, \
+    build_optimized_triangle_strips
+
+
+# These tests use meshlib directly, because GMDMeshIndices requires mathutils.
+
+def _canonical_triangle(a: int, b: int, c: int) -> Tuple[int, int, int]:
+    # Rotate a triangle so the smallest index is first, keeping the winding
+    if a <= b and a <= c:
+        return a, b, c
+    if b <= a and b <= c:
+        return b, c, a
+    return c, a, b
+
+
+def decode_triangle_strip(strip: np.ndarray, has_reset: bool) -> List[Tuple[int, int, int]]:
+    """
+    Decode a triangle strip into its non-degenerate triangles, with the winding each triangle is drawn with.
+    Triangles are returned rotated so their smallest index comes first.
+    """
+    triangles = []
+    start = 0
+    indices = [int(x) for x in strip]
+    while start < len(indices):
+        if has_reset:
+            try:
+                end = indices.index(RESET_INDEX, start)
+            except ValueError:
+                end = len(indices)
+        else:
+            end = len(indices)
+        for i in range(start, end - 2):
+            a, b, c = indices[i], indices[i + 1], indices[i + 2]
+            if a == b or b == c or a == c:
+                continue
+            if (i - start) % 2 == 1:
+                a, b = b, a
+            triangles.append(_canonical_triangle(a, b, c))
+        start = end + 1
+    return triangles
+
+
+def _build(triangles, optimize_strips: bool = False):
+    tri_arr = triangles_to_array(triangles)
+    if optimize_strips:
+        noreset, reset = build_optimized_triangle_strips(tri_arr)
+    else:
+        noreset, reset = build_triangle_strips(tri_arr)
+    return array.array("H", noreset.tobytes()), array.array("H", reset.tobytes())
+
+
+def _reference_strips(triangles: Iterable[Tuple[int, int, int]]):
+    # The original per-triangle strip generation, which the vectorized version must match exactly
+    noreset = array.array("H")
+    reset = array.array("H")
+    for t0, t1, t2 in triangles:
+        if not noreset:
+            noreset.extend((t0, t1, t2))
+        elif noreset[-2] == t0 and noreset[-1] == t1:
+            noreset.append(t2)
+        else:
+            noreset.extend((noreset[-1], t0, t0, t1, t2))
+
+        if not reset:
+            reset.extend((t0, t1, t2))
+        elif reset[-2] == t0 and reset[-1] == t1:
+            reset.append(t2)
+        else:
+            reset.extend((0xFFFF, t0, t1, t2))
+    return noreset, reset
+
+
+def _grid_triangles(width: int, height: int):
+    # Two triangles per quad, with consistent winding
+    tris = []
+    for y in range(height):
+        for x in range(width):
+            a = y * (width + 1) + x
+            b = a + 1
+            c = a + width + 1
+            d = c + 1
+            tris.append((a, b, c))
+            tris.append((b, d, c))
+    return tris
+
+
+def _strip_order_triangles(n: int):
+    # Triangles in the order a strip would emit them, so consecutive triangles continue the strip
+    return [(i, i + 1, i + 2) if i % 2 == 0 else (i + 1, i, i + 2) for i in range(n)]
+
+
+_CASES = {
+    "empty": [],
+    "single": [(0, 1, 2)],
+    "strip": [(0, 1, 2), (1, 2, 3), (2, 3, 4), (3, 4, 5)],
+    "alternating": [(0, 1, 2), (1, 2, 3), (0, 1, 2), (2, 3, 0), (3, 0, 1), (0, 1, 2)],
+    "repeated": [(0, 1, 2)] * 5,
+    "degenerate": [(0, 0, 0), (0, 0, 0), (0, 0, 1), (0, 1, 1), (1, 1, 1)],
+    "grid": _grid_triangles(5, 4),
+    "strip_order": _strip_order_triangles(20),
+    "max_index": [(0xFFFE, 0xFFFF, 0), (0xFFFF, 0, 1)],
+}
+
+
+@pytest.mark.order(2)
+@pytest.mark.parametrize("case", list(_CASES.keys()))
+def test_strips_match_reference(case):
+    triangles = _CASES[case]
+    strip_noreset, strip_reset = _build(triangles)
+    noreset, reset = _reference_strips(triangles)
+
+    assert strip_noreset.tobytes() == noreset.tobytes()
+    assert strip_reset.tobytes() == reset.tobytes()
+
+
+@pytest.mark.order(2)
+@pytest.mark.parametrize("seed", range(10))
+def test_strips_match_reference_random(seed):
+    rng = random.Random(seed)
+    # Few distinct vertices, so strips continue and break often
+    n_verts = rng.choice([3, 4, 6, 30])
+    triangles = [tuple(rng.randrange(n_verts) for _ in range(3)) for _ in range(rng.randrange(1, 500))]
+    strip_noreset, strip_reset = _build(triangles)
+    noreset, reset = _reference_strips(triangles)
+
+    assert strip_noreset.tobytes() == noreset.tobytes()
+    assert strip_reset.tobytes() == reset.tobytes()
+
+    # Flat index arrays give the same result
+    from_array, _ = _build(np.array(triangles, dtype=np.uint16).flatten())
+    assert from_array.tobytes() == noreset.tobytes()
+
+
+@pytest.mark.order(2)
+def test_strips_out_of_range():
+    with pytest.raises(OverflowError):
+        triangles_to_array([(0, 1, 0x10000)])
+    with pytest.raises(OverflowError):
+        triangles_to_array([(0, -1, 2)])
+
+
+@pytest.mark.order(2)
+@pytest.mark.parametrize("case", ["grid", "shuffled_grid", "strip_order", "random"])
+def test_optimized_strips(case):
+    if case == "grid":
+        triangles = _grid_triangles(8, 8)
+    elif case == "shuffled_grid":
+        triangles = _grid_triangles(8, 8)
+        random.Random(0).shuffle(triangles)
+    elif case == "strip_order":
+        triangles = _strip_order_triangles(30)
+    else:
+        rng = random.Random(1)
+        triangles = [tuple(rng.sample(range(20), 3)) for _ in range(100)]
+
+    expected = sorted(decode_triangle_strip(np.array(t), has_reset=False)[0] for t in triangles)
+    default_noreset, default_reset = _build(triangles)
+    optimized_noreset, optimized_reset = _build(triangles, optimize_strips=True)
+
+    # Strips draw the same triangles with the same winding
+    assert sorted(decode_triangle_strip(optimized_noreset, has_reset=False)) == expected
+    assert sorted(decode_triangle_strip(optimized_reset, has_reset=True)) == expected
+    # Strips are never longer, and use fewer resets
+    assert len(optimized_noreset) <= len(default_noreset)
+    assert len(optimized_reset) <= len(default_reset)
+    assert optimized_reset.count(RESET_INDEX) <= default_reset.count(RESET_INDEX)
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from yk_gmd_blender.meshlib.export_submeshing import count_vertex_cache_misses
+from yk_gmd_blender.meshlib.vertex_cache import optimize_triangle_order, reorder_vertices_by_first_use, \
+    optimize_for_vertex_cache
+
+
+def make_grid_tris(size: int) -> np.ndarray:
+    tris = []
+    for y in range(size):
+        for x in range(size):
+            a = y * (size + 1) + x
+            tris += [(a, a + 1, a + size + 1), (a + 1, a + size + 2, a + size + 1)]
+    return np.array(tris, dtype=np.int64)
+
+
+@pytest.mark.order(3)
+def test_optimize_triangle_order_is_permutation():
+    rng = np.random.default_rng(0)
+    tris = make_grid_tris(40)
+    tris = tris[rng.permutation(len(tris))]
+    order = optimize_triangle_order(tris, 41 * 41)
+    assert sorted(order.tolist()) == list(range(len(tris)))
+
+    before = count_vertex_cache_misses(tris.tolist())
+    after = count_vertex_cache_misses(tris[order].tolist())
+    assert after < before / 2
+
+
+@pytest.mark.order(3)
+def test_optimize_triangle_order_disconnected():
+    # Isolated triangles and an unused vertex, so every triangle is found through the dead-end fallbacks
+    tris = np.array([(6, 7, 8), (0, 1, 2), (3, 4, 5)], dtype=np.int64)
+    order = optimize_triangle_order(tris, 10)
+    assert sorted(order.tolist()) == [0, 1, 2]
+    assert len(optimize_triangle_order(np.zeros((0, 3), dtype=np.int64), 0)) == 0
+
+
+@pytest.mark.order(3)
+def test_reorder_vertices_by_first_use():
+    vertices = ["a", "b", "c", "d", "e"]
+    tris = np.array([(3, 1, 4), (4, 1, 0)], dtype=np.int64)
+    new_vertices, new_tris = reorder_vertices_by_first_use(vertices, tris)
+    # "c" is unused, so goes at the end
+    assert new_vertices == ["d", "b", "e", "a", "c"]
+    assert new_tris.tolist() == [[0, 1, 2], [2, 1, 3]]
+
+
+@pytest.mark.order(3)
+def test_optimize_for_vertex_cache_draws_same_triangles():
+    rng = np.random.default_rng(1)
+    tris = make_grid_tris(20)
+    tris = tris[rng.permutation(len(tris))]
+    vertices = [f"v{i}" for i in range(21 * 21)]
+
+    new_vertices, new_tris = optimize_for_vertex_cache(vertices, tris.tolist())
+    assert sorted(new_vertices) == sorted(vertices)
+
+    def named_tris(vs, ts):
+        # Compare by vertex "names", keeping winding by rotating the smallest name to the front
+        named = [tuple(vs[i] for i in t) for t in ts]
+        return sorted(min(t[i:] + t[:i] for i in range(3)) for t in named)
+
+    assert named_tris(new_vertices, new_tris) == named_tris(vertices, tris.tolist())
@@ -1,11 +1,13 @@
 import array
+from types import SimpleNamespace
 from typing import List, Tuple
 
+import numpy as np
 import pytest
 
 from mathutils import Vector
 from yk_gmd_blender.meshlib.vertex_fusion import vertex_fusion, fuse_adjacent_vertices, \
-    detect_fully_fused_triangles, decide_on_unfusions, solve_unfusion
+    detect_fully_fused_triangles, decide_on_unfusions, solve_unfusion, make_bone_indices_consistent
 from yk_gmd_blender.gmdlib.abstract.gmd_shader import GMDVertexBuffer, GMDVertexBufferLayout, VecStorage, \
     VecCompFmt
 
@@ -185,6 +187,37 @@ def test_fuse_adjacent_vertices():
     ]]
 
 
+# Test that fuse_adjacent_vertices compares values rather than bit patterns,
+# and that vertices from buffers with different data are never fused.
+@pytest.mark.order(1)
+def test_fuse_adjacent_vertices_float_equality():
+    nan = float("nan")
+    vtx_buf_0 = mock_vertex_buffer([
+        v(0, 0, 0),  # 0
+        v(-0.0, 0, 0),  # 1 - equal to 0
+        v(nan, 0, 0),  # 2 - NaN is never equal to anything
+        v(nan, 0, 0),  # 3
+    ])
+    vtx_buf_1 = mock_vertex_buffer([
+        v(0, 0, 0),  # 0 - same position as buffer 0 vertex 0
+        v(0, 0, 0),  # 1 - same position, different normal to vertex 0
+    ])
+    vtx_buf_1.normal = [v(0, 1, 0), v(1, 0, 0)]
+
+    fused_idx_to_buf_idx, buf_idx_to_fused_idx, is_fused = fuse_adjacent_vertices([vtx_buf_0, vtx_buf_1])
+
+    # buffer 1 has normals and buffer 0 doesn't, so none of their vertices are fused
+    assert fused_idx_to_buf_idx == [
+        [(0, 0), (0, 1)],
+        [(0, 2)],
+        [(0, 3)],
+        [(1, 0)],
+        [(1, 1)],
+    ]
+    assert buf_idx_to_fused_idx == [[0, 0, 1, 2], [3, 4]]
+    assert is_fused == [[False, True, False, False], [False, False]]
+
+
 @pytest.mark.order(1)
 def test_detect_fully_fused_triangles_nofusion():
     idx_buf = mock_idx_buffer([
@@ -793,3 +826,79 @@ def test_complex_unfusion():
         for vert in fused_vert_group:
             for vert_prime in unfuse_verts_with[vert]:
                 assert vert_prime not in fused_vert_group
+
+
+@pytest.mark.order(1)
+def test_solve_unfusion_partial():
+    # Test a fusion where only some vertices are unfused from each other, alongside a fusion where all are:
+    #    A B
+    #    A'
+    #    D
+    # A/A' and D/A' should be unfused, but A and D can stay fused.
+    # B and B' should be fully unfused.
+    vtx_buf = mock_vertex_buffer([
+        v(0, 0, 0),  # A
+        v(1, 0, 0),  # B
+        v(0, 0, 0),  # A'
+        v(1, 0, 0),  # B'
+        v(0, 0, 0),  # D
+    ])
+    old_fused_idx_to_buf_idx = [
+        [(0, 0), (0, 2), (0, 4)],
+        [(0, 1), (0, 3)],
+    ]
+    unfuse_verts_with = {
+        (0, 0): {(0, 2)},
+        (0, 2): {(0, 0), (0, 4)},
+        (0, 4): {(0, 2)},
+        (0, 1): {(0, 3)},
+        (0, 3): {(0, 1)},
+    }
+    fused_idx_to_buf_idx, buf_idx_to_fused_idx, is_fused = solve_unfusion([vtx_buf], old_fused_idx_to_buf_idx,
+                                                                          unfuse_verts_with)
+    assert fused_idx_to_buf_idx == [
+        [(0, 0), (0, 4)],  # A + D
+        [(0, 1)],  # B
+        [(0, 2)],  # A'
+        [(0, 3)],  # B'
+    ]
+    assert buf_idx_to_fused_idx == [[0, 1, 2, 3, 0]]
+    assert is_fused == [[False, False, False, False, True]]
+
+
+@pytest.mark.order(1)
+def test_make_bone_indices_consistent():
+    layout = GMDVertexBufferLayout.make_vertex_buffer_layout(
+        assume_skinned=True,
+
+        pos_storage=VecStorage(VecCompFmt.Float32, 3),
+        weights_storage=VecStorage(VecCompFmt.Byte_0_1, 4),
+        bones_storage=VecStorage(VecCompFmt.Byte_0_255, 4),
+        normal_storage=None,
+        tangent_storage=None,
+        unk_storage=None,
+        col0_storage=None,
+        col1_storage=None,
+        uv_storages=[],
+
+        packing_flags=0,
+    )
+
+    def mock_skinned_mesh(relevant_bones, bone_data, weight_data):
+        vertices = GMDVertexBuffer.build_empty(layout, len(bone_data))
+        vertices.bone_data[:] = bone_data
+        vertices.weight_data[:] = weight_data
+        # make_bone_indices_consistent only uses these fields, and bones are only compared by identity
+        return SimpleNamespace(relevant_bones=relevant_bones, vertices_data=vertices)
+
+    a, b, c, d = object(), object(), object(), object()
+    mesh_0 = mock_skinned_mesh([a, b], [[1, 0, 0, 0]], [[1, 0, 0, 0]])
+    mesh_1 = mock_skinned_mesh([c, a, d], [[0, 1, 2, 2], [2, 0, 1, 1]], [[0.5, 0.25, 0.25, 0], [1, 0, 0, 0]])
+
+    relevant_bones, vertices = make_bone_indices_consistent([mesh_0, mesh_1])
+    assert relevant_bones == [a, b, c, d]
+    assert vertices[0] is mesh_0.vertices_data
+    # Unweighted bones are mapped to 0
+    assert vertices[1].bone_data.tolist() == [[2, 0, 3, 0], [3, 0, 0, 0]]
+    # The original buffer isn't modified
+    assert mesh_1.vertices_data.bone_data.tolist() == [[0, 1, 2, 2], [2, 0, 1, 1]]
@@ -40,6 +40,19 @@ class BaseExportGMD(Operator, ExportHelper):
                                     items=BoundingBoxCalc.blender_props(),
                                     default="OLD_INFINITE")
 
+    optimize_vertex_cache: BoolProperty(name="Optimize Vertex Cache",
+                                        description="If True, reorders the triangles and vertices of each exported "
+                                                    "mesh so the game can render it more efficiently.\n"
+                                                    "Slows down export, and changes the order triangles are drawn in.",
+                                        default=False)
+
+    optimize_strips: BoolProperty(name="Optimize Triangle Strips",
+                                  description="If True, builds each exported mesh's triangle strips with a greedy "
+                                              "stripifier,\nwhich makes longer strips with fewer degenerate "
+                                              "triangles.\n"
+                                              "Slows down export, and changes the order strip triangles are drawn in.",
+                                  default=False)
+
     logging_categories: StringProperty(name="Debug Log Categories",
                                        description="Space-separated string of debug categories for logging.",
                                        default="ALL")
@@ -76,7 +89,9 @@ class BaseExportGMD(Operator, ExportHelper):
         return GMDSceneGathererConfig(
             game=game,
             bounding_box_calc=BoundingBoxCalc.map_from_blender_props(self.bounding_box_enum),
-            debug_compare_matrices=self.debug_compare_matrices
+            debug_compare_matrices=self.debug_compare_matrices,
+            optimize_vertex_cache=self.optimize_vertex_cache,
+            optimize_strips=self.optimize_strips,
         )
 
 
@@ -126,6 +141,8 @@ class ExportSkinnedGMD(BaseExportGMD):
         layout.prop(self, 'logging_categories')
         layout.prop(self, "game_enum")
         layout.prop(self, "bounding_box_enum")
+        layout.prop(self, 'optimize_vertex_cache')
+        layout.prop(self, 'optimize_strips')
 
         layout.prop(self, 'bone_matrix_origin')
         layout.prop(self, 'debug_compare_matrices')
@@ -144,6 +161,8 @@ class ExportSkinnedGMD(BaseExportGMD):
         return GMDSkinnedSceneGathererConfig(game=base_config.game,
                                              bounding_box_calc=base_config.bounding_box_calc,
                                              debug_compare_matrices=base_config.debug_compare_matrices,
+                                             optimize_vertex_cache=base_config.optimize_vertex_cache,
+                                             optimize_strips=base_config.optimize_strips,
                                              bone_limit=bone_limit)
 
     def execute(self, context):
@@ -222,6 +241,8 @@ class ExportUnskinnedGMD(BaseExportGMD):
         layout.prop(self, 'logging_categories')
         layout.prop(self, "game_enum")
         layout.prop(self, "bounding_box_enum")
+        layout.prop(self, 'optimize_vertex_cache')
+        layout.prop(self, 'optimize_strips')
 
         layout.prop(self, 'debug_compare_matrices')
 
@@ -1,5 +1,5 @@
 import dataclasses
-from typing import List, Tuple, Optional, Union, Set, Mapping
+from typing import List, Tuple, Optional, Union, Set, Mapping, Dict
 
 import numpy as np
 
@@ -8,88 +8,149 @@ from yk_gmd_blender.blender.common import AttribSetLayerNames
 from yk_gmd_blender.gmdlib.abstract.gmd_attributes import GMDAttributeSet
 from yk_gmd_blender.gmdlib.abstract.gmd_shader import GMDVertexBuffer, GMDSkinnedVertexBuffer, VecStorage, VecCompFmt
 from yk_gmd_blender.gmdlib.errors.error_reporter import ErrorReporter
-from yk_gmd_blender.meshlib.export_submeshing import MeshLoopIdx
+from yk_gmd_blender.meshlib.bone_weights import build_bone_remap_lut, remap_weighted_bones, select_top4_weights, \
+    MAJOR_INFLUENCE_WEIGHT
+from yk_gmd_blender.meshlib.export_submeshing import MeshLoopIdx, partition_triangles_by_material
 
 
-def generate_vertex_byteslices(vertex_buffer: GMDVertexBuffer, big_endian: bool) -> List[bytes]:
+def generate_packed_vertices(vertex_buffer: GMDVertexBuffer, big_endian: bool) -> bytearray:
     """
-    Given a vertex buffer, generate packed bytes for each vertex.
-    This can be used for easy (maybe not fast?) deduplication
+    Given a vertex buffer, pack all of its vertices into one buffer of vertex_buffer.layout.bytes_per_vertex() bytes
+    per vertex. This can be used for deduplication with dedupe_packed_loops.
     """
-    # TODO we really should be able to reuse the packed bytes
     vertex_bytes = bytearray()
     vertex_buffer.layout.pack_into(big_endian, vertex_buffer, vertex_bytes)
-    vertex_stride = vertex_buffer.layout.bytes_per_vertex()
-    return [
-        bytes(vertex_bytes[vertex_off:vertex_off + vertex_stride])
-        for vertex_off in range(0, len(vertex_bytes), vertex_stride)
-    ]
+    return vertex_bytes
 
 
-def loop_indices_for_material(mesh: bpy.types.Mesh, material_idx: int) -> List[MeshLoopIdx]:
+class MeshLoopArrays:
     """
-    Given a mesh and a material index, return a List of the mesh loop indices which are related to that material
-    with index-based deduplication (i.e. index i does not appear twice in the list) but no data-based deduplication
-    """
-    loop_set: Set[MeshLoopIdx] = set()
-
-    for t in mesh.loop_triangles:
-        if t.material_index == material_idx:
-            loop_set.add(MeshLoopIdx(t.loops[0]))
-            loop_set.add(MeshLoopIdx(t.loops[1]))
-            loop_set.add(MeshLoopIdx(t.loops[2]))
-
-    return list(loop_set)
-
+    Per-loop data for a whole Blender mesh, fetched with foreach_get() into flat arrays.
+    Each attribute is fetched the first time it's requested and cached, so extracting vertices for many
+    materials/submeshes of the same mesh doesn't go back to Blender for every loop.
+    The mesh must not be modified while this is in use.
 
-def extract_vertices_for_unskinned_material(mesh: bpy.types.Mesh, attr_set: GMDAttributeSet,
-                                            loops: List[MeshLoopIdx],
+    Positions, normals and tangents are converted to GMD space with the (-x, z, y) transposition.
+    """
+    mesh: bpy.types.Mesh
+
+    def __init__(self, mesh: bpy.types.Mesh):
+        self.mesh = mesh
+        self._loop_vertex_index: Optional[np.ndarray] = None
+        self._vectors: Dict[str, np.ndarray] = {}
+        self._layers: Dict[Tuple[str, str], np.ndarray] = {}
+
+    @property
+    def loop_vertex_index(self) -> np.ndarray:
+        """(L,) the index of the vertex each loop uses"""
+        if self._loop_vertex_index is None:
+            self._loop_vertex_index = np.zeros(len(self.mesh.loops), dtype=np.int32)
+            self.mesh.loops.foreach_get("vertex_index", self._loop_vertex_index)
+        return self._loop_vertex_index
+
+    def loop_triangles_by_material(self, n_materials: int) -> List[np.ndarray]:
+        """
+        Read the mesh's loop triangles in one pass, and group them by material with partition_triangles_by_material.
+        calc_loop_triangles() must have been called on the mesh.
+
+        :return: For each material index, a (K, 3) array of MeshLoopIdx for each triangle using that material.
+        """
+        n_tris = len(self.mesh.loop_triangles)
+        tri_loops = np.zeros(n_tris * 3, dtype=np.int32)
+        self.mesh.loop_triangles.foreach_get("loops", tri_loops)
+        material_indices = np.zeros(n_tris, dtype=np.int32)
+        self.mesh.loop_triangles.foreach_get("material_index", material_indices)
+        return partition_triangles_by_material(tri_loops.reshape(-1, 3), material_indices, n_materials)
+
+    def _gmd_space_vector(self, name: str, collection, prop: str) -> np.ndarray:
+        if name not in self._vectors:
+            data: np.ndarray = np.zeros(len(collection) * 3, dtype=np.float32)
+            collection.foreach_get(prop, data)
+            data = data.reshape(-1, 3)
+            # Hardcoded (-x, z, y) transposition to go into GMD space
+            self._vectors[name] = np.stack([-data[:, 0], data[:, 2], data[:, 1]], axis=1)
+        return self._vectors[name]
+
+    def pos(self) -> np.ndarray:
+        """(L, 3) the position of each loop's vertex"""
+        return self._gmd_space_vector("co", self.mesh.vertices, "co")[self.loop_vertex_index]
+
+    def normals(self) -> np.ndarray:
+        """(L, 3) the normal of each loop"""
+        return self._gmd_space_vector("normal", self.mesh.loops, "normal")
+
+    def tangents(self) -> np.ndarray:
+        """(L, 3) the tangent of each loop. Tangents must have been calculated on the mesh."""
+        return self._gmd_space_vector("tangent", self.mesh.loops, "tangent")
+
+    def _layer_data(self, layer, prop: str, n_comps: int) -> np.ndarray:
+        key = (layer.name, prop)
+        if key not in self._layers:
+            data = np.zeros(len(layer.data) * n_comps, dtype=np.float32)
+            layer.data.foreach_get(prop, data)
+            self._layers[key] = data.reshape(-1, n_comps)
+        return self._layers[key]
+
+    def color(self, layer: bpy.types.FloatColorAttribute) -> np.ndarray:
+        """(L, 4) the value of each loop in a color layer"""
+        return self._layer_data(layer, "color", 4)
+
+    def uv(self, layer: bpy.types.MeshUVLoopLayer) -> np.ndarray:
+        """(L, 2) the value of each loop in a UV layer"""
+        return self._layer_data(layer, "uv", 2)
+
+
+def extract_vertices_for_unskinned_material(mesh_arrays: MeshLoopArrays, attr_set: GMDAttributeSet,
+                                            loops: Union[List[MeshLoopIdx], np.ndarray],
                                             error: ErrorReporter) -> GMDVertexBuffer:
     assert not attr_set.shader.assume_skinned
+    mesh = mesh_arrays.mesh
 
     layer_names = AttribSetLayerNames.build_from(attr_set.shader.vertex_buffer_layout, is_skinned=False)
     layers = layer_names.try_retrieve_from(mesh, error)
 
     vertices = GMDVertexBuffer.build_empty(attr_set.shader.vertex_buffer_layout, len(loops))
+    loop_idxs = np.array(loops, dtype=np.int64)
 
-    _extract_pos(loops, mesh, vertices.pos)
+    _extract_pos(loop_idxs, mesh_arrays, vertices.pos)
     if vertices.normal is not None:
-        _extract_normals(loops, mesh, layers.normal_w_layer, vertices.normal)
+        _extract_normals(loop_idxs, mesh_arrays, layers.normal_w_layer, vertices.normal)
     if vertices.tangent is not None:
         if layers.tangent_layer is not None:
-            _extract_tangents_from_layer(loops, layers.tangent_layer, vertices.tangent)
+            _extract_tangents_from_layer(loop_idxs, mesh_arrays, layers.tangent_layer, vertices.tangent)
         else:
-            _extract_tangents_from_mesh(loops, mesh, layers.tangent_w_layer, vertices.tangent)
+            _extract_tangents_from_mesh(loop_idxs, mesh_arrays, layers.tangent_w_layer, vertices.tangent)
     # TODO loll we literally don't do anything for unk
     if vertices.unk is not None:
         error.recoverable(f"Mesh {mesh}/shader {attr_set.shader} uses an unknown vertex field. "
                           f"The exporter does not handle this field, and it will default to all zeros. "
                           f"If this is OK, disable Strict Export.")
     if vertices.bone_data is not None:
-        _extract_bones_from_layer(loops, layers.bone_data_layer, vertices.bone_data)
+        _extract_bones_from_layer(loop_idxs, mesh_arrays, layers.bone_data_layer, vertices.bone_data)
     if vertices.weight_data is not None:
-        _extract_from_color(loops, layers.weight_data_layer, vertices.weight_data)
+        _extract_from_color(loop_idxs, mesh_arrays, layers.weight_data_layer, vertices.weight_data)
     if vertices.col0 is not None:
-        _extract_from_color(loops, layers.col0_layer, vertices.col0)
+        _extract_from_color(loop_idxs, mesh_arrays, layers.col0_layer, vertices.col0)
     if vertices.col1 is not None:
-        _extract_from_color(loops, layers.col1_layer, vertices.col1)
+        _extract_from_color(loop_idxs, mesh_arrays, layers.col1_layer, vertices.col1)
     if len(vertices.uvs) != len(layers.uv_layers):
         error.recoverable(
             f"Shader {attr_set.shader} expected {len(vertices.uvs)} UV layers but found {len(layers.uv_layers)}. "
             f"Layers that were not found will be filled with 0, and extra layers will be ignored. "
             f"If this is OK, disable Strict Export")
     for (i, (comp_count, uv_layer)) in enumerate(layers.uv_layers):
-        _extract_uv(loops, i, comp_count, uv_layer, vertices.uvs[i], error)
+        _extract_uv(loop_idxs, mesh_arrays, i, comp_count, uv_layer, vertices.uvs[i], error)
 
     return vertices
 
 
-def extract_vertices_for_skinned_material(mesh: bpy.types.Mesh, attr_set: GMDAttributeSet,
-                                          loops: List[MeshLoopIdx],
+def extract_vertices_for_skinned_material(mesh_arrays: MeshLoopArrays, attr_set: GMDAttributeSet,
+                                          loops: Union[List[MeshLoopIdx], np.ndarray],
                                           bone_info: Tuple[np.ndarray, np.ndarray, np.ndarray],
                                           error: ErrorReporter,
                                           bone_remapper: Optional[Mapping[int, int]] = None) -> GMDSkinnedVertexBuffer:
     assert attr_set.shader.assume_skinned
+    mesh = mesh_arrays.mesh
 
     layer_names = AttribSetLayerNames.build_from(attr_set.shader.vertex_buffer_layout, is_skinned=True)
     layers = layer_names.try_retrieve_from(mesh, error)
@@ -105,15 +166,16 @@ def extract_vertices_for_skinned_material(mesh: bpy.types.Mesh, attr_set: GMDAtt
         layout = attr_set.shader.vertex_buffer_layout
 
     vertices = GMDSkinnedVertexBuffer.build_empty(layout, len(loops))
+    loop_idxs = np.array(loops, dtype=np.int64)
 
-    _extract_pos(loops, mesh, vertices.pos)
+    _extract_pos(loop_idxs, mesh_arrays, vertices.pos)
     if vertices.normal is not None:
-        _extract_normals(loops, mesh, layers.normal_w_layer, vertices.normal)
+        _extract_normals(loop_idxs, mesh_arrays, layers.normal_w_layer, vertices.normal)
     if vertices.tangent is not None:
         if layers.tangent_layer is not None:
-            _extract_tangents_from_layer(loops, layers.tangent_layer, vertices.tangent)
+            _extract_tangents_from_layer(loop_idxs, mesh_arrays, layers.tangent_layer, vertices.tangent)
         else:
-            _extract_tangents_from_mesh(loops, mesh, layers.tangent_w_layer, vertices.tangent)
+            _extract_tangents_from_mesh(loop_idxs, mesh_arrays, layers.tangent_w_layer, vertices.tangent)
     # TODO loll we literally don't do anything for unk
     if vertices.unk is not None:
         error.recoverable(f"Mesh {mesh}/shader {attr_set.shader} uses an unknown vertex field. "
@@ -121,18 +183,19 @@ def extract_vertices_for_skinned_material(mesh: bpy.types.Mesh, attr_set: GMDAtt
                           f"If this is OK, disable Strict Export.")
     assert vertices.bone_data is not None
     assert vertices.weight_data is not None
-    _extract_skinned_boneweights(loops, mesh, bone_info, bone_remapper, vertices.bone_data, vertices.weight_data)
+    _extract_skinned_boneweights(loop_idxs, mesh_arrays, bone_info, bone_remapper,
+                                 vertices.bone_data, vertices.weight_data)
     if vertices.col0 is not None:
-        _extract_from_color(loops, layers.col0_layer, vertices.col0)
+        _extract_from_color(loop_idxs, mesh_arrays, layers.col0_layer, vertices.col0)
     if vertices.col1 is not None:
-        _extract_from_color(loops, layers.col1_layer, vertices.col1)
+        _extract_from_color(loop_idxs, mesh_arrays, layers.col1_layer, vertices.col1)
     if len(vertices.uvs) != len(layers.uv_layers):
         error.recoverable(
             f"Shader {attr_set.shader} expected {len(vertices.uvs)} UV layers but found {len(layers.uv_layers)}. "
             f"Layers that were not found will be filled with 0, and extra layers will be ignored. "
             f"If this is OK, disable Strict Export")
     for (i, (comp_count, uv_layer)) in enumerate(layers.uv_layers):
-        _extract_uv(loops, i, comp_count, uv_layer, vertices.uvs[i], error)
+        _extract_uv(loop_idxs, mesh_arrays, i, comp_count, uv_layer, vertices.uvs[i], error)
 
     return vertices
 
@@ -164,181 +227,137 @@ def compute_vertex_4weights(
     if max(relevant_vertex_groups) > 65535:
         error.fatal(
             f"Mesh {mesh.name} has vertex group indices > 65535. This is not supported. Use fewer bones please.")
-    bones = np.zeros((len(mesh.vertices), 4), np.uint16)
-    weights = np.zeros((len(mesh.vertices), 4), np.float32)
-    n_weights = np.zeros(len(mesh.vertices), np.uint8)
-
-    has_warned_about_weights_over_one = False
-
-    # In very rare cases blender has spit out vertex groups where g.weight = 0.
-    # Elsewhere we use .weight = 0 to imply "no group", so use a threshold value here to prevent this.
-    MIN_WEIGHT = 1.0 / 255.0
 
+    # Gather every (vertex, group, weight) triple in one pass, then select the top 4 per vertex in bulk
+    group_counts = np.zeros(len(mesh.vertices), dtype=np.int64)
+    groups = []
+    group_weights = []
     for v in mesh.vertices:
-        # For each vertex: take all boneweights that are part of this armature,
-        # sort them in descending order of weight,
-        # do sanity checks for values > 1 and < 0,
-        # and put the first 4 values into the bones/weights array.
-        # If there are fewer than 4 values, the others default to 0.
-        gs = sorted(
-            [
-                g
-                for g in v.groups
-                if g.group in relevant_vertex_groups and g.weight >= MIN_WEIGHT
-            ],
-            key=lambda g: g.weight,
-            reverse=True
-        )
-
-        # Check if weights are greater than 1 or lower than 0
-        if any(g.weight > 1 for g in v.groups) and not has_warned_about_weights_over_one:
-            error.recoverable(f"Some weights in mesh {mesh.name} are greater than 1. "
-                              f"These can't be exported - try normalizing your weights, or turn off Strict Export "
-                              f"to clamp it to 1")
-            has_warned_about_weights_over_one = True
-        if any(g.weight < 0 for g in v.groups):
-            error.fatal(f"Some weights in mesh {mesh.name} are smaller than 0 - this is impossible to export.")
-
-        # For each of the top four elements of bws, push it into bones/weights
-        for i in range(min(4, len(gs))):
-            weights[v.index, i] = min(1.0, gs[i].weight)
-            # Check after putting it in the ndarray that it still isn't 0, because it might have been rounded down
-            # inside the precision of uint8.
-            # This will ensure the invariant that weights[v.index, i] == 0 directly implies
-            # - bones[v.index, i] = 0
-            # - n_weights[v.index] <= i (i.e. iterating through range(n_weights[v.index]) will not produce i)
-            if weights[v.index, i] > 0:
-                bones[v.index, i] = gs[i].group
-                n_weights[v.index] = i + 1
-
-        # Sanity checks for meshes with more than 4 ""major"" influences.
-        if len(gs) > 4 and any(g.weight > 0.1 for g in gs[4:]):
-            error.recoverable(f"Some vertices in mesh {mesh.name} have more than 4 major influences. "
-                              f"A major influence is a bone with weight greater than 0.1. "
-                              f"The exporter can only export 4 influences per vertex, so animation on this model may "
-                              f"look odd. Turn off Strict Export if this is acceptable.")
-
-    return bones, weights, n_weights
-
-
-def _extract_pos(loops: List[MeshLoopIdx], mesh: bpy.types.Mesh, data: np.ndarray):
-    for (i, loop_idx) in enumerate(loops):
-        pos = mesh.vertices[mesh.loops[loop_idx].vertex_index].co
-        # Hardcoded (-x, z, y) transposition to go into GMD space
-        data[i, 0] = -pos[0]
-        data[i, 1] = pos[2]
-        data[i, 2] = pos[1]
-        # data[i, 3] = 0
-
-
-def _extract_normals(loops: List[MeshLoopIdx], mesh: bpy.types.Mesh,
+        vgs = v.groups
+        group_counts[v.index] = len(vgs)
+        for g in vgs:
+            groups.append(g.group)
+            group_weights.append(g.weight)
+    vertex_idx = np.repeat(np.arange(len(mesh.vertices)), group_counts)
+
+    top_weights = select_top4_weights(len(mesh.vertices), vertex_idx, np.array(groups, dtype=np.int64),
+                                      np.array(group_weights, dtype=np.float64),
+                                      np.fromiter(relevant_vertex_groups, dtype=np.int64))
+
+    # Check if weights are greater than 1 or lower than 0
+    if top_weights.any_over_one:
+        error.recoverable(f"Some weights in mesh {mesh.name} are greater than 1. "
+                          f"These can't be exported - try normalizing your weights, or turn off Strict Export "
+                          f"to clamp it to 1")
+    if top_weights.any_negative:
+        error.fatal(f"Some weights in mesh {mesh.name} are smaller than 0 - this is impossible to export.")
+    # Sanity checks for meshes with more than 4 ""major"" influences.
+    if top_weights.n_verts_with_extra_major_influences:
+        error.recoverable(f"{top_weights.n_verts_with_extra_major_influences} vertices in mesh {mesh.name} "
+                          f"have more than 4 major influences. "
+                          f"A major influence is a bone with weight greater than {MAJOR_INFLUENCE_WEIGHT}. "
+                          f"The exporter can only export 4 influences per vertex, so animation on this model may "
+                          f"look odd. Turn off Strict Export if this is acceptable.")
+
+    return top_weights.bones, top_weights.weights, top_weights.n_weights
+
+
+def _extract_pos(loop_idxs: np.ndarray, mesh_arrays: MeshLoopArrays, data: np.ndarray):
+    data[:, :3] = mesh_arrays.pos()[loop_idxs]
+    # data[:, 3] = 0
+
+
+def _extract_normals(loop_idxs: np.ndarray, mesh_arrays: MeshLoopArrays,
                      normal_w_layer: Optional[bpy.types.FloatColorAttribute],
                      data: np.ndarray):
     # Pull normal XYZ data out of the mesh loops
-    for (i, loop_idx) in enumerate(loops):
-        n = mesh.loops[loop_idx].normal
-        # Hardcoded (-x, z, y) transposition to go into GMD space
-        data[i, 0] = -n[0]
-        data[i, 1] = n[2]
-        data[i, 2] = n[1]
-        # TODO the old version normalized the normals here?
-        # If we have a W layer, pull the value out of that too. Otherwise it's zero-initialized
-        if normal_w_layer:
-            data[i, 3] = (normal_w_layer.data[loop_idx].color[0] * 2) - 1
-
-
-def _extract_tangents_from_layer(loops: List[MeshLoopIdx], tangent_layer: Optional[bpy.types.FloatColorAttribute],
+    data[:, :3] = mesh_arrays.normals()[loop_idxs]
+    # TODO the old version normalized the normals here?
+    # If we have a W layer, pull the value out of that too. Otherwise it's zero-initialized
+    if normal_w_layer:
+        # Convert from [0, 1] to [-1, 1] in double precision, then round once into the vertex buffer
+        data[:, 3] = (mesh_arrays.color(normal_w_layer)[loop_idxs, 0].astype(np.float64) * 2) - 1
+
+
+def _extract_tangents_from_layer(loop_idxs: np.ndarray, mesh_arrays: MeshLoopArrays,
+                                 tangent_layer: Optional[bpy.types.FloatColorAttribute],
                                  data: np.ndarray):
     if tangent_layer is None:
         return  # Data is zero-initialized
 
     # Copy raw data (in 0..1 range)
-    for (i, loop_idx) in enumerate(loops):
-        # TODO watch out for what happens if data[i] has <4 components
-        data[i] = tangent_layer.data[loop_idx].color
+    data[:] = mesh_arrays.color(tangent_layer)[loop_idxs, :data.shape[1]]
     # Correct data for (-1..1) range
     data *= 2
     data -= 1
 
 
-def _extract_tangents_from_mesh(loops: List[MeshLoopIdx], mesh: bpy.types.Mesh,
+def _extract_tangents_from_mesh(loop_idxs: np.ndarray, mesh_arrays: MeshLoopArrays,
                                 tangent_w_layer: Optional[bpy.types.FloatColorAttribute], data: np.ndarray):
-    # Pull normal XYZ data out of the mesh loops
-    for (i, loop_idx) in enumerate(loops):
-        t = mesh.loops[loop_idx].tangent
-        # Hardcoded (-x, z, y) transposition to go into GMD space
-        data[i, 0] = -t[0]
-        data[i, 1] = t[2]
-        data[i, 2] = t[1]
-        # If we have a W layer, pull the value out of that too. Otherwise it's zero-initialized
-        if tangent_w_layer:
-            data[i, 3] = (tangent_w_layer.data[loop_idx].color[0] * 2) - 1
-
-
-def _extract_from_color(loops: List[MeshLoopIdx], col_layer: Optional[bpy.types.FloatColorAttribute], data: np.ndarray):
+    # Pull tangent XYZ data out of the mesh loops
+    data[:, :3] = mesh_arrays.tangents()[loop_idxs]
+    # If we have a W layer, pull the value out of that too. Otherwise it's zero-initialized
+    if tangent_w_layer:
+        data[:, 3] = (mesh_arrays.color(tangent_w_layer)[loop_idxs, 0].astype(np.float64) * 2) - 1
+
+
+def _extract_from_color(loop_idxs: np.ndarray, mesh_arrays: MeshLoopArrays,
+                        col_layer: Optional[bpy.types.FloatColorAttribute], data: np.ndarray):
     if col_layer is None:
         # Default colors to (1,1,1,1)
         data.fill(1)
     else:
         # Fill in the colors
-        for (i, loop_idx) in enumerate(loops):
-            # TODO watch out for what happens if data[i] has <4 components
-            data[i] = col_layer.data[loop_idx].color
+        data[:] = mesh_arrays.color(col_layer)[loop_idxs, :data.shape[1]]
 
 
-def _extract_bones_from_layer(loops: List[MeshLoopIdx], bone_data_layer: Optional[bpy.types.FloatColorAttribute],
+def _extract_bones_from_layer(loop_idxs: np.ndarray, mesh_arrays: MeshLoopArrays,
+                              bone_data_layer: Optional[bpy.types.FloatColorAttribute],
                               data: np.ndarray):
     if bone_data_layer is None:
         # Bone data will be zero inited
         return
-    for (i, loop_idx) in enumerate(loops):
-        # TODO this is a hack. This assumes the bonedata is always a byte-value.
-        # We should change this so that self.layers actually looks at the associated storage and decides how to encode/decode to 0.1.
-        # data[i] is of type uint8, => we have to premultiply to get into the 0..255 range before storing
-        color = bone_data_layer.data[loop_idx].color
-        data[i, 0] = color[0] * 255
-        data[i, 1] = color[1] * 255
-        data[i, 2] = color[2] * 255
-        data[i, 3] = color[3] * 255
-
-
-def _extract_uv(loops: List[MeshLoopIdx], uv_idx: int, comp_count: int,
+    # TODO this is a hack. This assumes the bonedata is always a byte-value.
+    # We should change this so that self.layers actually looks at the associated storage and decides how to encode/decode to 0.1.
+    # data is of type uint8, => we have to premultiply to get into the 0..255 range before storing.
+    # Multiply in double precision, so values truncate the same way as multiplying Python floats.
+    color = mesh_arrays.color(bone_data_layer)[loop_idxs, :data.shape[1]]
+    data[:] = color.astype(np.float64) * 255
+
+
+def _extract_uv(loop_idxs: np.ndarray, mesh_arrays: MeshLoopArrays, uv_idx: int, comp_count: int,
                 uv_layer: Union[bpy.types.MeshUVLoopLayer, bpy.types.FloatColorAttribute], data: np.ndarray,
                 error: ErrorReporter):
     if uv_layer is None:
         return  # UVs default to 0
     # If component_count == 2 then we should be storing it in a UV layer.
-    # For backwards compatibility, check if the layer actually has a "uv" section
-    if comp_count == 2 and hasattr(uv_layer.data[0], "uv"):
-        for (i, loop_idx) in enumerate(loops):
-            data[i] = uv_layer.data[loop_idx].uv
+    # For backwards compatibility, check if the layer is actually a UV layer
+    if comp_count == 2 and isinstance(uv_layer, bpy.types.MeshUVLoopLayer):
+        data[:] = mesh_arrays.uv(uv_layer)[loop_idxs]
         # Invert Y to go from blender -> GMD
         # NOTE this relies on storing the data as float32 - if it's stored as float16, we'd be doing (1 - f16(x))
         # instead of f16(1 - x), which is sometimes different.
         data[:, 1] = 1.0 - data[:, 1]
     else:
-        for (i, loop_idx) in enumerate(loops):
-            data[i] = uv_layer.data[loop_idx].color[:comp_count]
+        data[:] = mesh_arrays.color(uv_layer)[loop_idxs, :comp_count]
         if np.any((data < 0) | (data > 1)):
             error.recoverable(
                 f"UV{uv_idx} has values outside of 0 and 1. This should never happen.")
 
 
-def _extract_skinned_boneweights(loops: List[MeshLoopIdx], mesh: bpy.types.Mesh,
+def _extract_skinned_boneweights(loop_idxs: np.ndarray, mesh_arrays: MeshLoopArrays,
                                  bone_info: Tuple[np.ndarray, np.ndarray, np.ndarray],
                                  bone_remapper: Optional[Mapping[int, int]],
                                  bone_data: np.ndarray, weight_data: np.ndarray):
     bones, weights, n_weights = bone_info
 
-    vertices = [mesh.loops[l].vertex_index for l in loops]
+    vertices = mesh_arrays.loop_vertex_index[loop_idxs]
     weight_data[:] = weights[vertices, :]
     unmapped_bones = bones[vertices, :]
     if bone_remapper is None:
         np.copyto(bone_data, unmapped_bones, casting="safe")
     else:
-        # Where vertices.weight_data > 0, remap vertices.bone_data with self.relevant_vertex_groups
-        for i in range(len(vertices)):
-            for j in range(4):
-                if weight_data[i, j] > 0:
-                    bone_data[i, j] = bone_remapper[unmapped_bones[i, j]]
-                # Other bone_data elements are 0-initialized
+        # Where vertices.weight_data > 0, remap vertices.bone_data with self.relevant_vertex_groups.
+        # Other bone_data elements are set to 0.
+        lut = build_bone_remap_lut(bone_remapper)
+        bone_data[:] = remap_weighted_bones(unmapped_bones, weight_data, lut)
@@ -1,31 +1,34 @@
 from dataclasses import dataclass
-from typing import List, Dict, Set, Tuple
+from typing import List, Dict, Tuple, Optional
 from typing import cast
 
 import numpy as np
 
 import bpy
-from yk_gmd_blender.blender.exporter.mesh.extractor import compute_vertex_4weights, loop_indices_for_material, \
-    extract_vertices_for_skinned_material, generate_vertex_byteslices, \
-    extract_vertices_for_unskinned_material
+from yk_gmd_blender.blender.exporter.mesh.extractor import compute_vertex_4weights, \
+    extract_vertices_for_skinned_material, generate_packed_vertices, \
+    extract_vertices_for_unskinned_material, MeshLoopArrays
 from yk_gmd_blender.gmdlib.abstract.gmd_attributes import GMDAttributeSet
 from yk_gmd_blender.gmdlib.abstract.gmd_mesh import GMDSkinnedMesh, GMDMesh, GMDMeshIndices
 from yk_gmd_blender.gmdlib.abstract.gmd_shader import GMDSkinnedVertexBuffer
 from yk_gmd_blender.gmdlib.abstract.nodes.gmd_bone import GMDBone
 from yk_gmd_blender.gmdlib.errors.error_classes import GMDImportExportError
 from yk_gmd_blender.gmdlib.errors.error_reporter import ErrorReporter
-from yk_gmd_blender.meshlib.export_submeshing import dedupe_loops, \
-    convert_meshloop_tris_to_tsubmeshes, MeshLoopTri, \
-    MeshLoopIdx, DedupedVertIdx, SubmeshTri
+from yk_gmd_blender.meshlib.bone_palettes import triangle_bone_masks, count_mask_bits, partition_by_bone_limit, \
+    mask_to_bones
+from yk_gmd_blender.meshlib.export_submeshing import dedupe_packed_loops, \
+    convert_meshloop_tris_to_tsubmeshes, order_triangles_by_locality, \
+    MeshLoopIdx, DedupedVertIdx, SubmeshTri, SubmeshingStats
 
 
 def split_skinned_blender_mesh_object(context: bpy.types.Context, object: bpy.types.Object,
                                       materials: List[GMDAttributeSet], bone_name_map: Dict[str, GMDBone],
-                                      bone_limit: int,
+                                      bone_limit: int, optimize_vertex_cache: bool, optimize_strips: bool,
                                       error: ErrorReporter) -> List[GMDSkinnedMesh]:
     mesh = prepare_mesh(context, object, check_needs_tangent(materials))
     # Apply all transformations - skinned objects are always located at (0,0,0)
     mesh.transform(object.matrix_world)
+    mesh_arrays = MeshLoopArrays(mesh)
 
     vertex_group_mapping: Dict[int, GMDBone] = {
         i: bone_name_map[group.name]
@@ -35,65 +38,97 @@ def split_skinned_blender_mesh_object(context: bpy.types.Context, object: bpy.ty
 
     bone_info = compute_vertex_4weights(mesh, relevant_vertex_groups=set(vertex_group_mapping.keys()), error=error)
 
-    error.debug("MESH", f"Exporting skinned meshes for {object.name}")
+    # Only spend time collecting submesh stats if they'll be printed
+    stats = SubmeshingStats() if error.debug("MESH", f"Exporting skinned meshes for {object.name}") else None
     skinned_submeshes: List[SkinnedSubmesh] = []
 
+    # Group the triangles by material once, instead of scanning every triangle for each material
+    tris_by_material = mesh_arrays.loop_triangles_by_material(len(materials))
+    # Positions indexed by MeshLoopIdx, shared by every material for ordering triangles by locality
+    loop_positions = mesh_arrays.pos()
     for (attr_set_idx, attr_set) in enumerate(materials):
+        material_tris = tris_by_material[attr_set_idx]
         # Get the set of MeshLoopIdxs that are related to this material
-        loops_with_dupes = loop_indices_for_material(mesh, attr_set_idx)
+        loops_with_dupes = np.unique(material_tris)
         # Generate a vertex buffer with data for all of them
         # Set want_expanded so we get 16-bit bone buffers, which is necessary in case more than 255 bones are relevant
-        base_vertices = extract_vertices_for_skinned_material(mesh, attr_set, loops_with_dupes, bone_info, error)
+        base_vertices = extract_vertices_for_skinned_material(mesh_arrays, attr_set, loops_with_dupes, bone_info, error)
         # Convert them to bytes and deduplicate them
-        vertex_bytes = generate_vertex_byteslices(base_vertices, big_endian=False)
-        deduped_verts, loop_idx_to_deduped_verts_idx = dedupe_loops(loops_with_dupes, vertex_bytes)
+        vertex_bytes = generate_packed_vertices(base_vertices, big_endian=False)
+        deduped_verts, loop_idx_to_deduped_verts_idx = dedupe_packed_loops(
+            loops_with_dupes, vertex_bytes, base_vertices.layout.bytes_per_vertex())
+        if stats is not None:
+            # Count each material's vertices once, so vertices duplicated between submeshes are counted
+            stats.unique_verts += len(deduped_verts)
         # Generate the submeshes
         skinned_submeshes += convert_meshloop_tris_to_skinned_submeshes(
             # Basic info included in every generated submesh
             attr_set,
             base_vertices,
-            # The mesh, so it can determine the vertex groups for each triangle
-            mesh,
+            # The vertex of each mesh loop, so it can determine the vertex groups for each triangle
+            mesh_arrays.loop_vertex_index,
             # Deduped verts and associated mapping from mesh loops
             deduped_verts,
             loop_idx_to_deduped_verts_idx,
             # Relevant triangles
-            [MeshLoopTri(t.loops) for t in mesh.loop_triangles if t.material_index == attr_set_idx],
-            # Per-mesh bone info TODO should use this instead of mesh
+            material_tris,
+            # Per-mesh bone info
             bone_info,
             vertex_group_mapping,
             # Error reporting
             error,
             # Config
-            max_bones_per_submesh=bone_limit
+            max_bones_per_submesh=bone_limit,
+            loop_positions=loop_positions,
+            optimize_vertex_cache=optimize_vertex_cache,
+            stats=stats,
         )
 
-    return [s.build_skinned(mesh, bone_info, error) for s in skinned_submeshes]
+    if stats is not None:
+        error.debug("MESH", f"Split {object.name} into {len(skinned_submeshes)} submeshes: {stats}")
+    return [s.build_skinned(mesh_arrays, bone_info, optimize_strips, error) for s in skinned_submeshes]
 
 
 def split_unskinned_blender_mesh_object(context: bpy.types.Context, object: bpy.types.Object,
-                                        materials: List[GMDAttributeSet], error: ErrorReporter) -> List[GMDMesh]:
+                                        materials: List[GMDAttributeSet], optimize_vertex_cache: bool,
+                                        optimize_strips: bool, error: ErrorReporter) -> List[GMDMesh]:
     mesh = prepare_mesh(context, object, check_needs_tangent(materials))
+    mesh_arrays = MeshLoopArrays(mesh)
 
-    error.debug("MESH", f"Exporting unskinned meshes for {object.name}")
+    # Only spend time collecting submesh stats if they'll be printed
+    stats = SubmeshingStats() if error.debug("MESH", f"Exporting unskinned meshes for {object.name}") else None
     submeshes: List[Submesh] = []
+    # Group the triangles by material once, instead of scanning every triangle for each material
+    tris_by_material = mesh_arrays.loop_triangles_by_material(len(materials))
+    # Positions indexed by MeshLoopIdx, shared by every material for ordering triangles by locality
+    loop_positions = mesh_arrays.pos()
     for (attr_set_idx, attr_set) in enumerate(materials):
+        material_tris = tris_by_material[attr_set_idx]
         # Get the set of MeshLoopIdxs that are related to this material
-        loops_with_dupes = loop_indices_for_material(mesh, attr_set_idx)
+        loops_with_dupes = np.unique(material_tris)
         # Generate a vertex buffer with data for all of them
-        base_vertices = extract_vertices_for_unskinned_material(mesh, attr_set, loops_with_dupes, error)
+        base_vertices = extract_vertices_for_unskinned_material(mesh_arrays, attr_set, loops_with_dupes, error)
         # Convert them to bytes and deduplicate them
-        vertex_bytes = generate_vertex_byteslices(base_vertices, big_endian=False)
-        deduped_verts, loop_idx_to_deduped_verts_idx = dedupe_loops(loops_with_dupes, vertex_bytes)
+        vertex_bytes = generate_packed_vertices(base_vertices, big_endian=False)
+        deduped_verts, loop_idx_to_deduped_verts_idx = dedupe_packed_loops(
+            loops_with_dupes, vertex_bytes, base_vertices.layout.bytes_per_vertex())
+        if stats is not None:
+            # Count each material's vertices once, so vertices duplicated between submeshes are counted
+            stats.unique_verts += len(deduped_verts)
         # Generate the submeshes
         submeshes += convert_meshloop_tris_to_unskinned_submeshes(
             attr_set,
             deduped_verts,
             loop_idx_to_deduped_verts_idx,
-            [MeshLoopTri(t.loops) for t in mesh.loop_triangles if t.material_index == attr_set_idx],
+            material_tris,
+            loop_positions=loop_positions,
+            optimize_vertex_cache=optimize_vertex_cache,
+            stats=stats,
         )
 
-    return [s.build_unskinned(mesh, error) for s in submeshes]
+    if stats is not None:
+        error.debug("MESH", f"Split {object.name} into {len(submeshes)} submeshes: {stats}")
+    return [s.build_unskinned(mesh_arrays, optimize_strips, error) for s in submeshes]
 
 
 def prepare_mesh(context: bpy.types.Context, object: bpy.types.Object, needs_tangent: bool) -> bpy.types.Mesh:
@@ -159,10 +194,10 @@ class Submesh:
         if len(self.verts) > 65536:
             raise RuntimeError("Created a Submesh with more than 65536 vertices.")
 
-    def build_unskinned(self, mesh: bpy.types.Mesh, error: ErrorReporter) -> GMDMesh:
-        vertices = extract_vertices_for_unskinned_material(mesh, self.attr_set, self.verts, error)
+    def build_unskinned(self, mesh_arrays: MeshLoopArrays, optimize_strips: bool, error: ErrorReporter) -> GMDMesh:
+        vertices = extract_vertices_for_unskinned_material(mesh_arrays, self.attr_set, self.verts, error)
 
-        triangles = GMDMeshIndices.from_triangles(self.triangles)
+        triangles = GMDMeshIndices.from_triangles(self.triangles, optimize_strips=optimize_strips)
 
         return GMDMesh(
             empty=False,
@@ -176,13 +211,19 @@ def convert_meshloop_tris_to_unskinned_submeshes(
         attr_set: GMDAttributeSet,
         deduped_verts: List[MeshLoopIdx],
         loop_idx_to_deduped_verts_idx: Dict[MeshLoopIdx, DedupedVertIdx],
-        triangles: List[MeshLoopTri],
+        triangles: np.ndarray,
+        loop_positions: Optional[np.ndarray] = None,
+        optimize_vertex_cache: bool = False,
+        stats: Optional[SubmeshingStats] = None,
 ) -> List[Submesh]:
     return convert_meshloop_tris_to_tsubmeshes(
         deduped_verts,
         loop_idx_to_deduped_verts_idx,
         triangles,
-        lambda loops, triangles: Submesh(attr_set, loops, triangles)
+        lambda loops, triangles: Submesh(attr_set, loops, triangles),
+        loop_positions=loop_positions,
+        optimize_vertex_cache=optimize_vertex_cache,
+        stats=stats,
     )
 
 
@@ -196,13 +237,14 @@ class SkinnedSubmesh(Submesh):
     # A mapping of (local bone index) -> (relevant GMD bone)
     relevant_bones: List[GMDBone]
 
-    def build_skinned(self, mesh: bpy.types.Mesh,
+    def build_skinned(self, mesh_arrays: MeshLoopArrays,
                       bone_info: Tuple[np.ndarray, np.ndarray, np.ndarray],
+                      optimize_strips: bool,
                       error: ErrorReporter, ) -> GMDSkinnedMesh:
-        vertices = extract_vertices_for_skinned_material(mesh, self.attr_set, self.verts, bone_info, error,
+        vertices = extract_vertices_for_skinned_material(mesh_arrays, self.attr_set, self.verts, bone_info, error,
                                                          bone_remapper=self.relevant_vertex_groups)
 
-        triangles = GMDMeshIndices.from_triangles(self.triangles)
+        triangles = GMDMeshIndices.from_triangles(self.triangles, optimize_strips=optimize_strips)
 
         return GMDSkinnedMesh(
             empty=False,
@@ -216,14 +258,17 @@ class SkinnedSubmesh(Submesh):
 def convert_meshloop_tris_to_skinned_submeshes(
         attr_set: GMDAttributeSet,
         base_vertices: GMDSkinnedVertexBuffer,
-        mesh: bpy.types.Mesh,
+        loop_vertex_index: np.ndarray,
         deduped_verts: List[MeshLoopIdx],
         loop_idx_to_deduped_verts_idx: Dict[MeshLoopIdx, DedupedVertIdx],
-        triangles: List[MeshLoopTri],
+        triangles: np.ndarray,
         bone_info: Tuple[np.ndarray, np.ndarray, np.ndarray],
         vertex_group_mapping: Dict[int, GMDBone],
         error: ErrorReporter,
         max_bones_per_submesh=32,
+        loop_positions: Optional[np.ndarray] = None,
+        optimize_vertex_cache: bool = False,
+        stats: Optional[SubmeshingStats] = None,
 ) -> List[SkinnedSubmesh]:
     if max_bones_per_submesh < 12:
         error.fatal(f"Specified MAX_BONES_PER_SUBMESH={max_bones_per_submesh}, which is impossible. "
@@ -231,41 +276,22 @@ def convert_meshloop_tris_to_skinned_submeshes(
 
     vert_groups, weights, n_weights = bone_info
 
-    def find_triangle_vertex_groups(t: MeshLoopTri) -> Set[int]:
-        v0 = mesh.loops[t[0]].vertex_index
-        v1 = mesh.loops[t[1]].vertex_index
-        v2 = mesh.loops[t[2]].vertex_index
-
-        vgs = set(vert_groups[v0, 0:n_weights[v0]])
-        vgs.update(vert_groups[v1, 0:n_weights[v1]])
-        vgs.update(vert_groups[v2, 0:n_weights[v2]])
-        return vgs
-
     # First, partition the triangles into groups that use at most max_bones_per_submesh bones.
     # Don't remap the triangle indices yet
-    triangle_partitions: List[Tuple[
-        List[MeshLoopTri],  # A group of raw Blender triangles
-        Set[int]  # the vertex groups they reference
-    ]] = []
-    pending_tris: List[MeshLoopTri] = []
-    pending_vgs: Set[int] = set()
-    for t in triangles:
-        triangle_vgs = find_triangle_vertex_groups(t)
-        combined_vgs = triangle_vgs.union(pending_vgs)
-
-        if len(combined_vgs) > max_bones_per_submesh:
-            triangle_partitions.append((pending_tris, pending_vgs))
-            pending_tris = [t]
-            pending_vgs = triangle_vgs
-        else:
-            pending_tris.append(t)
-            pending_vgs = combined_vgs
-    if pending_tris or pending_vgs:
-        triangle_partitions.append((pending_tris, pending_vgs))
+    masks, mask_vgs = triangle_bone_masks(loop_vertex_index[triangles], vert_groups, n_weights)
+    # If the triangles need more than one group, order them by locality first.
+    # Nearby triangles tend to use the same bones, so this creates fewer groups with fewer vertices shared between them.
+    if loop_positions is not None and len(triangles) and \
+            count_mask_bits(np.bitwise_or.reduce(masks, axis=0, keepdims=True))[0] > max_bones_per_submesh:
+        tri_order = order_triangles_by_locality(loop_positions[triangles])
+        triangles = triangles[tri_order]
+        masks = masks[tri_order]
 
     skinned_submeshes: List[SkinnedSubmesh] = []
-    for tri_partition, referenced_vgs in triangle_partitions:
+    for start, end, referenced_mask in partition_by_bone_limit(masks, max_bones_per_submesh):
+        tri_partition = triangles[start:end]
         # Second, find the relevant vertex groups and bones for each partition
+        referenced_vgs = mask_to_bones(referenced_mask, mask_vgs).tolist()
         assert len(referenced_vgs) <= max_bones_per_submesh
         relevant_vertex_groups = {
             vg: i
@@ -275,10 +301,6 @@ def convert_meshloop_tris_to_skinned_submeshes(
             vertex_group_mapping[vg]
             for vg in referenced_vgs
         ]
-        expected_vgs: Set[int] = set()
-        for t in tri_partition:
-            expected_vgs.update(find_triangle_vertex_groups(t))
-        assert referenced_vgs == expected_vgs
         # Then run convert_meshloop_tris_to_tsubmeshes to split meshes over the 65535 limit
         # and normalize the blender triangles
         skinned_submeshes += convert_meshloop_tris_to_tsubmeshes(
@@ -287,7 +309,10 @@ def convert_meshloop_tris_to_skinned_submeshes(
             tri_partition,
             lambda loops, triangles: SkinnedSubmesh(attr_set, loops, triangles,
                                                     relevant_vertex_groups=relevant_vertex_groups,
-                                                    relevant_bones=relevant_bones)
+                                                    relevant_bones=relevant_bones),
+            loop_positions=loop_positions,
+            optimize_vertex_cache=optimize_vertex_cache,
+            stats=stats,
         )
 
     return skinned_submeshes
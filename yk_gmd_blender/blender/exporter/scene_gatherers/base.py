@@ -52,6 +52,10 @@ class GMDSceneGathererConfig:
     game: GMDGame
     bounding_box_calc: BoundingBoxCalc
     debug_compare_matrices: bool
+    # Reorder each exported mesh's triangles and vertices for the GPU vertex cache
+    optimize_vertex_cache: bool
+    # Build each exported mesh's triangle strips with the greedy stripifier
+    optimize_strips: bool
 
 
 def name_matches_expected(name, expected):
@@ -391,6 +391,8 @@ class SkinnedGMDSceneGatherer(BaseGMDSceneGatherer):
             try:
                 gmd_meshes = split_skinned_blender_mesh_object(context, object, attribute_sets, self.bone_name_map,
                                                                self.config.bone_limit,
+                                                               self.config.optimize_vertex_cache,
+                                                               self.config.optimize_strips,
                                                                self.error)
             except GMDImportExportError:
                 # Assume GMDImportExportErrors have enough context
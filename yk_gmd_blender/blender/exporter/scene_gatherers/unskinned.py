@@ -160,7 +160,10 @@ class UnskinnedGMDSceneGatherer(BaseGMDSceneGatherer):
                                      f"If you're absolutely sure that this material works for unskinned meshes,"
                                      f"uncheck the 'Assume Skinned' box in the Yakuza Material Properties.")
                 try:
-                    gmd_meshes = split_unskinned_blender_mesh_object(context, object, attribute_sets, self.error)
+                    gmd_meshes = split_unskinned_blender_mesh_object(context, object, attribute_sets,
+                                                                     self.config.optimize_vertex_cache,
+                                                                     self.config.optimize_strips,
+                                                                     self.error)
                     for gmd_mesh in gmd_meshes:
                         gmd_object.add_mesh(gmd_mesh)
                 except GMDImportExportError:
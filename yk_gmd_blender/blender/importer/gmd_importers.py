@@ -66,6 +66,12 @@ class BaseImportGMD:
                                                    "to exactly preserve normals.",
                                        default=True)
 
+    legacy_bmesh_import: BoolProperty(name="[DEBUG] Legacy BMesh Import",
+                                      description="If True, will build meshes vertex-by-vertex with BMesh "
+                                                  "instead of setting whole arrays of data at once. "
+                                                  "This is much slower, and only useful for comparing the results.",
+                                      default=False)
+
     game_enum: EnumProperty(name="Game/Engine Version",
                             description="The Game or Engine version you're importing from."
                                         "If the specific game isn't available, you can select the engine type.",
@@ -114,6 +120,7 @@ class BaseImportGMD:
 
             fuse_vertices=self.fuse_vertices,
             custom_split_normals=self.custom_split_normals,
+            legacy_bmesh_import=self.legacy_bmesh_import,
         )
 
 
@@ -147,6 +154,7 @@ class ImportSkinnedGMD(BaseImportGMD, Operator, ImportHelper):
         layout.prop(self, 'material_naming')
         layout.prop(self, 'fuse_vertices')
         layout.prop(self, 'custom_split_normals')
+        layout.prop(self, 'legacy_bmesh_import')
 
         layout.prop(self, 'import_hierarchy')
         layout.prop(self, 'import_objects')
@@ -235,6 +243,7 @@ class ImportUnskinnedGMD(BaseImportGMD, Operator, ImportHelper):
         layout.prop(self, 'material_naming')
         layout.prop(self, 'fuse_vertices')
         layout.prop(self, 'custom_split_normals')
+        layout.prop(self, 'legacy_bmesh_import')
 
     def execute(self, context):
         error = self.create_logger()
@@ -1,26 +1,31 @@
-import array
-from typing import Union, List, Dict, cast, Tuple, Set
+from typing import Union, List, Dict, cast, Tuple, Set, Optional
+
+import numpy as np
 
 import bmesh
 import bpy.types
 from mathutils import Matrix, Vector
-from yk_gmd_blender.blender.common import AttribSetLayerNames, AttribSetLayers_bmesh
+from yk_gmd_blender.blender.common import AttribSetLayerNames, AttribSetLayers_bmesh, LayerSpec
 from yk_gmd_blender.gmdlib.abstract.gmd_mesh import GMDMesh, GMDSkinnedMesh
 from yk_gmd_blender.gmdlib.abstract.gmd_shader import GMDSkinnedVertexBuffer, GMDVertexBuffer
+from yk_gmd_blender.gmdlib.abstract.nodes.gmd_bone import GMDBone
 from yk_gmd_blender.gmdlib.errors.error_reporter import ErrorReporter
+from yk_gmd_blender.meshlib.mesh_arrays import build_merged_mesh_topology, gather_vertex_data, gather_loop_data, \
+    gmd_to_blender_xyz, deform_weight_triples, normalize_rows, MergedMeshTopology
 from yk_gmd_blender.meshlib.vertex_fusion import vertex_fusion, make_bone_indices_consistent
 
 
-def gmd_meshes_to_bmesh(
-        name: str,
+def _merge_bone_indices(
         gmd_meshes: Union[List[GMDMesh], List[GMDSkinnedMesh]],
-        vertex_group_indices: Dict[str, int],
-        attr_set_material_idx_mapping: Dict[int, int],
-        gmd_to_blender_world: Matrix,
         fuse_vertices: bool,
-        custom_split_normals: bool,
         error: ErrorReporter
-) -> bpy.types.Mesh:
+) -> Tuple[bool, Optional[List[GMDBone]], Union[List[GMDVertexBuffer], List[GMDSkinnedVertexBuffer]]]:
+    """
+    Check gmd_meshes can be merged into a single Blender mesh, and rewrite their bone indices to be consistent
+    if they're skinned.
+
+    :return: (is_skinned, the bones referenced by the vertices if skinned, the vertex buffer for each mesh)
+    """
     if len(gmd_meshes) == 0:
         error.fatal("Called gmd_meshes_to_bmesh with 0 meshes!")
     if len([m for m in gmd_meshes if m.empty]) > 0:
@@ -51,6 +56,219 @@ def gmd_meshes_to_bmesh(
             for m in gmd_meshes
         ]
 
+    return is_skinned, relevant_bones, vertices
+
+
+def _check_tangent_layers(gmd_mesh: GMDMesh, layer_names: Union[AttribSetLayerNames, AttribSetLayers_bmesh],
+                          error: ErrorReporter):
+    if not layer_names.tangent_layer and gmd_mesh.vertices_data.layout.tangent_storage and \
+            layer_names.primary_uv_i is None:
+        error.recoverable(f"Material/shader {gmd_mesh.attribute_set.shader} requires tangents to be calculated, "
+                          f"but doesn't have a primary UV map."
+                          f"This will fail if you try to export it, because Blender calculates tangents from UV maps."
+                          f"If you're OK with this, disable Strict Import and try again")
+
+
+def _loop_layer_data(gmd_mesh: GMDMesh, layer_names: AttribSetLayerNames, error: ErrorReporter) \
+        -> List[Tuple[LayerSpec, str, np.ndarray]]:
+    """
+    Compute the per-vertex values to store in each of a mesh's loop layers, in the order the layers are created.
+    Values are converted to the range Blender stores, e.g. tangents are mapped from [-1, 1] to [0, 1].
+
+    :return: A list of (layer spec, purpose, (N, 2) UV values or (N, 4) color values)
+    """
+    vertices = gmd_mesh.vertices_data
+    layer_data = []
+
+    def pad_to_color(data: np.ndarray) -> np.ndarray:
+        color = np.zeros((len(data), 4), dtype=np.float32)
+        color[:, :data.shape[1]] = data
+        return color
+
+    if layer_names.col0_layer:
+        assert vertices.col0 is not None
+        layer_data.append((layer_names.col0_layer, "Color0", pad_to_color(vertices.col0)))
+    if layer_names.col1_layer:
+        assert vertices.col1 is not None
+        layer_data.append((layer_names.col1_layer, "Color1", pad_to_color(vertices.col1)))
+    if layer_names.weight_data_layer:
+        assert vertices.weight_data is not None
+        layer_data.append((layer_names.weight_data_layer, "WeightData", pad_to_color(vertices.weight_data)))
+    if layer_names.bone_data_layer:
+        assert vertices.bone_data is not None
+        # Divide by 255 to scale to 0..1
+        layer_data.append((layer_names.bone_data_layer, "BoneData", pad_to_color(vertices.bone_data / 255)))
+    # Convert W components and tangents from [-1, 1] to [0, 1]
+    # Not sure why, presumably numbers <0 aren't valid in a color? unsure tho
+    if layer_names.normal_w_layer:
+        assert vertices.normal is not None
+        layer_data.append((layer_names.normal_w_layer, "NormalW", pad_to_color((vertices.normal[:, 3:4] + 1) / 2)))
+    if layer_names.tangent_layer:
+        assert vertices.tangent is not None
+        layer_data.append((layer_names.tangent_layer, "Tangent", pad_to_color((vertices.tangent + 1) / 2)))
+    if layer_names.tangent_w_layer:
+        assert vertices.tangent is not None
+        layer_data.append((layer_names.tangent_w_layer, "TangentW", pad_to_color((vertices.tangent[:, 3:4] + 1) / 2)))
+
+    for uv_i, uv_spec in enumerate(layer_names.uv_layers):
+        original_uv = vertices.uvs[uv_i]
+        if uv_spec.storage.n_comps == 2:
+            uv = np.array(original_uv[:, :2], dtype=np.float32)
+            uv[:, 1] = 1.0 - uv[:, 1]
+            layer_data.append((uv_spec, f"UV{uv_i}", uv))
+        else:
+            if np.any((original_uv < 0) | (original_uv > 1)):
+                error.recoverable(f"Data in UV{uv_i} is outside the range of values Blender can store. "
+                                  f"Expected values between 0 and 1.")
+            layer_data.append((uv_spec, f"UV{uv_i}", pad_to_color(original_uv)))
+
+    return layer_data
+
+
+def _set_loop_layers(mesh: bpy.types.Mesh, gmd_meshes: Union[List[GMDMesh], List[GMDSkinnedMesh]],
+                     topology: MergedMeshTopology, is_skinned: bool, error: ErrorReporter):
+    """
+    Create the loop layers for each mesh's vertex layout, and fill them in for every loop at once.
+    Loops from meshes without a given layer are filled with BMesh's defaults (white for colors, 0 for UVs).
+    """
+    # Layer name -> (is UV layer, per-mesh data)
+    layers: Dict[str, Tuple[bool, List[Optional[np.ndarray]]]] = {}
+    for m_i, gmd_mesh in enumerate(gmd_meshes):
+        layer_names = AttribSetLayerNames.build_from(gmd_mesh.vertices_data.layout, is_skinned)
+        _check_tangent_layers(gmd_mesh, layer_names, error)
+        for spec, purpose, data in _loop_layer_data(gmd_mesh, layer_names, error):
+            if spec.name not in layers:
+                is_uv = data.shape[1] == 2
+                error.debug("MESH", f"Creating {'UV' if is_uv else 'color'} layer {spec.name} "
+                                    f"for {purpose}: storage {spec.storage}")
+                layers[spec.name] = (is_uv, [None] * len(gmd_meshes))
+            layers[spec.name][1][m_i] = data
+
+    for name, (is_uv, mesh_data) in layers.items():
+        if is_uv:
+            uv_layer = mesh.uv_layers.new(name=name)
+            uv_layer.data.foreach_set("uv", gather_loop_data(topology, mesh_data, 2, default=0.0).reshape(-1))
+        else:
+            color_layer = mesh.color_attributes.new(name, 'FLOAT_COLOR', 'CORNER')
+            color_layer.data.foreach_set("color", gather_loop_data(topology, mesh_data, 4, default=1.0).reshape(-1))
+
+
+def gmd_meshes_to_mesh(
+        name: str,
+        gmd_meshes: Union[List[GMDMesh], List[GMDSkinnedMesh]],
+        vertex_group_indices: Dict[str, int],
+        attr_set_material_idx_mapping: Dict[int, int],
+        gmd_to_blender_world: Matrix,
+        fuse_vertices: bool,
+        custom_split_normals: bool,
+        error: ErrorReporter
+) -> bpy.types.Mesh:
+    """
+    Merge GMD meshes into a single Blender mesh.
+    Equivalent to gmd_meshes_to_bmesh, but the mesh is created from flat arrays with foreach_set()
+    instead of creating each vertex, face and loop value through BMesh.
+    """
+    is_skinned, relevant_bones, vertices = _merge_bone_indices(gmd_meshes, fuse_vertices, error)
+
+    # Optionally apply vertex fusion (merging "adjacent" vertices while keeping per-loop data)
+    idx_bufs = [m.triangles.triangle_list for m in gmd_meshes]
+    if fuse_vertices:
+        _, mesh_vtx_idx_to_merged_idx, is_fused = vertex_fusion(idx_bufs, vertices)
+    else:
+        offsets = np.cumsum([0] + [len(buf) for buf in vertices])
+        mesh_vtx_idx_to_merged_idx = [np.arange(offsets[i], offsets[i + 1]) for i in range(len(vertices))]
+        is_fused = None
+    topology = build_merged_mesh_topology(idx_bufs, mesh_vtx_idx_to_merged_idx, is_fused)
+    if topology.n_reset_index_tris:
+        error.recoverable(f"Found {topology.n_reset_index_tris} triangles with an 0xFFFF index inside a "
+                          f"triangle_indices list! That shouldn't happen.")
+
+    overall_mesh = bpy.data.meshes.new(name)
+    error.debug("OBJ", f"\tOverall mesh vert count: {topology.n_vertices}")
+
+    overall_mesh.vertices.add(topology.n_vertices)
+    positions = gmd_to_blender_xyz(gather_vertex_data(topology, [buf.pos for buf in vertices], 3))
+    overall_mesh.vertices.foreach_set("co", positions.reshape(-1))
+
+    n_faces = len(topology.face_verts)
+    overall_mesh.loops.add(n_faces * 3)
+    overall_mesh.loops.foreach_set("vertex_index", topology.face_verts.astype(np.int32).reshape(-1))
+    overall_mesh.polygons.add(n_faces)
+    overall_mesh.polygons.foreach_set("loop_start", np.arange(0, n_faces * 3, 3, dtype=np.int32))
+    if bpy.app.version < (4, 0):
+        # loop_total became read-only in Blender 4.0, and is calculated from loop_start
+        overall_mesh.polygons.foreach_set("loop_total", np.full(n_faces, 3, dtype=np.int32))
+    material_indices = np.array([attr_set_material_idx_mapping[id(m.attribute_set)] for m in gmd_meshes],
+                                dtype=np.int32)
+    overall_mesh.polygons.foreach_set("material_index", material_indices[topology.face_buf])
+    overall_mesh.polygons.foreach_set("use_smooth", np.ones(n_faces, dtype=bool))
+    overall_mesh.update(calc_edges=True)
+
+    _set_loop_layers(overall_mesh, gmd_meshes, topology, is_skinned, error)
+
+    if is_skinned:
+        if relevant_bones is None:
+            error.fatal(f"Mismatch between deform/is_skinned, and the existence of relevant_bones")
+        bone_to_group = np.array([vertex_group_indices[bone.name] for bone in relevant_bones], dtype=np.int64)
+        vertex_idx, group_idx, weights = deform_weight_triples(
+            gather_vertex_data(topology, [buf.bone_data for buf in vertices], 4),
+            gather_vertex_data(topology, [buf.weight_data for buf in vertices], 4),
+            bone_to_group
+        )
+        # Meshes can't store vertex weights without an object, except through BMesh
+        bm = bmesh.new()
+        bm.from_mesh(overall_mesh)
+        deform = bm.verts.layers.deform.new("Vertex Weights")
+        bm.verts.ensure_lookup_table()
+        for v, g, w in zip(vertex_idx.tolist(), group_idx.tolist(), weights.tolist()):
+            bm.verts[v][deform][g] = w
+        bm.to_mesh(overall_mesh)
+        bm.free()
+
+    if custom_split_normals:
+        normals = gmd_to_blender_xyz(gather_vertex_data(topology, [buf.normal for buf in vertices], 3))
+        _set_custom_split_normals(overall_mesh, normals)
+
+    return overall_mesh
+
+
+def _set_custom_split_normals(mesh: bpy.types.Mesh, vertex_normals: np.ndarray):
+    """
+    Use custom split normals on the mesh to ensure the exact normals from the source file are used.
+    vertex_normals is an (N, 3) array with one normal per mesh vertex. They are normalized before use.
+    """
+    # bpy.types.Mesh custom split normals are per-vertex-loop i.e. per face corner,
+    # but every corner of a vertex uses the same normal here so we can set them per-vertex.
+    #
+    # Code for setting split normals is based on the FBX importer:
+    # https://github.com/sobotka/blender-addons/blob/master/io_scene_fbx/import_fbx.py#L1336
+
+    # pre-Blender-4.1 we had to explicitly ask for split normals. Now calling normals_split_custom_set is enough?
+    if bpy.app.version < (4, 1):
+        mesh.create_normals_split()
+
+    # Zero-length normals are left as zero, which tells Blender to use the default normal.
+    mesh.normals_split_custom_set_from_vertices(normalize_rows(vertex_normals))
+
+    # pre-Blender-4.1 we had to enable things like auto-smooth as a magic incantation to make normals work better.
+    if bpy.app.version < (4, 1):
+        mesh.use_auto_smooth = True
+        mesh.free_normals_split()  # Really not sure why we do this, but it doesn't have a visual impact.
+        # Maybe it helps save memory, in which case we should do it.
+
+
+def gmd_meshes_to_bmesh(
+        name: str,
+        gmd_meshes: Union[List[GMDMesh], List[GMDSkinnedMesh]],
+        vertex_group_indices: Dict[str, int],
+        attr_set_material_idx_mapping: Dict[int, int],
+        gmd_to_blender_world: Matrix,
+        fuse_vertices: bool,
+        custom_split_normals: bool,
+        error: ErrorReporter
+) -> bpy.types.Mesh:
+    is_skinned, relevant_bones, vertices = _merge_bone_indices(gmd_meshes, fuse_vertices, error)
+
     # Create the mesh and deform layer (if necessary)
     bm = bmesh.new()
     deform = bm.verts.layers.deform.new("Vertex Weights") if is_skinned else None
@@ -121,11 +339,7 @@ def gmd_meshes_to_bmesh(
     for m_i, gmd_mesh in enumerate(gmd_meshes):
         layers = attr_set_layers[gmd_mesh.vertices_data.layout.packing_flags]
         # Check the layers
-        if not layers.tangent_layer and gmd_mesh.vertices_data.layout.tangent_storage and layers.primary_uv_i is None:
-            error.recoverable(f"Material/shader {gmd_mesh.attribute_set.shader} requires tangents to be calculated, "
-                              f"but doesn't have a primary UV map."
-                              f"This will fail if you try to export it, because Blender calculates tangents from UV maps."
-                              f"If you're OK with this, disable Strict Import and try again")
+        _check_tangent_layers(gmd_mesh, layers, error)
 
         attr_idx = attr_set_material_idx_mapping[id(gmd_mesh.attribute_set)]
 
@@ -228,48 +442,16 @@ def gmd_meshes_to_bmesh(
     error.debug("OBJ", f"\tOverall mesh vert count: {len(bm.verts)}")
     bm.to_mesh(overall_mesh)
 
-    # Use custom split normals on the final mesh to ensure the exact normals from the source file are used here.
-    # We make a few assumptions:
-    # 1. the vertices from bm.verts are in the same order in overall_mesh.vertices
-    # 2. the normals from bm.verts are not modified between setting them and now
-    #
-    # bpy.types.Mesh custom split normals are per-vertex-loop i.e. per face corner.
-    # => for each face corner, look up the original vertex index and use that to determine the new normal.
-    #
-    # Code for setting split normals is based on the FBX importer:
-    # https://github.com/sobotka/blender-addons/blob/master/io_scene_fbx/import_fbx.py#L1336
     if custom_split_normals:
-        # pre-Blender-4.1 we had to explicitly ask for split normals. Now calling normals_split_custom_set is enough?
-        if bpy.app.version < (4, 1):
-            overall_mesh.create_normals_split()
-
-        # clnors = [ vert0normalX, vert0normalY, vert0normalZ, vert1normalX, ...]
-        clnors = array.array('f', [0.0] * (len(overall_mesh.loops) * 3))
-        for i_loop, loop in enumerate(overall_mesh.loops):
-            nor: Vector = bm.verts[loop.vertex_index].normal
-            nor.normalize()
-            clnors[i_loop * 3 + 0] = nor.x
-            clnors[i_loop * 3 + 1] = nor.y
-            clnors[i_loop * 3 + 2] = nor.z
-
-        # This is a really weird setup.
-        # tuple(
-        #   # zip the same iterator three times to create an iter of (float, float, float)
-        #   zip(clnors_iter, clnors_iter, clnors_iter)
-        # ) # expand the iterator of (float, float, float) into a tuple
-        # It creates three references to the same iterator, and zip() goes through them in order
-        # clnors is [x, y, z, x, y, z, ...].
-        # zip() pops values out of the same iterator three times, so pops an x then a y then a z.
-        # zip() then packs those into a tuple and yields it.
-        # The toplevel tuple() creates a tuple-of-(xyz-tuple) from all the (xyz-tuple)s emitted from zip()
-        clnors_iter = iter(clnors)
-        overall_mesh.normals_split_custom_set(tuple(zip(clnors_iter, clnors_iter, clnors_iter)))
-        
-        # pre-Blender-4.1 we had to enable things like auto-smooth as a magic incantation to make normals work better.
-        if bpy.app.version < (4, 1):
-            overall_mesh.use_auto_smooth = True
-            overall_mesh.free_normals_split()  # Really not sure why we do this, but it doesn't have a visual impact.
-            # Maybe it helps save memory, in which case we should do it.
+        # Vertices were added to the BMesh in order, skipping fused vertices
+        vertex_normals = []
+        for i_buf, buf in enumerate(vertices):
+            buf_normals = gmd_to_blender_xyz(buf.normal) if buf.normal is not None \
+                else np.zeros((len(buf), 3), dtype=np.float32)
+            if fuse_vertices:
+                buf_normals = buf_normals[~np.asarray(is_fused[i_buf], dtype=bool)]
+            vertex_normals.append(buf_normals)
+        _set_custom_split_normals(overall_mesh, np.concatenate(vertex_normals))
 
     bm.free()
 
@@ -8,7 +8,7 @@ from typing import Dict, Union
 import bpy
 from mathutils import Vector, Matrix
 from yk_gmd_blender.blender.common import GMDGame
-from yk_gmd_blender.blender.importer.mesh.mesh_importer import gmd_meshes_to_bmesh
+from yk_gmd_blender.blender.importer.mesh.mesh_importer import gmd_meshes_to_bmesh, gmd_meshes_to_mesh
 from yk_gmd_blender.blender.materials import get_yakuza_shader_node_group, get_uv_scaler_node_group, \
     set_yakuza_shader_material_from_attributeset, YakuzaPropertyGroup, RDRT_SHADERS
 from yk_gmd_blender.gmdlib.abstract.gmd_attributes import GMDAttributeSet
@@ -42,6 +42,8 @@ class GMDSceneCreatorConfig:
 
     fuse_vertices: bool
     custom_split_normals: bool
+    # If True, build meshes with gmd_meshes_to_bmesh instead of gmd_meshes_to_mesh
+    legacy_bmesh_import: bool
 
 
 class BaseGMDSceneCreator(abc.ABC):
@@ -115,9 +117,11 @@ class BaseGMDSceneCreator(abc.ABC):
             # Otherwise all attribute sets are mapped to blender material index 0
             attr_set_material_idx_mapping = defaultdict(lambda: 0)
 
-        # If we have any meshes, merge them into an overall BMesh
+        # If we have any meshes, merge them into an overall mesh
         if gmd_node.mesh_list:
-            overall_mesh = gmd_meshes_to_bmesh(
+            gmd_meshes_to_blender_mesh = gmd_meshes_to_bmesh if self.config.legacy_bmesh_import \
+                else gmd_meshes_to_mesh
+            overall_mesh = gmd_meshes_to_blender_mesh(
                 gmd_node.name,
                 gmd_node.mesh_list,
                 vertex_group_indices,
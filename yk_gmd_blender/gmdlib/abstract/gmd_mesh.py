@@ -1,12 +1,14 @@
 import array
 from dataclasses import dataclass
-from typing import List, Optional, Generator, Tuple, Iterable
+from typing import List, Optional, Generator, Tuple, Iterable, Union
 
 import numpy as np
 
 from yk_gmd_blender.gmdlib.abstract.gmd_attributes import GMDAttributeSet
 from yk_gmd_blender.gmdlib.abstract.gmd_shader import GMDVertexBuffer, GMDSkinnedVertexBuffer
 from yk_gmd_blender.gmdlib.abstract.nodes.gmd_bone import GMDBone
+from yk_gmd_blender.meshlib.triangle_strips import triangles_to_array, build_triangle_strips, \
+    build_optimized_triangle_strips
 
 
 def iterate_three(x: array.ArrayType) -> Generator[Tuple[int, int, int], None, None]:
@@ -28,59 +30,28 @@ class GMDMeshIndices:
     triangle_strips_reset: array.ArrayType
 
     @classmethod
-    def from_triangles(cls, triangles: Iterable[Tuple[int, int, int]]) -> 'GMDMeshIndices':
-        triangle_indices = array.array("H")
-        triangle_strip_noreset = array.array("H")
-        triangle_strip_reset = array.array("H")
-
-        for t0, t1, t2 in triangles:
-            triangle_indices.append(t0)
-            triangle_indices.append(t1)
-            triangle_indices.append(t2)
-
-            # If we can continue the strip, do so
-            if not triangle_strip_noreset:
-                # Starting the strip
-                triangle_strip_noreset.append(t0)
-                triangle_strip_noreset.append(t1)
-                triangle_strip_noreset.append(t2)
-            elif (triangle_strip_noreset[-2] == t0 and
-                  triangle_strip_noreset[-1] == t1):
-                # Continue the strip
-                triangle_strip_noreset.append(t2)
-            else:
-                # End previous strip, start new strip
-                # Two extra verts to create a degenerate triangle, signalling the end of the strip
-                triangle_strip_noreset.append(triangle_strip_noreset[-1])
-                triangle_strip_noreset.append(t0)
-                # Add the triangle as normal
-                triangle_strip_noreset.append(t0)
-                triangle_strip_noreset.append(t1)
-                triangle_strip_noreset.append(t2)
-
-            # If we can continue the strip, do so
-            if not triangle_strip_reset:
-                # Starting the strip
-                triangle_strip_reset.append(t0)
-                triangle_strip_reset.append(t1)
-                triangle_strip_reset.append(t2)
-            elif (triangle_strip_reset[-2] == t0 and
-                  triangle_strip_reset[-1] == t1):
-                # Continue the strip
-                triangle_strip_reset.append(t2)
-            else:
-                # End previous strip, start new strip
-                # Reset index signalling the end of the strip
-                triangle_strip_reset.append(0xFFFF)
-                # Add the triangle as normal
-                triangle_strip_reset.append(t0)
-                triangle_strip_reset.append(t1)
-                triangle_strip_reset.append(t2)
+    def from_triangles(cls, triangles: Union[Iterable[Tuple[int, int, int]], np.ndarray],
+                       optimize_strips: bool = False) -> 'GMDMeshIndices':
+        """
+        Build the triangle list and triangle strips for a set of triangles.
+
+        By default, strips are built by joining consecutive triangles which share an edge, in triangle order.
+        If optimize_strips is set, a greedy stripifier is used instead,
+        which usually produces shorter strips with fewer degenerate triangles/reset indices.
+
+        :param triangles: Iterable of (t0, t1, t2) index tuples, or an (N, 3) array.
+        :param optimize_strips: Use the greedy stripifier.
+        """
+        tri_arr = triangles_to_array(triangles)
+        if optimize_strips:
+            strip_noreset, strip_reset = build_optimized_triangle_strips(tri_arr)
+        else:
+            strip_noreset, strip_reset = build_triangle_strips(tri_arr)
 
         return GMDMeshIndices(
-            triangle_indices,
-            triangle_strip_noreset,
-            triangle_strip_reset
+            array.array("H", tri_arr.astype(np.uint16).tobytes()),
+            array.array("H", strip_noreset.tobytes()),
+            array.array("H", strip_reset.tobytes())
         )
 
     @classmethod
@@ -88,7 +59,8 @@ class GMDMeshIndices:
                          triangle_strip_noreset: Optional[array.ArrayType],
                          triangle_strip_reset: Optional[array.ArrayType]):
         if triangle_strip_noreset is None or triangle_strip_reset is None:
-            return GMDMeshIndices.from_triangles(iterate_three(triangle_indices))
+            assert len(triangle_indices) % 3 == 0
+            return GMDMeshIndices.from_triangles(np.frombuffer(triangle_indices, dtype=np.uint16))
         return GMDMeshIndices(
             triangle_indices,
             triangle_strip_noreset,
@@ -1,5 +1,5 @@
-from dataclasses import dataclass
-from typing import Optional, Tuple, List, Sized, Iterable, Set
+from dataclasses import dataclass, field
+from typing import Optional, Tuple, List, Sized, Iterable, Set, TypeVar, Union
 
 import numpy as np
 
@@ -7,6 +7,21 @@ from yk_gmd_blender.meshlib.vertex_buffer import VecStorage, VecCompFmt
 from yk_gmd_blender.gmdlib.errors.error_reporter import ErrorReporter
 
 
+@dataclass(frozen=True)
+class GMDPackedVertexSource:
+    """
+    The packed bytes a GMDVertexBuffer was unpacked from, along with the arrays it was unpacked into.
+    If the buffer still holds exactly those (read-only) arrays, the bytes can be exported instead of re-packing.
+    """
+    layout: 'GMDVertexBufferLayout'
+    big_endian: bool
+    data: memoryview
+    arrays: Tuple[Optional[np.ndarray], ...]
+
+
+TVertexBuffer = TypeVar("TVertexBuffer", bound="GMDVertexBuffer")
+
+
 # Generic representation of a vertex buffer, that can contain "weights" and "bones" separately.
 # Some unskinned objects use the "weights" and "bones" categories for different things, which this supports.
 # This class should be used for all vertex buffer manipulation,
@@ -50,9 +65,56 @@ class GMDVertexBuffer(Sized):
             ],
         )
 
+    # Set by track_packed_source(). Not an __init__ argument, so copies never inherit it.
+    packed_source: Optional[GMDPackedVertexSource] = field(default=None, init=False)
+
     def vertex_count(self):
         return len(self.pos)
 
+    def _arrays(self) -> Tuple[Optional[np.ndarray], ...]:
+        return (self.pos, self.weight_data, self.bone_data, self.normal, self.tangent, self.unk, self.col0, self.col1,
+                *self.uvs)
+
+    def track_packed_source(self, big_endian: bool, data: memoryview):
+        """
+        Remember the packed bytes these vertices were unpacked from, so exporting them can copy the bytes directly.
+        The vertex arrays are made read-only - modifying the vertices requires assigning new arrays,
+        which invalidates the packed source.
+        """
+        arrays = self._arrays()
+        for arr in arrays:
+            if arr is not None:
+                arr.flags.writeable = False
+        self.packed_source = GMDPackedVertexSource(self.layout, big_endian, data, arrays)
+
+    def track_packed_source_of(self: TVertexBuffer, parent: 'GMDVertexBuffer', s: slice) -> TVertexBuffer:
+        """
+        If these vertices were copied from parent[s] and parent has a packed source, track the matching slice of it.
+        :return: self
+        """
+        parent_source = parent.packed_source
+        if parent_source is not None:
+            start, stop, _ = s.indices(len(parent))
+            bytes_per_vertex = parent_source.layout.bytes_per_vertex()
+            self.track_packed_source(parent_source.big_endian,
+                                     parent_source.data[start * bytes_per_vertex:stop * bytes_per_vertex])
+        return self
+
+    def get_packed_source(self, big_endian: bool) -> Optional[memoryview]:
+        """
+        Get the packed bytes these vertices were unpacked from,
+        or None if there aren't any or the vertices may have changed since.
+        """
+        source = self.packed_source
+        if source is None or source.big_endian != big_endian or source.layout != self.layout:
+            return None
+        arrays = self._arrays()
+        if len(arrays) != len(source.arrays) or any(a is not b for a, b in zip(arrays, source.arrays)):
+            return None
+        if any(arr.flags.writeable for arr in arrays if arr is not None):
+            return None
+        return source.data
+
     def __len__(self):
         return self.vertex_count()
 
@@ -435,7 +497,7 @@ class GMDVertexBufferLayout:
         return self.numpy_dtype(False).itemsize
 
     def unpack_from(self, big_endian: bool, vertex_count: int,
-                    data: bytes, offset: int) -> Tuple[GMDVertexBuffer, int]:
+                    data: Union[bytes, memoryview], offset: int) -> Tuple[GMDVertexBuffer, int]:
         numpy_dtype = self.numpy_dtype(big_endian)
         vertices_np = np.frombuffer(data, numpy_dtype, count=vertex_count, offset=offset)
         offset += vertex_count * numpy_dtype.itemsize
@@ -466,9 +528,34 @@ class GMDVertexBufferLayout:
         return vertices, offset
 
     def pack_into(self, big_endian: bool, vertices: GMDVertexBuffer, append_to: bytearray):
-        numpy_dtype = self.numpy_dtype(big_endian)
-        vertices_np = np.zeros(len(vertices), numpy_dtype)
+        vertices_np = np.zeros(len(vertices), self.numpy_dtype(big_endian))
+        self._store_vertices(big_endian, vertices, vertices_np)
+        append_to += vertices_np.tobytes()
+
+    def pack_into_buffer(self, big_endian: bool, vertices: GMDVertexBuffer, buffer: bytearray, offset: int) -> int:
+        """
+        Pack vertices directly into a preallocated buffer, without creating an intermediate copy.
+        The buffer must have space for len(vertices) * bytes_per_vertex() bytes after offset,
+        and that space should be zeroed.
+        If the vertices are unchanged since they were unpacked (see GMDVertexBuffer.track_packed_source),
+        their original bytes are copied instead of packing them again.
 
+        :return: The offset immediately after the packed vertices.
+        """
+        numpy_dtype = self.numpy_dtype(big_endian)
+        if len(vertices) == 0:
+            return offset
+        packed_source = vertices.get_packed_source(big_endian)
+        if packed_source is not None and vertices.layout == self and \
+                len(packed_source) == len(vertices) * numpy_dtype.itemsize:
+            # The vertices are unchanged since they were unpacked, so reuse the original bytes
+            buffer[offset:offset + len(packed_source)] = packed_source
+            return offset + len(packed_source)
+        vertices_np = np.frombuffer(buffer, numpy_dtype, count=len(vertices), offset=offset)
+        self._store_vertices(big_endian, vertices, vertices_np)
+        return offset + len(vertices) * numpy_dtype.itemsize
+
+    def _store_vertices(self, big_endian: bool, vertices: GMDVertexBuffer, vertices_np: np.ndarray):
         def store_data(name: str, storage: Optional[VecStorage], data: Optional[np.ndarray]):
             nonlocal vertices_np
             if storage is None or data is None:
@@ -488,8 +575,6 @@ class GMDVertexBufferLayout:
         for (i, (s, d)) in enumerate(zip(self.uv_storages, vertices.uvs)):
             store_data(f"uv{i}", s, d)
 
-        append_to += vertices_np.tobytes()
-
 
 # Shaders are external dependencies, so they are frozen. You can't change the name of a shader, for example.
 @dataclass(frozen=True)
@@ -0,0 +1,244 @@
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from enum import Enum
+from pathlib import Path
+from typing import List, Optional, Iterable, Callable, Set, Tuple, cast
+
+from yk_gmd_blender.gmdlib.converters.common.to_abstract import FileImportMode, VertexImportMode
+from yk_gmd_blender.gmdlib.errors.error_classes import GMDImportExportError
+from yk_gmd_blender.gmdlib.errors.error_reporter import ErrorReporter, RecordingErrorReporter
+from yk_gmd_blender.gmdlib.io import read_gmd_structures, read_abstract_scene_from_filedata_object, \
+    check_version_writeable, pack_abstract_scene, pack_file_data, write_file_data
+
+
+class BatchOperation(Enum):
+    # Read the file structures and build the abstract scene
+    IMPORT = 0
+    # IMPORT, then pack the abstract scene back into a file
+    IMPORT_EXPORT = 1
+
+
+# Derived from BaseException so that it passes through "except Exception" handlers in the importer,
+# e.g. FilePacker wrapping errors in FileUnpackError, and reaches _process_file.
+class BatchTimeoutError(BaseException):
+    pass
+
+
+@dataclass(frozen=True)
+class BatchFileResult:
+    path: Path
+    # None if the file was processed successfully, otherwise the fatal error message
+    error: Optional[str]
+    timed_out: bool
+    # Seconds spent processing the file, measured in the worker
+    duration: float
+    recoverable_msgs: List[str] = field(default_factory=list)
+    info_msgs: List[str] = field(default_factory=list)
+    # (category, message) for each debug message
+    debug_msgs: List[Tuple[str, str]] = field(default_factory=list)
+    # Size of the re-exported file, if exporting
+    output_size: Optional[int] = None
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class BatchResults:
+    # In the order the files were processed, i.e. smallest first if sorted by size
+    results: List[BatchFileResult]
+    # Wall-clock seconds for the whole batch
+    duration: float
+
+    @property
+    def succeeded(self) -> List[BatchFileResult]:
+        return [r for r in self.results if r.success]
+
+    @property
+    def failed(self) -> List[BatchFileResult]:
+        return [r for r in self.results if not r.success]
+
+    def report(self, error: ErrorReporter):
+        """
+        Forward every file's messages to an ErrorReporter, followed by a summary.
+        Failed files are reported as recoverable errors, so every failure is reported before a strict reporter stops.
+        """
+        for result in self.results:
+            for category, msg in result.debug_msgs:
+                error.debug(category, f"{result.path}: {msg}")
+            for msg in result.info_msgs:
+                error.info(f"{result.path}: {msg}")
+            for msg in result.recoverable_msgs:
+                error.recoverable(f"{result.path}: {msg}")
+        for result in self.failed:
+            error.recoverable(f"{result.path} failed{' (timed out)' if result.timed_out else ''}: {result.error}")
+        error.info(f"Processed {len(self.results)} files in {self.duration:.2f}s: "
+                   f"{len(self.succeeded)} succeeded, {len(self.failed)} failed")
+
+
+@dataclass(frozen=True)
+class _BatchTask:
+    path: Path
+    operation: BatchOperation
+    file_import_mode: FileImportMode
+    vertex_import_mode: VertexImportMode
+    output_path: Optional[Path]
+    timeout: Optional[float]
+    strict: bool
+    debug_categories: Set[str]
+
+
+def is_skinned_by_path(path: Path) -> bool:
+    """
+    Default check for whether a file should be imported as skinned, following the test setup:
+    files in a folder whose name contains "-Skinned" are skinned.
+    """
+    return "-Skinned" in path.parent.name
+
+
+def find_gmd_files(root: Path) -> List[Path]:
+    return list(Path(root).glob("**/*.gmd"))
+
+
+def _raise_timeout(signum, frame):
+    raise BatchTimeoutError()
+
+
+def _process_file(task: _BatchTask) -> BatchFileResult:
+    error = RecordingErrorReporter(strict=task.strict, allowed_categories=task.debug_categories)
+
+    # Timeouts are enforced inside the worker, so the worker can carry on with the next file afterwards.
+    # This requires SIGALRM, which isn't available on Windows - there, timeouts are ignored.
+    # Signal handlers can only be set from the main thread.
+    use_alarm = hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+    alarm_timeout = task.timeout if use_alarm else None
+    if alarm_timeout:
+        old_handler = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, alarm_timeout)
+
+    start = time.perf_counter()
+    error_msg = None
+    timed_out = False
+    output_size = None
+    try:
+        version_props, header, file_data = read_gmd_structures(task.path, error)
+        scene = read_abstract_scene_from_filedata_object(version_props, task.file_import_mode,
+                                                         task.vertex_import_mode, file_data, error)
+
+        if task.operation == BatchOperation.IMPORT_EXPORT:
+            check_version_writeable(version_props, error)
+            new_file_data = pack_abstract_scene(version_props, file_data.file_is_big_endian(),
+                                                file_data.vertices_are_big_endian(), scene, file_data, error)
+            if task.output_path:
+                task.output_path.parent.mkdir(parents=True, exist_ok=True)
+                output_size = write_file_data(version_props, new_file_data, task.output_path, error)
+            else:
+                output_size = len(pack_file_data(version_props, new_file_data, error))
+    except BatchTimeoutError:
+        timed_out = True
+        error_msg = f"Timed out after {task.timeout}s"
+    except GMDImportExportError as e:
+        error_msg = str(e)
+    except Exception as e:
+        # Unexpected errors shouldn't take down the rest of the batch
+        error_msg = f"{type(e).__name__}: {e}"
+    finally:
+        if alarm_timeout:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, old_handler)
+
+    return BatchFileResult(
+        path=task.path,
+        error=error_msg,
+        timed_out=timed_out,
+        duration=time.perf_counter() - start,
+        recoverable_msgs=error.recoverable_msgs,
+        info_msgs=error.info_msgs,
+        debug_msgs=error.debug_msgs,
+        output_size=output_size,
+    )
+
+
+def run_batch(paths: Iterable[Path], operation: BatchOperation,
+              vertex_import_mode: VertexImportMode = VertexImportMode.IMPORT_VERTICES,
+              is_skinned: Callable[[Path], bool] = is_skinned_by_path,
+              output_dir: Optional[Path] = None,
+              workers: Optional[int] = None,
+              timeout: Optional[float] = None,
+              sort_by_size: bool = True,
+              strict: bool = False,
+              debug_categories: Optional[Set[str]] = None,
+              on_result: Optional[Callable[[BatchFileResult], None]] = None) -> BatchResults:
+    """
+    Import (and optionally re-export) many GMD files in parallel.
+
+    :param paths: GMD files to process.
+    :param operation: Whether to only import files, or to import and re-export them.
+    :param vertex_import_mode: Vertex import mode for each file.
+    :param is_skinned: Decides if a file is imported as skinned. Evaluated in this process, so it doesn't need to be
+    picklable.
+    :param output_dir: If exporting, re-exported files are written to output_dir / <parent folder name> / <file name>.
+    :param workers: Number of worker processes, defaults to the CPU count. If <= 1, files are processed in this process.
+    :param timeout: Per-file timeout in seconds. Only enforced on platforms with SIGALRM.
+    :param sort_by_size: Process the smallest files first, to get quick files out of the way.
+    :param strict: Treat recoverable errors in each file as fatal for that file.
+    :param debug_categories: Debug categories to record for each file.
+    :param on_result: Called in this process with each result as soon as it's available.
+    :return: The results for every file, in processing order.
+    """
+    paths = list(paths)
+    if sort_by_size:
+        paths.sort(key=os.path.getsize)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if debug_categories is None:
+        debug_categories = set()
+
+    tasks = [
+        _BatchTask(
+            path=path,
+            operation=operation,
+            file_import_mode=FileImportMode.SKINNED if is_skinned(path) else FileImportMode.UNSKINNED,
+            vertex_import_mode=vertex_import_mode,
+            output_path=(output_dir / path.parent.name / path.name) if output_dir else None,
+            timeout=timeout,
+            strict=strict,
+            debug_categories=debug_categories,
+        )
+        for path in paths
+    ]
+
+    start = time.perf_counter()
+    results: List[Optional[BatchFileResult]] = [None] * len(tasks)
+    if workers <= 1:
+        for i, task in enumerate(tasks):
+            result = _process_file(task)
+            results[i] = result
+            if on_result:
+                on_result(result)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Submitted in order, so the pool picks up files in order of size
+            futures = {executor.submit(_process_file, task): i for i, task in enumerate(tasks)}
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # e.g. the worker process died
+                    result = BatchFileResult(path=tasks[i].path, error=f"{type(e).__name__}: {e}",
+                                             timed_out=False, duration=0.0)
+                results[i] = result
+                if on_result:
+                    on_result(result)
+
+    # Every task has a result by now
+    return BatchResults(
+        results=cast(List[BatchFileResult], results),
+        duration=time.perf_counter() - start
+    )
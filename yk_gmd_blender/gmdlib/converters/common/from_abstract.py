@@ -1,8 +1,11 @@
+import array
 import functools
 import re
 from dataclasses import dataclass
 from typing import TypeVar, Tuple, List, Dict, Iterable, Callable, Set, Union
 
+import numpy as np
+
 from mathutils import Matrix
 from yk_gmd_blender.structurelib.base import FixedSizeArrayUnpacker
 from yk_gmd_blender.structurelib.primitives import c_uint16
@@ -15,6 +18,7 @@ from yk_gmd_blender.gmdlib.abstract.nodes.gmd_node import GMDNode
 from yk_gmd_blender.gmdlib.abstract.nodes.gmd_object import GMDSkinnedObject, GMDUnskinnedObject
 from yk_gmd_blender.gmdlib.errors.error_reporter import ErrorReporter
 from yk_gmd_blender.gmdlib.structure.common.checksum_str import ChecksumStrStruct
+from yk_gmd_blender.gmdlib.structure.common.mesh import IndicesStruct
 from yk_gmd_blender.gmdlib.structure.common.node import NodeStackOp
 
 
@@ -97,6 +101,56 @@ def pack_mesh_matrix_strings(mesh_matrixlist: List[Tuple[int, ...]],
     return bytes(matrixlist_bytearray), matrixlist_index
 
 
+class IndexBufferBuilder:
+    """
+    Assembles the index data for every mesh into one uint16 array.
+
+    Index streams are queued with add(), which returns the IndicesStruct for where they will end up,
+    and build() copies them all into a single preallocated array.
+    The per-mesh min_index offset and the range check are applied to the whole buffer at once.
+    """
+    _streams: List[np.ndarray]
+    _min_indices: List[int]
+    _length: int
+
+    def __init__(self):
+        self._streams = []
+        self._min_indices = []
+        self._length = 0
+
+    def add(self, indices: Union[array.ArrayType, np.ndarray], min_index: int = 0) -> IndicesStruct:
+        """
+        Queue a stream of indices, which will have min_index added to every index apart from 0xFFFF (strip reset).
+        """
+        stream = np.asarray(indices, dtype=np.uint16)
+        indices_struct = IndicesStruct(index_offset=self._length, index_count=len(stream))
+        self._streams.append(stream)
+        self._min_indices.append(min_index)
+        self._length += len(stream)
+        return indices_struct
+
+    def build(self, error: ErrorReporter) -> np.ndarray:
+        index_buffer = np.empty(self._length, dtype=np.uint16)
+        offset = 0
+        for stream in self._streams:
+            index_buffer[offset:offset + len(stream)] = stream
+            offset += len(stream)
+
+        if any(self._min_indices):
+            lengths = [len(stream) for stream in self._streams]
+            min_index_per_index = np.repeat(np.array(self._min_indices, dtype=np.uint32), lengths)
+            offset_indices = index_buffer + min_index_per_index
+            not_reset = index_buffer != 0xFFFF
+            out_of_range = not_reset & (offset_indices > 0xFFFF)
+            if out_of_range.any():
+                bad = int(np.argmax(out_of_range))
+                error.fatal(f"Index {index_buffer[bad]} + min_index {min_index_per_index[bad]} at position {bad} "
+                            f"of the index buffer doesn't fit in 16 bits")
+            np.copyto(index_buffer, offset_indices, casting="unsafe", where=not_reset)
+
+        return index_buffer
+
+
 def generate_vertex_layout_packing_flags(layout: GMDVertexBufferLayout) -> int:
     return layout.packing_flags
 
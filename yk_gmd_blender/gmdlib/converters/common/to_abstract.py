@@ -5,6 +5,7 @@ import time
 from enum import Enum
 from typing import List, Tuple, cast, Union, TypeVar, Generic, Optional
 
+import numpy as np
 from mathutils import Matrix
 from yk_gmd_blender.gmdlib.abstract.gmd_attributes import GMDAttributeSet, GMDUnk14, GMDUnk12, GMDMaterial
 from yk_gmd_blender.gmdlib.abstract.gmd_mesh import GMDMesh, GMDSkinnedMesh, GMDMeshIndices
@@ -58,6 +59,9 @@ class VertexImportMode(Enum):
     # This is helpful in situations where the data is unnecessary,
     # such as imports for the sake of exporting-over
     NO_VERTICES = 1
+    # Import vertices as read-only arrays that remember the bytes they were unpacked from.
+    # When the scene is exported again, meshes whose vertices weren't replaced copy those bytes instead of re-packing.
+    IMPORT_VERTICES_FOR_REEXPORT = 2
 
 
 class GMDAbstractor_Common(abc.ABC, Generic[TFileData]):
@@ -87,7 +91,7 @@ class GMDAbstractor_Common(abc.ABC, Generic[TFileData]):
 
     def build_vertex_buffers_from_structs(self,
 
-                                          vertex_layout_arr: List[VertexBufferLayoutStruct], vertex_bytes: bytes,
+                                          vertex_layout_arr: List[VertexBufferLayoutStruct], vertex_bytes: Union[bytes, memoryview],
 
                                           profile: bool = False) \
             -> List[GMDVertexBuffer]:
@@ -112,9 +116,16 @@ class GMDAbstractor_Common(abc.ABC, Generic[TFileData]):
                 # Actually unpack vertices
                 unpack_start = time.time()
 
+                vertex_bytes_start = vertex_bytes_offset
                 abstract_vertex_buffer, vertex_bytes_offset = \
                     abstract_layout.unpack_from(self.vertices_are_big_endian, layout_struct.vertex_count,
                                                 vertex_bytes, vertex_bytes_offset)
+                if self.vertex_import_mode == VertexImportMode.IMPORT_VERTICES_FOR_REEXPORT:
+                    # Per-mesh copies of this buffer take their packed source from here
+                    abstract_vertex_buffer.track_packed_source(
+                        self.vertices_are_big_endian,
+                        memoryview(vertex_bytes)[vertex_bytes_start:vertex_bytes_offset]
+                    )
 
                 unpack_finish = time.time()
 
@@ -306,7 +317,8 @@ class GMDAbstractor_Common(abc.ABC, Generic[TFileData]):
                                   abstract_vertex_buffers: List[GMDVertexBuffer],
                                   abstract_nodes_ordered: List[GMDNode],
 
-                                  mesh_arr: List[MeshStruct], index_buffer: List[int], mesh_matrix_bytestrings: bytes,
+                                  mesh_arr: List[MeshStruct], index_buffer: Union[List[int], np.ndarray],
+                                  mesh_matrix_bytestrings: bytes,
                                   bytestrings_are_16bit: bool,
                                   ) \
             -> List[Union[GMDSkinnedMesh, GMDMesh]]:
@@ -315,6 +327,9 @@ class GMDAbstractor_Common(abc.ABC, Generic[TFileData]):
 
         # TODO: Check if uses_relative_indices and not(uses_min_index), that should error?
 
+        # Each mesh takes slices of this array, so convert it once
+        index_buffer_np = np.asarray(index_buffer, dtype=np.uint16)
+
         def read_bytestring(start_byte: int, length: int):
             if (not mesh_matrix_bytestrings) or (length == 0):
                 return []
@@ -347,11 +362,29 @@ class GMDAbstractor_Common(abc.ABC, Generic[TFileData]):
             if indices_range.index_count == 0:
                 return None, min_index, max_index
 
+            # A view into the index buffer, not a copy
+            indices = index_buffer_np[index_ptr_min:index_ptr_max]
+            if len(indices) != indices_range.index_count:
+                self.error.fatal(
+                    f"Mesh index range [{index_ptr_min}, {index_ptr_max}) goes outside the index buffer, "
+                    f"which has {len(index_buffer_np)} indices")
+
+            if ignore_FFFF:
+                is_index = indices != 0xFFFF
+                real_indices = indices[is_index]
+            else:
+                is_index = None
+                real_indices = indices
+            # Update min/max absolute index values
+            if len(real_indices):
+                min_index = min(min_index, int(real_indices.min()))
+                max_index = max(max_index, int(real_indices.max()))
+
             if file_uses_relative_indices:
                 index_offset = 0
             else:
                 # Look through the range and find the smallest index, take everything relative to that.
-                smallest_index = min(index_buffer[i] for i in range(index_ptr_min, index_ptr_max))
+                smallest_index = int(indices.min())
                 if file_uses_min_index:
                     index_offset = mesh_struct.min_index
                     if mesh_struct.min_index > smallest_index:
@@ -363,18 +396,17 @@ class GMDAbstractor_Common(abc.ABC, Generic[TFileData]):
                 else:
                     index_offset = smallest_index
 
-            indices = array.array("H")
-            for i in range(index_ptr_min, index_ptr_max):
-                index = index_buffer[i]
-                if not (ignore_FFFF and index == 0xFFFF):
-                    # Update min/max absolute index values
-                    min_index = min(min_index, index)
-                    max_index = max(max_index, index)
-
-                    index = index - index_offset
+            if index_offset != 0:
+                # Subtract in a wider type, so underflow can be detected
+                shifted = indices.astype(np.int32) - index_offset
+                if is_index is not None:
+                    # Reset indices are left as-is
+                    shifted = np.where(is_index, shifted, 0xFFFF)
+                if len(shifted) and shifted.min() < 0:
+                    self.error.fatal(f"Index offset {index_offset} is larger than the smallest index in the mesh")
+                indices = shifted.astype(np.uint16)
 
-                indices.append(index)
-            return indices, min_index, max_index
+            return array.array("H", indices.tobytes()), min_index, max_index
 
         meshes = []
         for mesh_struct in mesh_arr:
@@ -454,7 +486,8 @@ class GMDAbstractor_Common(abc.ABC, Generic[TFileData]):
 
                     relevant_bones=cast(List[GMDBone], relevant_bones),
 
-                    vertices_data=vertex_buffer.copy_as_skinned(vertex_slice),
+                    vertices_data=vertex_buffer.copy_as_skinned(vertex_slice).track_packed_source_of(
+                        vertex_buffer, vertex_slice),
 
                     triangles=triangles,
 
@@ -464,7 +497,8 @@ class GMDAbstractor_Common(abc.ABC, Generic[TFileData]):
                 meshes.append(GMDMesh(
                     empty=(self.vertex_import_mode == VertexImportMode.NO_VERTICES),
 
-                    vertices_data=vertex_buffer.copy_as_generic(vertex_slice),
+                    vertices_data=vertex_buffer.copy_as_generic(vertex_slice).track_packed_source_of(
+                        vertex_buffer, vertex_slice),
 
                     triangles=triangles,
 
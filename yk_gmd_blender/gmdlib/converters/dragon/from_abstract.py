@@ -7,7 +7,7 @@ from yk_gmd_blender.gmdlib.abstract.gmd_scene import GMDScene
 from yk_gmd_blender.gmdlib.abstract.nodes.gmd_bone import GMDBone
 from yk_gmd_blender.gmdlib.abstract.nodes.gmd_object import GMDUnskinnedObject, GMDBoundingBox
 from yk_gmd_blender.gmdlib.converters.common.from_abstract import RearrangedData, arrange_data_for_export, \
-    pack_mesh_matrix_strings
+    pack_mesh_matrix_strings, IndexBufferBuilder
 from yk_gmd_blender.gmdlib.converters.yk1.from_abstract import yk1_bounds_from_gmd
 from yk_gmd_blender.gmdlib.errors.error_reporter import ErrorReporter
 from yk_gmd_blender.gmdlib.structure.common.checksum_str import ChecksumStrStruct
@@ -116,8 +116,13 @@ def pack_abstract_contents_Dragon(version_properties: VersionProperties, file_bi
         ))
 
     vertex_buffer_arr = []
-    vertex_data_bytearray = bytearray()
-    index_buffer = []
+    # Allocate the vertex data for every buffer up front, so each mesh is packed straight into its place
+    vertex_data_bytearray = bytearray(sum(
+        gmd_buffer_layout.bytes_per_vertex() * sum(m.vertices_data.vertex_count() for m in meshes_for_buffer)
+        for gmd_buffer_layout, _, meshes_for_buffer in rearranged_data.vertex_layout_groups
+    ))
+    vertex_data_offset = 0
+    index_buffer = IndexBufferBuilder()
     # Dict of GMDMesh id -> (buffer_id, vertex_offset_from_index, min_index, vertex_count)
     mesh_buffer_stats = {}
     for buffer_idx, (gmd_buffer_layout, packing_flags, meshes_for_buffer) in enumerate(
@@ -132,7 +137,7 @@ def pack_abstract_contents_Dragon(version_properties: VersionProperties, file_bi
             vertex_packing_flags=packing_flags,
             bytes_per_vertex=gmd_buffer_layout.bytes_per_vertex(),
 
-            vertex_data_offset=len(vertex_data_bytearray),
+            vertex_data_offset=vertex_data_offset,
             vertex_data_length=buffer_vertex_count * gmd_buffer_layout.bytes_per_vertex(),
         ))
 
@@ -159,9 +164,11 @@ def pack_abstract_contents_Dragon(version_properties: VersionProperties, file_bi
             elif vertex_offset_from_index > 4294967295:
                 error.fatal(f"Encountered a vertex_offset_from_index greater than 32bit, needs")
 
+            if gmd_mesh.vertices_data.layout.bytes_per_vertex() != gmd_buffer_layout.bytes_per_vertex():
+                error.fatal(f"Mesh for {node.name} has a different vertex size to the vertex buffer it's packed into")
             try:
-                gmd_mesh.vertices_data.layout.pack_into(vertices_big_endian, gmd_mesh.vertices_data,
-                                                        vertex_data_bytearray)
+                vertex_data_offset = gmd_mesh.vertices_data.layout.pack_into_buffer(
+                    vertices_big_endian, gmd_mesh.vertices_data, vertex_data_bytearray, vertex_data_offset)
             except PackingValidationError as e:
                 error.fatal(f"Error while packing a mesh for {node.name}: {e}")
 
@@ -186,35 +193,14 @@ def pack_abstract_contents_Dragon(version_properties: VersionProperties, file_bi
         else:
             matrix_list = []
 
-        if version_properties.relative_indices_used:
-            pack_index = lambda x: x
-        else:
-            pack_index = lambda x: 0xFFFF if x == 0xFFFF else (x + min_index)
+        # Relative indices are stored as-is, otherwise each index is offset by min_index
+        index_min = 0 if version_properties.relative_indices_used else min_index
 
-        # Set up the pointer for the next set of indices
-        triangle_indices = IndicesStruct(
-            index_offset=len(index_buffer),
-            index_count=len(gmd_mesh.triangles.triangle_list)
-        )
-        # then add them to the data
-        index_buffer += [pack_index(x) for x in gmd_mesh.triangles.triangle_list]
+        triangle_indices = index_buffer.add(gmd_mesh.triangles.triangle_list, index_min)
 
         if old_file_had_triangle_strips:
-            # Set up the pointer for the next set of indices
-            triangle_strip_noreset_indices = IndicesStruct(
-                index_offset=len(index_buffer),
-                index_count=len(gmd_mesh.triangles.triangle_strips_noreset)
-            )
-            # then add them to the data
-            index_buffer += [pack_index(x) for x in gmd_mesh.triangles.triangle_strips_noreset]
-
-            # Set up the pointer for the next set of indices
-            triangle_strip_reset_indices = IndicesStruct(
-                index_offset=len(index_buffer),
-                index_count=len(gmd_mesh.triangles.triangle_strips_reset)
-            )
-            # then add them to the data
-            index_buffer += [pack_index(x) for x in gmd_mesh.triangles.triangle_strips_reset]
+            triangle_strip_noreset_indices = index_buffer.add(gmd_mesh.triangles.triangle_strips_noreset, index_min)
+            triangle_strip_reset_indices = index_buffer.add(gmd_mesh.triangles.triangle_strips_reset, index_min)
         else:
             triangle_strip_noreset_indices = IndicesStruct(0, 0)
             triangle_strip_reset_indices = IndicesStruct(0, 0)
@@ -365,11 +351,12 @@ def pack_abstract_contents_Dragon(version_properties: VersionProperties, file_bi
         material_arr=material_arr,
         matrix_arr=rearranged_data.ordered_matrices,
         vertex_buffer_arr=vertex_buffer_arr,
-        vertex_data=bytes(vertex_data_bytearray),
+        # Use a view instead of copying to bytes, FilePacker accepts both
+        vertex_data=memoryview(vertex_data_bytearray).toreadonly(),
         texture_arr=ordered_texture_arr,  # DRAGON ENGINE DIFFERENCE
         shader_arr=rearranged_data.shader_names,
         node_name_arr=rearranged_data.node_names,
-        index_data=index_buffer,
+        index_data=index_buffer.build(error),
         object_drawlist_bytes=bytes(drawlist_bytearray),
         mesh_matrixlist_bytes=packed_mesh_matrixlists,
 
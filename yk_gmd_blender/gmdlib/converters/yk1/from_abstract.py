@@ -5,11 +5,10 @@ from yk_gmd_blender.gmdlib.abstract.gmd_scene import GMDScene
 from yk_gmd_blender.gmdlib.abstract.nodes.gmd_bone import GMDBone
 from yk_gmd_blender.gmdlib.abstract.nodes.gmd_object import GMDUnskinnedObject, GMDBoundingBox
 from yk_gmd_blender.gmdlib.converters.common.from_abstract import RearrangedData, arrange_data_for_export, \
-    pack_mesh_matrix_strings
+    pack_mesh_matrix_strings, IndexBufferBuilder
 from yk_gmd_blender.gmdlib.errors.error_reporter import ErrorReporter
 from yk_gmd_blender.gmdlib.structure.common.attribute import AttributeStruct, TextureIndexStruct
 from yk_gmd_blender.gmdlib.structure.common.checksum_str import ChecksumStrStruct
-from yk_gmd_blender.gmdlib.structure.common.mesh import IndicesStruct
 from yk_gmd_blender.gmdlib.structure.common.node import NodeStruct, NodeType
 from yk_gmd_blender.gmdlib.structure.common.unks import Unk12Struct, Unk14Struct
 from yk_gmd_blender.gmdlib.structure.version import VersionProperties
@@ -94,8 +93,13 @@ def pack_abstract_contents_YK1(version_properties: VersionProperties, file_big_e
         ))
 
     vertex_buffer_arr = []
-    vertex_data_bytearray = bytearray()
-    index_buffer = []
+    # Allocate the vertex data for every buffer up front, so each mesh is packed straight into its place
+    vertex_data_bytearray = bytearray(sum(
+        gmd_buffer_layout.bytes_per_vertex() * sum(m.vertices_data.vertex_count() for m in meshes_for_buffer)
+        for gmd_buffer_layout, _, meshes_for_buffer in rearranged_data.vertex_layout_groups
+    ))
+    vertex_data_offset = 0
+    index_buffer = IndexBufferBuilder()
     # Dict of GMDMesh id -> (buffer_id, vertex_offset_from_index, min_index, vertex_count)
     mesh_buffer_stats = {}
     for buffer_idx, (gmd_buffer_layout, packing_flags, meshes_for_buffer) in enumerate(
@@ -110,7 +114,7 @@ def pack_abstract_contents_YK1(version_properties: VersionProperties, file_big_e
             vertex_packing_flags=packing_flags,
             bytes_per_vertex=gmd_buffer_layout.bytes_per_vertex(),
 
-            vertex_data_offset=len(vertex_data_bytearray),
+            vertex_data_offset=vertex_data_offset,
             vertex_data_length=buffer_vertex_count * gmd_buffer_layout.bytes_per_vertex(),
         ))
 
@@ -137,9 +141,11 @@ def pack_abstract_contents_YK1(version_properties: VersionProperties, file_big_e
             elif vertex_offset_from_index > 4294967295:
                 error.fatal(f"Encountered a vertex_offset_from_index greater than 32bit, needs")
 
+            if gmd_mesh.vertices_data.layout.bytes_per_vertex() != gmd_buffer_layout.bytes_per_vertex():
+                error.fatal(f"Mesh for {node.name} has a different vertex size to the vertex buffer it's packed into")
             try:
-                gmd_mesh.vertices_data.layout.pack_into(vertices_big_endian, gmd_mesh.vertices_data,
-                                                        vertex_data_bytearray)
+                vertex_data_offset = gmd_mesh.vertices_data.layout.pack_into_buffer(
+                    vertices_big_endian, gmd_mesh.vertices_data, vertex_data_bytearray, vertex_data_offset)
             except PackingValidationError as e:
                 error.fatal(f"Error while packing a mesh for {node.name}: {e}")
 
@@ -164,34 +170,13 @@ def pack_abstract_contents_YK1(version_properties: VersionProperties, file_big_e
         else:
             matrix_list = []
 
-        if version_properties.relative_indices_used:
-            pack_index = lambda x: x
-        else:
-            pack_index = lambda x: 0xFFFF if x == 0xFFFF else (x + min_index)
-
-        # Set up the pointer for the next set of indices
-        triangle_indices = IndicesStruct(
-            index_offset=len(index_buffer),
-            index_count=len(gmd_mesh.triangles.triangle_list)
-        )
-        # then add them to the data
-        index_buffer += [pack_index(x) for x in gmd_mesh.triangles.triangle_list]
-
-        # Set up the pointer for the next set of indices
-        triangle_strip_noreset_indices = IndicesStruct(
-            index_offset=len(index_buffer),
-            index_count=len(gmd_mesh.triangles.triangle_strips_noreset)
-        )
-        # then add them to the data
-        index_buffer += [pack_index(x) for x in gmd_mesh.triangles.triangle_strips_noreset]
-
-        # Set up the pointer for the next set of indices
-        triangle_strip_reset_indices = IndicesStruct(
-            index_offset=len(index_buffer),
-            index_count=len(gmd_mesh.triangles.triangle_strips_reset)
-        )
-        # then add them to the data
-        index_buffer += [pack_index(x) for x in gmd_mesh.triangles.triangle_strips_reset]
+        # Relative indices are stored as-is, otherwise each index is offset by min_index
+        index_min = 0 if version_properties.relative_indices_used else min_index
+
+        triangle_indices = index_buffer.add(gmd_mesh.triangles.triangle_list, index_min)
+        triangle_strip_noreset_indices = index_buffer.add(gmd_mesh.triangles.triangle_strips_noreset, index_min)
+        triangle_strip_reset_indices = index_buffer.add(gmd_mesh.triangles.triangle_strips_reset, index_min)
+
         mesh_arr.append(MeshStruct_YK1(
             index=len(mesh_arr),
             attribute_index=rearranged_data.attribute_set_id_to_index[id(gmd_mesh.attribute_set)],
@@ -307,11 +292,12 @@ def pack_abstract_contents_YK1(version_properties: VersionProperties, file_big_e
         material_arr=material_arr,
         matrix_arr=rearranged_data.ordered_matrices,
         vertex_buffer_arr=vertex_buffer_arr,
-        vertex_data=bytes(vertex_data_bytearray),
+        # Use a view instead of copying to bytes, FilePacker accepts both
+        vertex_data=memoryview(vertex_data_bytearray).toreadonly(),
         texture_arr=rearranged_data.texture_names,
         shader_arr=rearranged_data.shader_names,
         node_name_arr=rearranged_data.node_names,
-        index_data=index_buffer,
+        index_data=index_buffer.build(error),
         object_drawlist_bytes=bytes(drawlist_bytearray),
         mesh_matrixlist_bytes=packed_mesh_matrixlists,
 
@@ -1,5 +1,5 @@
 import abc
-from typing import NoReturn, Set
+from typing import NoReturn, Set, List, Tuple
 
 from yk_gmd_blender.gmdlib.errors.error_classes import GMDImportExportError
 
@@ -77,3 +77,45 @@ class LenientErrorReporter(ErrorReporter):
             print(f"[YKGMD] [DEBUG] [{category}] {msg}")
             return True
         return False
+
+
+class RecordingErrorReporter(ErrorReporter):
+    """
+    Records messages instead of printing them, so they can be reported later - e.g. after being sent back from a
+    worker process. Recoverable errors are fatal if strict, like StrictErrorReporter.
+    """
+    strict: bool
+    allowed_categories: Set[str]
+    recoverable_msgs: List[str]
+    info_msgs: List[str]
+    # (category, message) for each debug message
+    debug_msgs: List[Tuple[str, str]]
+
+    def __init__(self, strict: bool, allowed_categories: Set[str] = None):
+        if allowed_categories is None:
+            allowed_categories = set()
+        self.strict = strict
+        self.allowed_categories = allowed_categories
+        self.recoverable_msgs = []
+        self.info_msgs = []
+        self.debug_msgs = []
+
+    def recoverable(self, msg: str):
+        if self.strict:
+            raise GMDImportExportError(msg)
+        self.recoverable_msgs.append(msg)
+
+    def fatal_exception(self, ex: Exception) -> NoReturn:
+        raise ex
+
+    def fatal(self, msg: str) -> NoReturn:
+        raise GMDImportExportError(msg)
+
+    def info(self, msg: str):
+        self.info_msgs.append(msg)
+
+    def debug(self, category: str, msg: str) -> bool:
+        if category in self.allowed_categories or "ALL" in self.allowed_categories:
+            self.debug_msgs.append((category, msg))
+            return True
+        return False
@@ -1,7 +1,9 @@
+import mmap
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Union, Tuple, cast
+from typing import Union, Tuple, cast, Optional, Dict, Type
 
-from yk_gmd_blender.structurelib.base import PackingValidationError
+from yk_gmd_blender.structurelib.base import PackingValidationError, StructureUnpacker
 from yk_gmd_blender.gmdlib.abstract.gmd_scene import GMDScene
 from yk_gmd_blender.gmdlib.converters.common.to_abstract import FileImportMode, VertexImportMode
 from yk_gmd_blender.gmdlib.converters.dragon.from_abstract import pack_abstract_contents_Dragon
@@ -10,25 +12,33 @@ from yk_gmd_blender.gmdlib.converters.kenzan.from_abstract import pack_abstract_
 from yk_gmd_blender.gmdlib.converters.kenzan.to_abstract import GMDAbstractor_Kenzan
 from yk_gmd_blender.gmdlib.converters.yk1.from_abstract import pack_abstract_contents_YK1
 from yk_gmd_blender.gmdlib.converters.yk1.to_abstract import GMDAbstractor_YK1
-from yk_gmd_blender.gmdlib.errors.error_classes import InvalidGMDFormatError
+from yk_gmd_blender.gmdlib.errors.error_classes import InvalidGMDFormatError, GMDImportExportError
 from yk_gmd_blender.gmdlib.errors.error_reporter import ErrorReporter
-from yk_gmd_blender.gmdlib.structure.common.file import FileUnpackError, FileData_Common
+from yk_gmd_blender.gmdlib.structure.common.file import FileUnpackError, FileData_Common, FilePacker
 from yk_gmd_blender.gmdlib.structure.common.header import GMDHeaderStruct, GMDHeaderStruct_Unpack
 from yk_gmd_blender.gmdlib.structure.dragon.file import FilePacker_Dragon, FileData_Dragon
 from yk_gmd_blender.gmdlib.structure.dragon.header import GMDHeader_Dragon_Unpack
-from yk_gmd_blender.gmdlib.structure.endianness import check_is_file_big_endian
+from yk_gmd_blender.gmdlib.structure.endianness import check_is_file_big_endian, check_are_vertices_big_endian
 from yk_gmd_blender.gmdlib.structure.kenzan.file import FileData_Kenzan, FilePacker_Kenzan
 from yk_gmd_blender.gmdlib.structure.kenzan.header import GMDHeader_Kenzan_Unpack
-from yk_gmd_blender.gmdlib.structure.version import GMDVersion, VersionProperties
+from yk_gmd_blender.gmdlib.structure.version import GMDVersion, VersionProperties, get_combined_version_properties
 from yk_gmd_blender.gmdlib.structure.yk1.file import FileData_YK1, FilePacker_YK1
 from yk_gmd_blender.gmdlib.structure.yk1.header import GMDHeader_YK1_Unpack
 
 
-def _get_file_data(data: Union[Path, str, bytes], error_reporter: ErrorReporter) -> bytes:
+# GMD data can be passed as a path, the bytes of the file, or a memory-mapped file.
+GMDDataSource = Union[Path, str, bytes, mmap.mmap]
+
+
+def _get_file_data(data: GMDDataSource, error_reporter: ErrorReporter, max_size: Optional[int] = None) \
+        -> Union[bytes, mmap.mmap]:
+    """
+    Get the contents of a GMD data source. If max_size is given, files are only read up to max_size bytes.
+    """
     if isinstance(data, (Path, str)):
         try:
             with open(data, "rb") as in_file:
-                data = in_file.read()
+                data = in_file.read(-1 if max_size is None else max_size)
             return data
         except FileNotFoundError as e:
             error_reporter.fatal(str(e))
@@ -36,23 +46,124 @@ def _get_file_data(data: Union[Path, str, bytes], error_reporter: ErrorReporter)
         return data
 
 
-def _extract_base_header(data: bytes) -> Tuple[bool, GMDHeaderStruct]:
+def _extract_base_header(data: Union[bytes, mmap.mmap]) -> Tuple[bool, GMDHeaderStruct]:
     big_endian = True
     base_header, _ = GMDHeaderStruct_Unpack.unpack(big_endian, data=data, offset=0)
-    big_endian = check_is_file_big_endian(base_header.file_endian_check)
-    # Reimport the header with the correct endianness
-    base_header, _ = GMDHeaderStruct_Unpack.unpack(big_endian, data=data, offset=0)
+    # file_endian_check is a single byte, so it's correct even if the rest of the header was read with the wrong
+    # endianness. Only reimport the header if the endianness was wrong.
+    if not check_is_file_big_endian(base_header.file_endian_check):
+        big_endian = False
+        base_header, _ = GMDHeaderStruct_Unpack.unpack(big_endian, data=data, offset=0)
     return big_endian, base_header
 
 
-def get_file_header(data: Union[Path, str, bytes], error_reporter: ErrorReporter) -> GMDHeaderStruct:
-    data = _get_file_data(data, error_reporter)
+def get_file_header(data: GMDDataSource, error_reporter: ErrorReporter) -> GMDHeaderStruct:
+    data = _get_file_data(data, error_reporter, max_size=GMDHeaderStruct_Unpack.sizeof())
     _, base_header = _extract_base_header(data)
     return base_header
 
 
-def read_gmd_structures(data: Union[Path, str, bytes], error_reporter: ErrorReporter) -> \
+_VERSIONED_HEADERS: Dict[GMDVersion, Tuple[StructureUnpacker, Type[FileData_Common]]] = {
+    GMDVersion.Kiwami1: (GMDHeader_YK1_Unpack, FileData_YK1),
+    GMDVersion.Kenzan: (GMDHeader_Kenzan_Unpack, FileData_Kenzan),
+    GMDVersion.Dragon: (GMDHeader_Dragon_Unpack, FileData_Dragon),
+}
+# Reading this many bytes is always enough to unpack the header of any supported version
+_MAX_HEADER_SIZE = max(header_unpacker.sizeof() for header_unpacker, _ in _VERSIONED_HEADERS.values())
+
+
+@dataclass(frozen=True)
+class GMDHeaderProbe:
+    """
+    Summary of a GMD file, taken only from the header.
+    """
+    version_props: VersionProperties
+    file_is_big_endian: bool
+    vertices_are_big_endian: bool
+    name: str
+    # The file size declared in the header
+    file_size: int
+    # header pointer field name -> number of elements (or number of bytes, for byte sections)
+    section_counts: Dict[str, int]
+    # header pointer field name -> size in bytes
+    section_sizes: Dict[str, int]
+    header: GMDHeaderStruct
+
+
+def probe_gmd_header(data: GMDDataSource, error_reporter: ErrorReporter) -> GMDHeaderProbe:
+    """
+    Read the header of a GMD file without reading or unpacking the rest of the file.
+    """
+    data = _get_file_data(data, error_reporter, max_size=_MAX_HEADER_SIZE)
+    if len(data) < GMDHeaderStruct_Unpack.sizeof():
+        error_reporter.fatal(f"File is {len(data)} bytes, too small to contain a GMD header")
+
+    try:
+        big_endian, base_header = _extract_base_header(data)
+    except ValueError as e:
+        error_reporter.fatal(f"Invalid GMD header: {e}")
+
+    version_props = get_combined_version_properties(base_header.version_combined)
+    if version_props is None or version_props.major_version not in _VERSIONED_HEADERS:
+        raise InvalidGMDFormatError(f"File format version {base_header.version_str()} is not readable")
+
+    header_unpacker, file_data_type = _VERSIONED_HEADERS[version_props.major_version]
+    if len(data) < header_unpacker.sizeof():
+        error_reporter.fatal(f"File is {len(data)} bytes, too small to contain a v{version_props.version_str} header")
+    header, _ = header_unpacker.unpack(big_endian, data=data, offset=0)
+
+    section_counts = {}
+    section_sizes = {}
+    for name, unpacker in file_data_type.header_pointer_fields():
+        pointer = getattr(header, name)
+        if unpacker is bytes:
+            section_counts[name] = pointer.size
+            section_sizes[name] = pointer.size
+        else:
+            section_counts[name] = pointer.count
+            section_sizes[name] = pointer.count * unpacker.sizeof()
+
+    return GMDHeaderProbe(
+        version_props=version_props,
+        file_is_big_endian=big_endian,
+        vertices_are_big_endian=check_are_vertices_big_endian(header.vertex_endian_check),
+        name=header.name.text,
+        file_size=header.file_size,
+        section_counts=section_counts,
+        section_sizes=section_sizes,
+        header=header,
+    )
+
+
+def probe_gmd_headers_in_dir(root: Union[Path, str], error_reporter: ErrorReporter,
+                             glob_pattern: str = "**/*.gmd") -> Dict[Path, GMDHeaderProbe]:
+    """
+    Probe the header of every GMD file under root.
+    Files that can't be probed, including files that can't be read (e.g. PermissionError),
+    are reported as recoverable errors and left out of the result.
+    """
+    probes = {}
+    for path in sorted(Path(root).glob(glob_pattern)):
+        try:
+            probes[path] = probe_gmd_header(path, error_reporter)
+        except (GMDImportExportError, OSError) as e:
+            error_reporter.recoverable(f"Couldn't probe {path}: {e}")
+    return probes
+
+
+def read_gmd_structures(data: GMDDataSource, error_reporter: ErrorReporter, lazy: bool = False) -> \
         Tuple[VersionProperties, GMDHeaderStruct, Union[FileData_Kenzan, FileData_YK1]]:
+    """
+    Read the header and contents of a GMD file.
+
+    If lazy is True, each section of the contents (node_arr, vertex_data etc.) is only unpacked when it is first
+    accessed, which is useful for scans that only look at a few sections.
+    Errors in a lazy section are raised as FileUnpackError on first access, instead of being reported here.
+
+    If data is an mmap, the byte regions (vertex_data, object_drawlist_bytes, mesh_matrixlist_bytes) are returned as
+    memoryviews into the mapping instead of copies, and vertex buffers unpacked from them read straight from the mapping.
+    The mmap must be kept open for as long as the returned contents, or anything abstracted from them, are in use.
+    """
     data = _get_file_data(data, error_reporter)
     big_endian, base_header = _extract_base_header(data)
 
@@ -62,7 +173,10 @@ def read_gmd_structures(data: Union[Path, str, bytes], error_reporter: ErrorRepo
     if version_props.major_version == GMDVersion.Kiwami1:
         try:
             header, _ = GMDHeader_YK1_Unpack.unpack(big_endian, data=data, offset=0)
-            contents, _ = FilePacker_YK1.unpack(big_endian, data=data, offset=0)
+            if lazy:
+                contents, _ = FilePacker_YK1.unpack_lazy(big_endian, data=data, offset=0)
+            else:
+                contents, _ = FilePacker_YK1.unpack(big_endian, data=data, offset=0)
 
             return version_props, header, contents
         except FileUnpackError as e:
@@ -70,7 +184,10 @@ def read_gmd_structures(data: Union[Path, str, bytes], error_reporter: ErrorRepo
     elif version_props.major_version == GMDVersion.Kenzan:
         try:
             header, _ = GMDHeader_Kenzan_Unpack.unpack(big_endian, data=data, offset=0)
-            contents, _ = FilePacker_Kenzan.unpack(big_endian, data=data, offset=0)
+            if lazy:
+                contents, _ = FilePacker_Kenzan.unpack_lazy(big_endian, data=data, offset=0)
+            else:
+                contents, _ = FilePacker_Kenzan.unpack(big_endian, data=data, offset=0)
 
             return version_props, header, contents
         except FileUnpackError as e:
@@ -78,7 +195,10 @@ def read_gmd_structures(data: Union[Path, str, bytes], error_reporter: ErrorRepo
     elif version_props.major_version == GMDVersion.Dragon:
         try:
             header, _ = GMDHeader_Dragon_Unpack.unpack(big_endian, data=data, offset=0)
-            contents, _ = FilePacker_Dragon.unpack(big_endian, data=data, offset=0)
+            if lazy:
+                contents, _ = FilePacker_Dragon.unpack_lazy(big_endian, data=data, offset=0)
+            else:
+                contents, _ = FilePacker_Dragon.unpack(big_endian, data=data, offset=0)
 
             return version_props, header, contents
         except FileUnpackError as e:
@@ -136,41 +256,52 @@ def pack_abstract_scene(version_props: VersionProperties, file_is_big_endian: bo
         raise InvalidGMDFormatError(f"File format version {version_props.version_str} is not packable")
 
 
-def pack_file_data(version_props: VersionProperties, file_data: FileData_Common,
-                   error_reporter: ErrorReporter) -> bytearray:
+def _get_file_packer(version_props: VersionProperties) -> FilePacker:
     if version_props.major_version == GMDVersion.Kiwami1:
-        data_bytearray = bytearray()
-        try:
-            FilePacker_YK1.pack(file_data.file_is_big_endian(), file_data, data_bytearray)
-        except PackingValidationError as e:
-            error_reporter.fatal(str(e))
-        return data_bytearray
+        return FilePacker_YK1
     elif version_props.major_version == GMDVersion.Dragon:
-        data_bytearray = bytearray()
-        try:
-            FilePacker_Dragon.pack(file_data.file_is_big_endian(), file_data, data_bytearray)
-        except PackingValidationError as e:
-            error_reporter.fatal(str(e))
-        return data_bytearray
+        return FilePacker_Dragon
     elif version_props.major_version == GMDVersion.Kenzan:
-        data_bytearray = bytearray()
-        try:
-            FilePacker_Kenzan.pack(file_data.file_is_big_endian(), file_data, data_bytearray)
-        except PackingValidationError as e:
-            error_reporter.fatal(str(e))
-        return data_bytearray
+        return FilePacker_Kenzan
     else:
         raise InvalidGMDFormatError(f"File format version {version_props.version_str} is not packable")
 
 
+def pack_file_data(version_props: VersionProperties, file_data: FileData_Common,
+                   error_reporter: ErrorReporter) -> bytearray:
+    file_packer = _get_file_packer(version_props)
+    data_bytearray = bytearray()
+    try:
+        file_packer.pack(file_data.file_is_big_endian(), file_data, data_bytearray)
+    except PackingValidationError as e:
+        error_reporter.fatal(str(e))
+    return data_bytearray
+
+
+def write_file_data(version_props: VersionProperties, file_data: FileData_Common, path: Union[Path, str],
+                    error_reporter: ErrorReporter) -> int:
+    """
+    Pack file_data and write it to path one section at a time,
+    so the whole file is never held in memory as a single buffer.
+    :return: The size of the written file.
+    """
+    file_packer = _get_file_packer(version_props)
+    # Pack before opening the file, so an invalid file doesn't leave a truncated one behind
+    try:
+        chunks = file_packer.pack_chunks(file_data.file_is_big_endian(), file_data)
+    except PackingValidationError as e:
+        error_reporter.fatal(str(e))
+    try:
+        with open(path, "wb") as out_file:
+            out_file.writelines(chunks)
+    except IOError as e:
+        error_reporter.fatal(str(e))
+    return sum(len(chunk) for chunk in chunks)
+
+
 def write_abstract_scene_out(version_props: VersionProperties, file_is_big_endian: bool, vertices_are_big_endian: bool,
                              scene: GMDScene, old_file_contents: Union[FileData_Kenzan, FileData_YK1, FileData_Dragon],
                              path: Union[Path, str], error_reporter: ErrorReporter):
     file_data = pack_abstract_scene(version_props, file_is_big_endian, vertices_are_big_endian, scene,
                                     old_file_contents, error_reporter)
-    data_bytearray = pack_file_data(version_props, file_data, error_reporter)
-    try:
-        with open(path, "wb") as out_file:
-            out_file.write(data_bytearray)
-    except IOError as e:
-        error_reporter.fatal(str(e))
+    write_file_data(version_props, file_data, path, error_reporter)
@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 from typing import Generic, TypeVar, List
 
-from yk_gmd_blender.structurelib.base import BaseUnpacker, FixedSizeArrayUnpacker, StructureUnpacker
+from yk_gmd_blender.structurelib.base import BaseUnpacker, FixedSizeArrayUnpacker, StructureUnpacker, UnpackBuffer
 from yk_gmd_blender.gmdlib.structure.common.sized_pointer import SizedPointerStruct, SizedPointerStruct_Unpack
 
 T = TypeVar('T')
@@ -11,7 +11,7 @@ T = TypeVar('T')
 class ArrayPointerStruct(Generic[T]):
     sized_ptr: SizedPointerStruct
 
-    def extract(self, unpack: BaseUnpacker[T], big_endian: bool, data: bytes) -> List[T]:
+    def extract(self, unpack: BaseUnpacker[T], big_endian: bool, data: UnpackBuffer) -> List[T]:
         return FixedSizeArrayUnpacker(unpack, self.sized_ptr.size).unpack(big_endian, data, self.sized_ptr.ptr)[0]
 
     @property
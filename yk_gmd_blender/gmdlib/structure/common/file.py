@@ -1,8 +1,10 @@
 from dataclasses import dataclass
 from enum import Enum
-from typing import Type, Union, Tuple, List
+from typing import Type, Union, Tuple, List, Dict, Callable, Any
 
-from yk_gmd_blender.structurelib.base import StructureUnpacker, BaseUnpacker, PackingValidationError
+import numpy as np
+
+from yk_gmd_blender.structurelib.base import StructureUnpacker, BaseUnpacker, PackingValidationError, UnpackBuffer
 from yk_gmd_blender.gmdlib.structure.common.array_pointer import ArrayPointerStruct
 from yk_gmd_blender.gmdlib.structure.common.checksum_str import ChecksumStrStruct
 from yk_gmd_blender.gmdlib.structure.common.header import GMDHeaderStruct
@@ -30,6 +32,17 @@ class FileData_Common:
 
     name: ChecksumStrStruct
 
+    def __getattr__(self, name: str):
+        # Only called if the attribute hasn't been set.
+        # FileData created by FilePacker.unpack_lazy() doesn't set header pointer fields until they're first accessed.
+        lazy_sections: Dict[str, Callable[[], Any]] = self.__dict__.get("_lazy_sections")
+        if lazy_sections and name in lazy_sections:
+            value = lazy_sections[name]()
+            setattr(self, name, value)
+            del lazy_sections[name]
+            return value
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
     def file_is_big_endian(self):
         return check_is_file_big_endian(self.file_endian_check)
 
@@ -47,6 +60,7 @@ class FileData_Common:
         Each element of the list is added to the file in the following way:
         If the packing type is bytes, the byte contents are added to the file data and the header field is set to a SizedPointer
         If the packing type is a BaseUnpacker, the packer is used to pack the data and the header field is set to an ArrayPointer
+        If the packing type is a primitive BaseUnpacker, the data may also be a 1D numpy array, which is packed in one go
         """
         return []
 
@@ -77,43 +91,61 @@ class FilePacker(BaseUnpacker[FileData_Common]):
         # TODO: Check python_type.packing_type() fields to ensure correctness
 
     def pack(self, big_endian: bool, value: FileData_Common, append_to: bytearray):
+        for chunk in self.pack_chunks(big_endian, value):
+            append_to += chunk
+
+    def pack_chunks(self, big_endian: bool, value: FileData_Common) -> List[memoryview]:
+        """
+        Pack the file into a list of byte chunks, which concatenated together make up the file.
+        The first chunk is the header, followed by one chunk per section.
+        Byte sections and numpy-array sections in the right byte order are views of the original data, not copies.
+        """
         # Packing phases
-        # 1. Pack contents (NOT HEADER) into bytes to get addresses and sizes
+        # 1. Pack contents (NOT HEADER) into separate chunks to get addresses and sizes
         # Requires subclass intervention - subclass must be able to supply new data to be packed
         # addresses also depend on the size of the actual header - subclass supplies that
         # 2. Use these content addresses/sizes to fill the header
         # Requires subclass intervention - subclass needs to supply content addrs/sizes and the fields to fill them in
         # 3. Pack the header
         # No intervention required as long as header_packer is set
-        # 4. Concatenate the bytes
+        # 4. Return the header followed by the content chunks
         # No intervention required
 
         # TODO: Pad header_size to a constant value like the games do
         header_size = self.header_packer.sizeof()
-        collective_data = bytearray()
+        chunks: List[memoryview] = []
+        data_size = 0
 
-        def pack_data(name: str, packer: Union[Type[bytes], BaseUnpacker], collective_data: bytearray) -> Union[
-            SizedPointerStruct, ArrayPointerStruct]:
-            ptr = header_size + len(collective_data)
+        def pack_data(name: str, packer: Union[Type[bytes], BaseUnpacker]) -> Tuple[
+            Union[SizedPointerStruct, ArrayPointerStruct], memoryview]:
+            ptr = header_size + data_size
 
-            attr: Union[bytes, list] = getattr(value, name)
+            attr: Union[bytes, list, np.ndarray] = getattr(value, name)
             sized_pointer = SizedPointerStruct(ptr=ptr, size=len(attr))
             if packer is bytes:
-                if not isinstance(attr, bytes):
+                # memoryviews are allowed, because files read from an mmap keep their byte regions as views
+                if not isinstance(attr, (bytes, bytearray, memoryview)):
                     raise TypeError(
                         f"Value field {name} was expected to be bytes, because {self.python_type.__name__} specified it to be byte-packed")
-                collective_data += attr
-                return sized_pointer
+                return sized_pointer, memoryview(attr).cast("B")
             elif isinstance(packer, BaseUnpacker):
+                if isinstance(attr, np.ndarray) and attr.ndim == 1 and packer.flat_passthrough:
+                    # The dtype must convert losslessly to the packed type, which replaces per-element validation
+                    packed_dtype = np.dtype((">" if big_endian else "<") + packer.flat_struct_fmt())
+                    if not np.can_cast(attr.dtype, packed_dtype, casting="safe"):
+                        raise PackingValidationError(f"Array of {attr.dtype} can't be packed as {packed_dtype}")
+                    packed = np.ascontiguousarray(attr.astype(packed_dtype, copy=False))
+                    return ArrayPointerStruct(sized_ptr=sized_pointer), memoryview(packed).cast("B")
                 if not isinstance(attr, list):
                     raise TypeError(
                         f"Header field {name} was expected as list, because {self.python_type.__name__} specified it to be packed by {packer}")
+                section_data = bytearray()
                 for i, item in enumerate(attr):
                     try:
-                        packer.pack(big_endian, item, collective_data)
+                        packer.pack(big_endian, item, section_data)
                     except PackingValidationError as e:
                         raise PackingValidationError(f"Element {i}: {e}")
-                return ArrayPointerStruct(sized_ptr=sized_pointer)
+                return ArrayPointerStruct(sized_ptr=sized_pointer), memoryview(section_data)
             else:
                 raise TypeError(f"Unexpected packer type {packer}")
 
@@ -124,22 +156,25 @@ class FilePacker(BaseUnpacker[FileData_Common]):
         element_pointers = {}
         for name, packer in self.python_type.header_pointer_fields():
             try:
-                element_pointers[name] = pack_data(name, packer, collective_data)
+                element_pointers[name], chunk = pack_data(name, packer)
             except PackingValidationError as e:
                 raise PackingValidationError(f"File Element {name}: {e}")
+            chunks.append(chunk)
+            data_size += len(chunk)
 
         header = self.header_packer.python_type(
             **header_copies,
             **element_pointers,
 
-            file_size=header_size + len(collective_data),
+            file_size=header_size + data_size,
             padding=0
         )
 
-        self.header_packer.pack(big_endian, header, append_to)
-        append_to += collective_data
+        header_data = bytearray()
+        self.header_packer.pack(big_endian, header, header_data)
+        return [memoryview(header_data)] + chunks
 
-    def unpack(self, big_endian: bool, data: Union[bytes, bytearray], offset: int) -> Tuple[FileData_Common, int]:
+    def unpack(self, big_endian: bool, data: UnpackBuffer, offset: int) -> Tuple[FileData_Common, int]:
         # Unpacking phases
         # 1. Unpack the header
         # No subclass intervention required as long as header_packer is set
@@ -148,33 +183,12 @@ class FilePacker(BaseUnpacker[FileData_Common]):
 
         header, offset = self.header_packer.unpack(big_endian, data, offset)
 
-        def unpack_data(name: str, unpacker: Union[Type[bytes], BaseUnpacker]):
-            attr = getattr(header, name)
-            if unpacker is bytes:
-                if not isinstance(attr, SizedPointerStruct):
-                    raise TypeError(
-                        f"Header field {name} was expected as SizedPointer but was {attr}. "
-                        f"Reason: {self.python_type.__name__} specified it to be byte-packed")
-                return attr.extract_bytes(data)
-            elif isinstance(unpacker, BaseUnpacker):
-                if not isinstance(attr, ArrayPointerStruct):
-                    raise TypeError(
-                        f"Header field {name} was expected as ArrayPointer but was {attr}. "
-                        f"Reason: {self.python_type.__name__} specified it to be packed by {unpacker}")
-                try:
-                    return attr.extract(unpacker, big_endian, data)
-                except Exception as e:
-                    raise FileUnpackError(
-                        f"Exception while unpacking field {name} from 0x{attr.ptr:x}[{attr.count}]: {e}")
-            else:
-                raise TypeError(f"Unexpected unpacker type {unpacker}")
-
         header_copies = {}
         for name in self.python_type.header_fields_to_copy():
             header_copies[name] = getattr(header, name)
 
         data_dict = {
-            k: unpack_data(k, v)
+            k: self._unpack_section(big_endian, data, header, k, v)
             for k, v in self.python_type.header_pointer_fields()
         }
 
@@ -185,6 +199,52 @@ class FilePacker(BaseUnpacker[FileData_Common]):
 
         return file_data, -1
 
+    def unpack_lazy(self, big_endian: bool, data: UnpackBuffer, offset: int) -> Tuple[
+        FileData_Common, int]:
+        """
+        Unpack the header, but only unpack each header pointer field (node_arr, vertex_data etc.) when it is first
+        accessed. Unpacked sections are cached on the returned FileData.
+        Any FileUnpackError for a section is raised when that section is first accessed.
+        """
+        header, offset = self.header_packer.unpack(big_endian, data, offset)
+
+        # Don't call __init__, because that requires every section up front
+        file_data = self.python_type.__new__(self.python_type)
+        for name in self.python_type.header_fields_to_copy():
+            setattr(file_data, name, getattr(header, name))
+
+        def make_lazy_section(name: str, unpacker: Union[Type[bytes], BaseUnpacker]):
+            return lambda: self._unpack_section(big_endian, data, header, name, unpacker)
+
+        file_data._lazy_sections = {
+            k: make_lazy_section(k, v)
+            for k, v in self.python_type.header_pointer_fields()
+        }
+
+        return file_data, -1
+
+    def _unpack_section(self, big_endian: bool, data: UnpackBuffer, header: GMDHeaderStruct, name: str,
+                        unpacker: Union[Type[bytes], BaseUnpacker]):
+        attr = getattr(header, name)
+        if unpacker is bytes:
+            if not isinstance(attr, SizedPointerStruct):
+                raise TypeError(
+                    f"Header field {name} was expected as SizedPointer but was {attr}. "
+                    f"Reason: {self.python_type.__name__} specified it to be byte-packed")
+            return attr.extract_bytes(data)
+        elif isinstance(unpacker, BaseUnpacker):
+            if not isinstance(attr, ArrayPointerStruct):
+                raise TypeError(
+                    f"Header field {name} was expected as ArrayPointer but was {attr}. "
+                    f"Reason: {self.python_type.__name__} specified it to be packed by {unpacker}")
+            try:
+                return attr.extract(unpacker, big_endian, data)
+            except Exception as e:
+                raise FileUnpackError(
+                    f"Exception while unpacking field {name} from 0x{attr.ptr:x}[{attr.count}]: {e}")
+        else:
+            raise TypeError(f"Unexpected unpacker type {unpacker}")
+
     def validate_value(self, value: FileData_Common):
         raise NotImplementedError()
 
@@ -1,6 +1,8 @@
+import mmap
 from dataclasses import dataclass
+from typing import Union
 
-from yk_gmd_blender.structurelib.base import StructureUnpacker
+from yk_gmd_blender.structurelib.base import StructureUnpacker, UnpackBuffer
 from yk_gmd_blender.structurelib.primitives import c_uint32
 
 
@@ -9,7 +11,10 @@ class SizedPointerStruct:
     ptr: int
     size: int
 
-    def extract_bytes(self, data: bytes):
+    def extract_bytes(self, data: UnpackBuffer) -> Union[bytes, bytearray, memoryview]:
+        if isinstance(data, (memoryview, mmap.mmap)):
+            # Don't copy regions out of mapped files - return a view into the mapping instead
+            return memoryview(data)[self.ptr:self.ptr + self.size]
         return data[self.ptr:self.ptr + self.size]
 
     def __repr__(self):
@@ -2,6 +2,7 @@ from dataclasses import dataclass
 from typing import List, Tuple, Union, Type
 
 import mathutils
+import numpy as np
 
 from yk_gmd_blender.structurelib.base import BaseUnpacker
 from yk_gmd_blender.gmdlib.structure.common.checksum_str import ChecksumStrStruct, ChecksumStrStruct_Unpack
@@ -31,11 +32,12 @@ class FileData_Dragon(FileData_Common):
     material_arr: List[MaterialStruct_YK1]
     matrix_arr: List[mathutils.Matrix]
     vertex_buffer_arr: List[VertexBufferLayoutStruct_YK1]
-    vertex_data: bytes  # byte data
+    vertex_data: Union[bytes, memoryview]  # byte data, or a read-only view of it
     texture_arr: List[ChecksumStrStruct]
     shader_arr: List[ChecksumStrStruct]
     node_name_arr: List[ChecksumStrStruct]
-    index_data: List[int]
+    # Exporters produce a uint16 array, which FilePacker writes in one go
+    index_data: Union[List[int], np.ndarray]
     object_drawlist_bytes: bytes
     mesh_matrixlist_bytes: bytes
 
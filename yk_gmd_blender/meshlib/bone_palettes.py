@@ -0,0 +1,96 @@
+from typing import List, Tuple
+
+import numpy as np
+
+# Number of set bits in each byte value
+_POPCOUNT_U8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def triangle_bone_masks(tri_vertices: np.ndarray, vertex_bones: np.ndarray, n_weights: np.ndarray) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build a bitmask of the bones (vertex groups) referenced by each triangle.
+    Bones are given dense bit indices, so the masks only need as many bits as there are distinct bones.
+
+    :param tri_vertices: (T, 3) vertex index of each triangle corner.
+    :param vertex_bones: (V, 4) bone of each weight of each vertex.
+    :param n_weights: (V,) number of weights used by each vertex. vertex_bones[v, n_weights[v]:] are ignored.
+    :return: (masks, bones) - masks is a (T, W) uint64 array where bit i of the mask is set if the triangle
+    references bones[i], and bones is the sorted array of bones referenced by any triangle.
+    """
+    tri_vertices = np.asarray(tri_vertices, dtype=np.int64).reshape(-1, 3)
+    n_tris = len(tri_vertices)
+
+    # (T, 12) bones and whether they're used, for each of the 4 weights of each of the 3 corners
+    corner_bones = np.asarray(vertex_bones)[tri_vertices].reshape(n_tris, 12)
+    used = (np.arange(4) < np.asarray(n_weights)[tri_vertices][:, :, np.newaxis]).reshape(n_tris, 12)
+
+    bones, dense = np.unique(corner_bones[used], return_inverse=True)
+    bit_idx = np.zeros((n_tris, 12), dtype=np.int64)
+    bit_idx[used] = dense.reshape(-1)
+
+    masks = np.zeros((n_tris, max(1, (len(bones) + 63) // 64)), dtype=np.uint64)
+    rows = np.arange(n_tris)
+    for slot in range(12):
+        bits = np.left_shift(np.uint64(1), (bit_idx[:, slot] % 64).astype(np.uint64))
+        # Unused slots OR in zero
+        masks[rows, bit_idx[:, slot] // 64] |= np.where(used[:, slot], bits, np.uint64(0))
+    return masks, bones
+
+
+def count_mask_bits(masks: np.ndarray) -> np.ndarray:
+    """
+    Count the set bits in each row of an (N, W) uint64 mask array.
+    """
+    masks = np.ascontiguousarray(masks, dtype=np.uint64)
+    return _POPCOUNT_U8[masks.view(np.uint8)].sum(axis=1, dtype=np.int64)
+
+
+def partition_by_bone_limit(masks: np.ndarray, max_bones: int) -> List[Tuple[int, int, np.ndarray]]:
+    """
+    Greedily split a sequence of triangles into runs that reference at most max_bones bones.
+    Each run is extended until adding the next triangle would go over the limit.
+    Every triangle must reference at most max_bones bones.
+
+    Instead of merging sets one triangle at a time, the cumulative union of a window of masks is computed at once.
+    The union only grows, so the first triangle which goes over the limit is found with a binary search.
+
+    :param masks: (T, W) bone masks of each triangle, from triangle_bone_masks.
+    :return: A list of (start, end, union mask) for each run of triangles masks[start:end].
+    """
+    n_tris = len(masks)
+    partitions = []
+    window = 64
+    start = 0
+    while start < n_tris:
+        union = np.zeros(masks.shape[1], dtype=np.uint64)
+        pos = start
+        while True:
+            cumulative = np.bitwise_or.accumulate(masks[pos:pos + window], axis=0) | union
+            n_over = np.searchsorted(count_mask_bits(cumulative), max_bones, side="right")
+            if n_over < len(cumulative):
+                end = pos + n_over
+                if n_over > 0:
+                    union = cumulative[n_over - 1]
+                break
+            union = cumulative[-1]
+            pos += len(cumulative)
+            if pos >= n_tris:
+                end = n_tris
+                break
+            window *= 2
+        if end == start:
+            raise ValueError(f"Triangle {start} references more than {max_bones} bones")
+        partitions.append((start, end, union))
+        # The next run is probably a similar length to this one
+        window = max(16, 2 * (end - start))
+        start = end
+    return partitions
+
+
+def mask_to_bones(mask: np.ndarray, bones: np.ndarray) -> np.ndarray:
+    """
+    Convert a single (W,) bone mask back to the sorted array of bones it references.
+    """
+    bits = np.unpackbits(np.asarray(mask, dtype="<u8").view(np.uint8), bitorder="little")
+    return bones[np.flatnonzero(bits[:len(bones)])]
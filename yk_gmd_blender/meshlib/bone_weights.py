@@ -0,0 +1,107 @@
+from dataclasses import dataclass
+from typing import Mapping
+
+import numpy as np
+
+# In very rare cases blender has spit out vertex groups where g.weight = 0.
+# Elsewhere we use .weight = 0 to imply "no group", so use a threshold value here to prevent this.
+MIN_WEIGHT = 1.0 / 255.0
+# Weights past the top 4 above this value are "major" influences, which are lost on export
+MAJOR_INFLUENCE_WEIGHT = 0.1
+
+
+def build_bone_remap_lut(bone_remapper: Mapping[int, int]) -> np.ndarray:
+    """
+    Convert a mapping of (old bone index) -> (new bone index) to a dense lookup table,
+    where lut[old] = new, or -1 if old isn't in the mapping.
+    """
+    if not bone_remapper:
+        return np.full(0, -1, dtype=np.int64)
+    old = np.fromiter(bone_remapper.keys(), dtype=np.int64, count=len(bone_remapper))
+    new = np.fromiter(bone_remapper.values(), dtype=np.int64, count=len(bone_remapper))
+    lut = np.full(old.max() + 1, -1, dtype=np.int64)
+    lut[old] = new
+    return lut
+
+
+def remap_weighted_bones(bones: np.ndarray, weights: np.ndarray, lut: np.ndarray) -> np.ndarray:
+    """
+    Remap an (N, 4) array of bone indices through a lookup table from build_bone_remap_lut.
+    Only bones with weight > 0 are remapped, the others are set to 0.
+    Raises KeyError if a weighted bone isn't in the lookup table.
+
+    :return: An (N, 4) int64 array of remapped bone indices.
+    """
+    bones = bones.astype(np.int64, copy=False)
+    weighted = weights > 0
+    weighted_bones = bones[weighted]
+
+    remapped = np.full(weighted_bones.shape, -1, dtype=np.int64)
+    in_range = weighted_bones < len(lut)
+    remapped[in_range] = lut[weighted_bones[in_range]]
+    if np.any(remapped < 0):
+        raise KeyError(f"Bone {weighted_bones[remapped < 0][0]} has weight but isn't in the bone remapping")
+
+    new_bones = np.zeros(bones.shape, dtype=np.int64)
+    new_bones[weighted] = remapped
+    return new_bones
+
+
+@dataclass(frozen=True)
+class TopWeights:
+    # (N, 4) uint16 vertex group indices, 0 where the weight is 0
+    bones: np.ndarray
+    # (N, 4) float32 weights in [0, 1], sorted in descending order per vertex
+    weights: np.ndarray
+    # (N,) uint8 number of nonzero weights per vertex
+    n_weights: np.ndarray
+    # True if any weight (including weights for irrelevant groups) is > 1. These are clamped to 1.
+    any_over_one: bool
+    # True if any weight (including weights for irrelevant groups) is < 0
+    any_negative: bool
+    # Number of vertices with major influences outside their top 4
+    n_verts_with_extra_major_influences: int
+
+
+def select_top4_weights(n_vertices: int, vertex_idx: np.ndarray, groups: np.ndarray, weights: np.ndarray,
+                        relevant_groups: np.ndarray) -> TopWeights:
+    """
+    Given every (vertex, vertex group, weight) triple in a mesh as flat arrays, find the top 4 weights per vertex.
+    Only groups in relevant_groups with weight >= MIN_WEIGHT are considered.
+    Equal weights keep the order they were given in.
+    """
+    vertex_idx = np.asarray(vertex_idx, dtype=np.int64)
+    groups = np.asarray(groups, dtype=np.int64)
+    # Compare in double precision, like comparing Blender's weights as Python floats
+    weights = np.asarray(weights, dtype=np.float64)
+
+    any_over_one = bool(np.any(weights > 1))
+    any_negative = bool(np.any(weights < 0))
+
+    keep = np.isin(groups, relevant_groups) & (weights >= MIN_WEIGHT)
+    vertex_idx, groups, weights = vertex_idx[keep], groups[keep], weights[keep]
+
+    # Sort by vertex, then descending weight. lexsort is stable, so ties keep their original order.
+    order = np.lexsort((-weights, vertex_idx))
+    vertex_idx, groups, weights = vertex_idx[order], groups[order], weights[order]
+    # Position of each weight within its vertex
+    counts = np.bincount(vertex_idx, minlength=n_vertices)
+    starts = np.cumsum(counts) - counts
+    rank = np.arange(len(vertex_idx)) - starts[vertex_idx]
+
+    top = rank < 4
+    out_bones = np.zeros((n_vertices, 4), np.uint16)
+    out_weights = np.zeros((n_vertices, 4), np.float32)
+    out_bones[vertex_idx[top], rank[top]] = groups[top]
+    out_weights[vertex_idx[top], rank[top]] = np.minimum(weights[top], 1.0)
+    n_weights = np.minimum(counts, 4).astype(np.uint8)
+
+    extra_major = ~top & (weights > MAJOR_INFLUENCE_WEIGHT)
+    return TopWeights(
+        bones=out_bones,
+        weights=out_weights,
+        n_weights=n_weights,
+        any_over_one=any_over_one,
+        any_negative=any_negative,
+        n_verts_with_extra_major_influences=len(np.unique(vertex_idx[extra_major])),
+    )
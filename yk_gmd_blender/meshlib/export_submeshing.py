@@ -1,4 +1,9 @@
-from typing import List, Dict, Tuple, TypeVar, Callable, NewType
+from dataclasses import dataclass
+from typing import List, Dict, Tuple, TypeVar, Callable, NewType, Union, Optional
+
+import numpy as np
+
+from yk_gmd_blender.meshlib.vertex_cache import optimize_for_vertex_cache
 
 # Int alias representing indices into bpy.types.Mesh().loops
 MeshLoopIdx = NewType("MeshLoopIdx", int)
@@ -44,34 +49,174 @@ def dedupe_loops(loops_with_dupes: List[MeshLoopIdx], vertex_bytes: List[bytes])
     0, 1, and 2 map to x.
     This is useful because deduped_verts defines the layout of the final vertex buffer, so this mapping converts
     triangles in blender-index-space to per-material-index-space.
+
+    Every element of vertex_bytes must be the same length.
+    See dedupe_packed_loops, which takes the vertices as a single packed buffer instead.
     """
     assert len(loops_with_dupes) == len(vertex_bytes)
+    bytes_per_vertex = len(vertex_bytes[0]) if vertex_bytes else 0
+    assert all(len(vertex) == bytes_per_vertex for vertex in vertex_bytes)
+
+    return dedupe_packed_loops(loops_with_dupes, b"".join(vertex_bytes), bytes_per_vertex)
+
+
+def dedupe_packed_loops(loops_with_dupes: Union[List[MeshLoopIdx], np.ndarray],
+                        packed_vertices: Union[bytes, bytearray, memoryview],
+                        bytes_per_vertex: int) -> Tuple[
+    List[MeshLoopIdx],
+    Dict[MeshLoopIdx, DedupedVertIdx]
+]:
+    """
+    Equivalent to dedupe_loops, where vertex i is packed_vertices[i * bytes_per_vertex:(i + 1) * bytes_per_vertex].
+
+    Each vertex is viewed as a single np.void value, so identical vertices are found with np.unique
+    instead of creating a bytes object for each one.
+    Deduplicated vertices keep the order of their first occurrence.
+    """
+    loops_arr = np.asarray(loops_with_dupes, dtype=np.int64)
+    if len(loops_arr) == 0:
+        return [], {}
+    assert len(packed_vertices) == len(loops_arr) * bytes_per_vertex
 
-    vertex_bytes_to_no_dupe_loop_idx: Dict[bytes, DedupedVertIdx] = {}
-
-    deduped_verts: List[MeshLoopIdx] = []
-    loop_idx_to_deduped_verts_idx: Dict[MeshLoopIdx, DedupedVertIdx] = {}
-    for i, (loop_idx, vertex) in enumerate(zip(loops_with_dupes, vertex_bytes)):
-        # See if this vertex data has already been encountered
-        no_dupe_loop_idx = vertex_bytes_to_no_dupe_loop_idx.get(vertex)
-        # If not, it's not a dupe - push it to deduped_verts and register in vertex_bytes_to...
-        if no_dupe_loop_idx is None:
-            no_dupe_loop_idx = DedupedVertIdx(len(deduped_verts))
-            deduped_verts.append(loop_idx)
-            vertex_bytes_to_no_dupe_loop_idx[vertex] = no_dupe_loop_idx
-        # Either way, we now know where this mesh loop maps to inside deduped_verts
-        loop_idx_to_deduped_verts_idx[loop_idx] = no_dupe_loop_idx
+    vertex_rows = np.frombuffer(packed_vertices, dtype=np.dtype((np.void, bytes_per_vertex)))
+    _, first_index, inverse = np.unique(vertex_rows, return_index=True, return_inverse=True)
+    # np.unique numbers vertices in sorted order, renumber them in order of first occurrence
+    order = np.argsort(first_index)
+    rank = np.empty(len(first_index), dtype=np.int64)
+    rank[order] = np.arange(len(first_index))
 
+    deduped_verts: List[MeshLoopIdx] = loops_arr[first_index[order]].tolist()
+    loop_idx_to_deduped_verts_idx: Dict[MeshLoopIdx, DedupedVertIdx] = dict(zip(
+        loops_arr.tolist(), rank[inverse.reshape(-1)].tolist()
+    ))
     return deduped_verts, loop_idx_to_deduped_verts_idx
 
 
+def partition_triangles_by_material(tri_loops: np.ndarray, material_indices: np.ndarray, n_materials: int) \
+        -> List[np.ndarray]:
+    """
+    Group a mesh's triangles by material in one pass.
+
+    :param tri_loops: (N, 3) MeshLoopIdx for each triangle, i.e. MeshLoopTri in array form.
+    :param material_indices: (N,) material index of each triangle.
+    :param n_materials: Number of materials to return triangles for. Triangles with other material indices are dropped.
+    :return: For each material index, a (K, 3) slice of the triangles using it, in their original order.
+    """
+    tri_loops = np.asarray(tri_loops, dtype=np.int64).reshape(-1, 3)
+    material_indices = np.asarray(material_indices, dtype=np.int64)
+    order = np.argsort(material_indices, kind="stable")
+    bounds = np.searchsorted(material_indices[order], np.arange(n_materials + 1)).tolist()
+    sorted_tris = tri_loops[order]
+    return [sorted_tris[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+
 TSubmesh = TypeVar("TSubmesh")
 
 
+@dataclass
+class SubmeshingStats:
+    """
+    Totals collected by convert_meshloop_tris_to_tsubmeshes, which can be accumulated over many calls.
+    """
+    triangles: int = 0
+    # Unique deduplicated vertices of each material, before splitting.
+    # Counted by the caller, because a material may be split over many calls (e.g. one per bone palette).
+    unique_verts: int = 0
+    # Vertices across all generated submeshes.
+    # Vertices shared between submeshes are counted once per submesh.
+    exported_verts: int = 0
+    # Vertex cache misses from drawing each submesh's triangles in order, see count_vertex_cache_misses
+    cache_misses: int = 0
+    # Vertex cache misses before each submesh was optimized with optimize_for_vertex_cache.
+    # Equal to cache_misses if the submeshes weren't optimized.
+    unoptimized_cache_misses: int = 0
+
+    @property
+    def duplicated_verts(self) -> int:
+        return self.exported_verts - self.unique_verts
+
+    @property
+    def acmr(self) -> float:
+        """Average Cache Miss Ratio - vertex cache misses per triangle. 3 is the worst case, 0.5 is ideal."""
+        return self.cache_misses / self.triangles if self.triangles else 0.0
+
+    @property
+    def unoptimized_acmr(self) -> float:
+        return self.unoptimized_cache_misses / self.triangles if self.triangles else 0.0
+
+    @property
+    def atvr(self) -> float:
+        """Average Transform to Vertex Ratio - vertex cache misses per exported vertex. 1 is ideal."""
+        return self.cache_misses / self.exported_verts if self.exported_verts else 0.0
+
+    @property
+    def unoptimized_atvr(self) -> float:
+        return self.unoptimized_cache_misses / self.exported_verts if self.exported_verts else 0.0
+
+    def __str__(self):
+        desc = f"{self.triangles} triangles, {self.exported_verts} vertices " \
+               f"({self.duplicated_verts} duplicated by splitting), ACMR {self.acmr:.3f}, ATVR {self.atvr:.3f}"
+        if self.unoptimized_cache_misses != self.cache_misses:
+            desc += f" (before vertex cache optimization: ACMR {self.unoptimized_acmr:.3f}, " \
+                    f"ATVR {self.unoptimized_atvr:.3f})"
+        return desc
+
+
+def count_vertex_cache_misses(tris: List[SubmeshTri], cache_size: int = 32) -> int:
+    """
+    Count the vertex cache misses from drawing triangles in order with a FIFO post-transform cache.
+    """
+    cache = [-1] * cache_size
+    cached = set()
+    next_slot = 0
+    misses = 0
+    for t in tris:
+        for v in t:
+            if v not in cached:
+                misses += 1
+                cached.discard(cache[next_slot])
+                cache[next_slot] = v
+                cached.add(v)
+                next_slot = (next_slot + 1) % cache_size
+    return misses
+
+
+def _spread_bits_3d(x: np.ndarray) -> np.ndarray:
+    # Spread the lower 10 bits of x out so there are two zero bits between each bit
+    x = x.astype(np.uint64) & 0x3FF
+    x = (x | (x << 16)) & 0x030000FF
+    x = (x | (x << 8)) & 0x0300F00F
+    x = (x | (x << 4)) & 0x030C30C3
+    x = (x | (x << 2)) & 0x09249249
+    return x
+
+
+def order_triangles_by_locality(tri_positions: np.ndarray) -> np.ndarray:
+    """
+    Given an (N, 3, 3) array of triangle vertex positions,
+    return a permutation of the triangles which sorts their centroids along a 3D Morton (Z-order) curve.
+
+    Triangles close together in space end up close together in the order,
+    so filling submeshes in this order shares more vertices within each submesh.
+    """
+    if len(tri_positions) == 0:
+        return np.zeros(0, dtype=np.int64)
+    centroids = tri_positions.mean(axis=1)
+    lo = centroids.min(axis=0)
+    extent = centroids.max(axis=0) - lo
+    # Quantize each axis to 10 bits, using the same scale for all axes
+    scale = 1023 / max(float(extent.max()), 1e-30)
+    cells = np.clip((centroids - lo) * scale, 0, 1023).astype(np.uint32)
+    codes = (_spread_bits_3d(cells[:, 0]) |
+             (_spread_bits_3d(cells[:, 1]) << 1) |
+             (_spread_bits_3d(cells[:, 2]) << 2))
+    return np.argsort(codes, kind="stable")
+
+
 def convert_meshloop_tris_to_tsubmeshes(
         deduped_verts: List[MeshLoopIdx],
         loop_idx_to_deduped_verts_idx: Dict[MeshLoopIdx, DedupedVertIdx],
-        triangles: List[MeshLoopTri],
+        triangles: Union[List[MeshLoopTri], np.ndarray],
         submesh_generator: Callable[
             [
                 List[MeshLoopIdx],
@@ -79,10 +224,47 @@ def convert_meshloop_tris_to_tsubmeshes(
             ],
             TSubmesh
         ],
-        max_verts_per_submesh=65536
+        max_verts_per_submesh=65536,
+        loop_positions: Optional[np.ndarray] = None,
+        optimize_vertex_cache: bool = False,
+        stats: Optional[SubmeshingStats] = None,
 ) -> List[TSubmesh]:
+    """
+    Split triangles into submeshes of at most max_verts_per_submesh vertices, filling each submesh in order.
+
+    If loop_positions (an array of positions indexed by MeshLoopIdx) is given and the triangles need more than one
+    submesh, the triangles are first reordered with order_triangles_by_locality.
+    This reduces the vertices duplicated between submeshes.
+    Triangles that fit in a single submesh keep their original order.
+
+    If optimize_vertex_cache is set, the triangles and vertices of each submesh are reordered
+    with optimize_for_vertex_cache before the submesh is generated.
+
+    If stats is given, totals for the generated submeshes are added to it.
+    stats.unique_verts is not updated, because the triangles may only be part of a material.
+    """
     assert max_verts_per_submesh >= 3
 
+    tri_loops = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    # Remap the triangles from MeshLoopIdx to DedupedVertIdx through a dense lookup table
+    if loop_idx_to_deduped_verts_idx:
+        lut_keys = np.fromiter(loop_idx_to_deduped_verts_idx.keys(), dtype=np.int64,
+                               count=len(loop_idx_to_deduped_verts_idx))
+        lut = np.full(lut_keys.max() + 1, -1, dtype=np.int64)
+        lut[lut_keys] = np.fromiter(loop_idx_to_deduped_verts_idx.values(), dtype=np.int64,
+                                    count=len(loop_idx_to_deduped_verts_idx))
+    else:
+        lut = np.full(0, -1, dtype=np.int64)
+    tris_no_dupes = np.full(tri_loops.shape, -1, dtype=np.int64)
+    in_range = tri_loops < len(lut)
+    tris_no_dupes[in_range] = lut[tri_loops[in_range]]
+    if np.any(tris_no_dupes < 0):
+        raise KeyError(f"Triangle uses loop {tri_loops[tris_no_dupes < 0][0]}, which has no deduplicated vertex")
+    n_unique_verts = len(np.unique(tris_no_dupes))
+    if loop_positions is not None and n_unique_verts > max_verts_per_submesh:
+        tri_order = order_triangles_by_locality(loop_positions[tri_loops])
+        tris_no_dupes = tris_no_dupes[tri_order]
+
     submeshes = []
 
     deduped_verts_idx_to_pending_vert_idx: Dict[DedupedVertIdx, SubmeshVertIdx] = {}
@@ -104,42 +286,43 @@ def convert_meshloop_tris_to_tsubmeshes(
 
     def push_submesh_and_reset_pending():
         nonlocal pending_verts, pending_tris, deduped_verts_idx_to_pending_vert_idx
+        unoptimized_cache_misses = count_vertex_cache_misses(pending_tris) if stats is not None else 0
+        if optimize_vertex_cache:
+            pending_verts, pending_tris = optimize_for_vertex_cache(pending_verts, pending_tris)
+        if stats is not None:
+            stats.exported_verts += len(pending_verts)
+            stats.unoptimized_cache_misses += unoptimized_cache_misses
+            stats.cache_misses += count_vertex_cache_misses(pending_tris) if optimize_vertex_cache \
+                else unoptimized_cache_misses
         submeshes.append(submesh_generator(pending_verts, pending_tris))
         pending_verts = []
         pending_tris = []
         deduped_verts_idx_to_pending_vert_idx = {}
 
-    for t in triangles:
-        t_no_dupes = (
-            loop_idx_to_deduped_verts_idx[t[0]],
-            loop_idx_to_deduped_verts_idx[t[1]],
-            loop_idx_to_deduped_verts_idx[t[2]],
-        )
-
+    for t_no_dupes in tris_no_dupes.tolist():
         # We have a maximum of `max_verts_per_submesh` vertices.
         # At most, adding a new triangle can only add 3 loops to the "pending" buffer.
         # also, adding a triangle may add 0 loops - if they're all used already.
         # So if we have `max_verts_per_submesh-3` loops, check to see how many we would add.
         if len(pending_verts) >= (max_verts_per_submesh - 3):
             # We have to be careful, we might grow beyond the buffer
-            num_to_add = 0
-            if deduped_verts[t_no_dupes[0]] not in deduped_verts_idx_to_pending_vert_idx:
-                num_to_add += 1
-            if deduped_verts[t_no_dupes[1]] not in deduped_verts_idx_to_pending_vert_idx:
-                num_to_add += 1
-            if deduped_verts[t_no_dupes[2]] not in deduped_verts_idx_to_pending_vert_idx:
-                num_to_add += 1
+            num_to_add = len(
+                {t_no_dupes[0], t_no_dupes[1], t_no_dupes[2]}.difference(deduped_verts_idx_to_pending_vert_idx)
+            )
             if len(pending_verts) + num_to_add > max_verts_per_submesh:
                 # Push the current loops into a Submesh struct and reset the pending
                 push_submesh_and_reset_pending()
         # We can add any triangle to the buffer, it's guaranteed to result in a buffer with <65536 loops
         pending_tris.append(SubmeshTri((
-            get_or_insert_pending_vert(t_no_dupes[0]),
-            get_or_insert_pending_vert(t_no_dupes[1]),
-            get_or_insert_pending_vert(t_no_dupes[2]),
+            get_or_insert_pending_vert(DedupedVertIdx(t_no_dupes[0])),
+            get_or_insert_pending_vert(DedupedVertIdx(t_no_dupes[1])),
+            get_or_insert_pending_vert(DedupedVertIdx(t_no_dupes[2])),
         )))
 
     if pending_verts or pending_tris:
         push_submesh_and_reset_pending()
 
+    if stats is not None:
+        stats.triangles += len(tris_no_dupes)
+
     return submeshes
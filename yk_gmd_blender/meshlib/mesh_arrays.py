@@ -0,0 +1,204 @@
+from dataclasses import dataclass
+from typing import List, Sequence, Optional, Tuple
+
+import numpy as np
+
+from yk_gmd_blender.meshlib.triangle_strips import RESET_INDEX
+
+"""
+This module builds flat arrays describing a single Blender mesh merged from many GMD meshes,
+so the mesh can be created with foreach_set() instead of vertex-by-vertex and face-by-face through BMesh.
+
+The merged mesh has one face (of three loops) per triangle.
+Per-vertex data (positions, normals, bone weights) comes from one "source" vertex in one GMD vertex buffer.
+Per-loop data (colors, UVs...) comes from the GMD vertex each triangle corner originally referenced,
+so data that differs between fused vertices is kept.
+"""
+
+
+@dataclass(frozen=True)
+class MergedMeshTopology:
+    # (V,) for each merged vertex, the vertex buffer it takes per-vertex data from
+    vertex_src_buf: np.ndarray
+    # (V,) for each merged vertex, the index inside vertex_src_buf it takes per-vertex data from
+    vertex_src_idx: np.ndarray
+    # (F, 3) merged vertex indices of each face
+    face_verts: np.ndarray
+    # (F,) the GMD mesh/vertex buffer each face came from. Non-decreasing.
+    face_buf: np.ndarray
+    # (F * 3,) for each loop, the index inside its face's vertex buffer it takes per-loop data from
+    loop_src_idx: np.ndarray
+    # Number of vertex buffers the mesh was merged from
+    n_bufs: int
+    # Number of triangles which were skipped because they contained RESET_INDEX
+    n_reset_index_tris: int
+
+    @property
+    def n_vertices(self) -> int:
+        return len(self.vertex_src_buf)
+
+    @property
+    def n_loops(self) -> int:
+        return len(self.loop_src_idx)
+
+    def loop_buf_ranges(self) -> List[Tuple[int, int]]:
+        """
+        For each vertex buffer, the (start, end) range of loops which came from that buffer.
+        """
+        bounds = (np.searchsorted(self.face_buf, np.arange(self.n_bufs + 1)) * 3).tolist()
+        return list(zip(bounds[:-1], bounds[1:]))
+
+
+def build_merged_mesh_topology(
+        idx_bufs: Sequence[Sequence[int]],
+        buf_idx_to_merged_idx: Sequence[Sequence[int]],
+        is_fused: Optional[Sequence[Sequence[bool]]] = None,
+) -> MergedMeshTopology:
+    """
+    Build the topology of a merged mesh.
+
+    Triangles are kept in order, except
+    - triangles containing RESET_INDEX are skipped
+    - triangles which use the same merged vertex twice (i.e. became degenerate through vertex fusion) are skipped
+    - triangles which use the same merged vertices as a previous triangle are skipped, whatever their winding.
+
+    :param idx_bufs: The triangle-list index buffer for each GMD mesh.
+    :param buf_idx_to_merged_idx: For each vertex buffer, the merged vertex index of each vertex.
+    :param is_fused: For each vertex buffer, whether each vertex was fused into a previous vertex.
+    The first unfused vertex mapping to each merged vertex provides its per-vertex data.
+    If None, no vertices are fused.
+    """
+    n_bufs = len(idx_bufs)
+    buf_lens = [len(m) for m in buf_idx_to_merged_idx]
+    buf_offsets = np.zeros(n_bufs + 1, dtype=np.int64)
+    buf_offsets[1:] = np.cumsum(buf_lens)
+    merged_idx = np.concatenate([np.asarray(m, dtype=np.int64) for m in buf_idx_to_merged_idx]) if n_bufs \
+        else np.zeros(0, dtype=np.int64)
+    global_buf = np.repeat(np.arange(n_bufs, dtype=np.int64), buf_lens)
+    global_idx = np.arange(len(merged_idx), dtype=np.int64) - buf_offsets[global_buf]
+
+    # Per-vertex data sources
+    if is_fused is None:
+        is_source = np.ones(len(merged_idx), dtype=bool)
+    else:
+        is_source = ~np.concatenate([np.asarray(f, dtype=bool) for f in is_fused]) if n_bufs \
+            else np.zeros(0, dtype=bool)
+    n_vertices = int(merged_idx.max()) + 1 if len(merged_idx) else 0
+    vertex_src_buf = np.zeros(n_vertices, dtype=np.int64)
+    vertex_src_idx = np.zeros(n_vertices, dtype=np.int64)
+    # Assign in reverse, so the first source for each merged vertex wins
+    sources = np.flatnonzero(is_source)[::-1]
+    vertex_src_buf[merged_idx[sources]] = global_buf[sources]
+    vertex_src_idx[merged_idx[sources]] = global_idx[sources]
+
+    # Triangles
+    local_tris = [np.asarray(idx_buf, dtype=np.int64).reshape(-1, 3) for idx_buf in idx_bufs]
+    if local_tris:
+        tris = np.concatenate(local_tris)
+        tri_buf = np.repeat(np.arange(n_bufs, dtype=np.int64), [len(t) for t in local_tris])
+    else:
+        tris = np.zeros((0, 3), dtype=np.int64)
+        tri_buf = np.zeros(0, dtype=np.int64)
+
+    has_reset = (tris == RESET_INDEX).any(axis=1)
+    keep = ~has_reset
+    remapped = np.zeros_like(tris)
+    remapped[keep] = merged_idx[tris[keep] + buf_offsets[tri_buf[keep], np.newaxis]]
+    # Degenerate triangles
+    keep &= (remapped[:, 0] != remapped[:, 1]) & (remapped[:, 1] != remapped[:, 2]) & \
+            (remapped[:, 0] != remapped[:, 2])
+    # Duplicate triangles - keep the first triangle with each set of vertices
+    kept_idx = np.flatnonzero(keep)
+    if len(kept_idx):
+        _, first = np.unique(np.sort(remapped[kept_idx], axis=1), axis=0, return_index=True)
+        keep[:] = False
+        keep[kept_idx[first]] = True
+
+    return MergedMeshTopology(
+        vertex_src_buf=vertex_src_buf,
+        vertex_src_idx=vertex_src_idx,
+        face_verts=remapped[keep],
+        face_buf=tri_buf[keep],
+        loop_src_idx=tris[keep].reshape(-1),
+        n_bufs=n_bufs,
+        n_reset_index_tris=int(has_reset.sum()),
+    )
+
+
+def _fit_components(data: np.ndarray, n_comps: int, default: float) -> np.ndarray:
+    # Truncate or pad (N, k) data to (N, n_comps) float32
+    data = np.asarray(data, dtype=np.float32).reshape(len(data), -1)
+    if data.shape[1] >= n_comps:
+        return data[:, :n_comps]
+    padded = np.full((len(data), n_comps), default, dtype=np.float32)
+    padded[:, :data.shape[1]] = data
+    return padded
+
+
+def gather_vertex_data(topology: MergedMeshTopology, buf_data: Sequence[Optional[np.ndarray]],
+                       n_comps: int, default: float = 0.0) -> np.ndarray:
+    """
+    Gather per-vertex data for each merged vertex from its source vertex.
+
+    :param buf_data: For each vertex buffer, (N, k) data for each vertex or None if the buffer doesn't have any.
+    :param n_comps: Number of components to output. Data is truncated or padded with default to fit.
+    :param default: Value for vertices whose buffer doesn't have data.
+    :return: (V, n_comps) float32 array
+    """
+    out = np.full((topology.n_vertices, n_comps), default, dtype=np.float32)
+    for i_buf, data in enumerate(buf_data):
+        if data is None:
+            continue
+        verts = np.flatnonzero(topology.vertex_src_buf == i_buf)
+        out[verts] = _fit_components(np.asarray(data)[topology.vertex_src_idx[verts]], n_comps, default)
+    return out
+
+
+def gather_loop_data(topology: MergedMeshTopology, buf_data: Sequence[Optional[np.ndarray]],
+                     n_comps: int, default: float = 0.0) -> np.ndarray:
+    """
+    Gather per-loop data for each loop of the merged mesh from the vertex its triangle originally referenced.
+    Parameters are the same as gather_vertex_data.
+
+    :return: (L, n_comps) float32 array
+    """
+    out = np.full((topology.n_loops, n_comps), default, dtype=np.float32)
+    for (start, end), data in zip(topology.loop_buf_ranges(), buf_data):
+        if data is None or start == end:
+            continue
+        out[start:end] = _fit_components(np.asarray(data)[topology.loop_src_idx[start:end]], n_comps, default)
+    return out
+
+
+def gmd_to_blender_xyz(data: np.ndarray) -> np.ndarray:
+    """
+    Convert (N, 3+) GMD-space positions or directions to (N, 3) Blender space with the (-x, z, y) transposition.
+    """
+    data = np.asarray(data, dtype=np.float32)
+    return np.stack([-data[:, 0], data[:, 2], data[:, 1]], axis=1)
+
+
+def normalize_rows(data: np.ndarray) -> np.ndarray:
+    """
+    Normalize each row of an (N, k) array, returning float32.
+    Lengths are computed in double precision like mathutils.Vector.normalize(), and zero-length rows are left as zero.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    lengths = np.linalg.norm(data, axis=1, keepdims=True)
+    return np.divide(data, lengths, out=np.zeros_like(data), where=lengths > 0).astype(np.float32)
+
+
+def deform_weight_triples(bone_data: np.ndarray, weight_data: np.ndarray, bone_to_group: np.ndarray) \
+        -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Convert (V, 4) bone indices and weights to (vertex, vertex group, weight) triples.
+    Each vertex's weights are read in order up to the first weight <= 0.
+
+    :param bone_to_group: Maps each bone index to a vertex group index.
+    :return: (vertex indices, vertex group indices, weights) as flat arrays
+    """
+    weight_data = np.asarray(weight_data, dtype=np.float32)
+    used = np.logical_and.accumulate(weight_data > 0, axis=1)
+    vertex, slot = np.nonzero(used)
+    bones = np.asarray(bone_data, dtype=np.int64)[vertex, slot]
+    return vertex, bone_to_group[bones], weight_data[vertex, slot]
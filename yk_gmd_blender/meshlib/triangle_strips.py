@@ -0,0 +1,182 @@
+from collections import defaultdict
+from typing import Tuple, List, Dict, Optional
+
+import numpy as np
+
+# Index value signalling the end of a strip in strips with primitive restart
+RESET_INDEX = 0xFFFF
+
+
+def triangles_to_array(triangles) -> np.ndarray:
+    """
+    Convert an iterable of (t0, t1, t2) triangles, or an array of indices, to an (N, 3) int64 array.
+    Raises OverflowError if an index doesn't fit in 16 bits, like array.array("H") would.
+    """
+    if isinstance(triangles, np.ndarray):
+        tri_arr = triangles.astype(np.int64, copy=False).reshape(-1, 3)
+    else:
+        tri_arr = np.array(list(triangles), dtype=np.int64).reshape(-1, 3)
+    if len(tri_arr) and (tri_arr.min() < 0 or tri_arr.max() > 0xFFFF):
+        raise OverflowError(f"Triangle indices must be in [0, 65535], got [{tri_arr.min()}, {tri_arr.max()}]")
+    return tri_arr
+
+
+def _strip_continues(tris: np.ndarray) -> np.ndarray:
+    """
+    For each triangle, decide if it continues the strip built from the previous triangles.
+
+    A triangle (t0, t1, t2) continues the strip iff the last two strip indices are (t0, t1).
+    The last index is always the previous t2, and the second-to-last is either the previous t1 (if the previous
+    triangle started a new strip) or the t2 before that (if it continued the strip).
+    Each step is one of four functions of the previous decision (always false, always true, copy or negate),
+    so decisions can be resolved with cumulative operations: take the value of the last "always" step,
+    and flip it once for every "negate" step since.
+    """
+    n = len(tris)
+    continues = np.zeros(n, dtype=bool)
+    if n < 2:
+        return continues
+
+    t0, t1, t2 = tris[:, 0], tris[:, 1], tris[:, 2]
+    # If the previous triangle started a strip, the last two indices are (prev t1, prev t2)
+    if_prev_started = np.zeros(n, dtype=bool)
+    if_prev_started[1:] = (t1[:-1] == t0[1:]) & (t2[:-1] == t1[1:])
+    # If the previous triangle continued a strip, the last two indices are (prev prev t2, prev t2)
+    if_prev_continued = np.zeros(n, dtype=bool)
+    if_prev_continued[2:] = (t2[:-2] == t0[2:]) & (t2[1:-1] == t1[2:])
+
+    # The first triangle always starts a strip
+    is_constant = if_prev_started == if_prev_continued
+    is_constant[0] = True
+    constant_value = if_prev_started.copy()
+    constant_value[0] = False
+    # For non-constant steps, if_prev_started=True means "negate", if_prev_started=False means "copy"
+    is_negate = (~is_constant) & if_prev_started
+
+    last_constant_idx = np.maximum.accumulate(np.where(is_constant, np.arange(n), 0))
+    negate_count = np.cumsum(is_negate)
+    negates_since_constant = negate_count - negate_count[last_constant_idx]
+    continues[:] = constant_value[last_constant_idx] ^ (negates_since_constant % 2 == 1)
+    return continues
+
+
+def build_triangle_strips(tris: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build the no-reset and reset triangle strips for an (N, 3) array of triangles, in triangle order.
+
+    Consecutive triangles (t0, t1, t2) are joined into the same strip if the strip currently ends with (t0, t1).
+    Otherwise a new strip is started, separated from the old one by degenerate triangles in the no-reset strip
+    (by repeating the last index of the old strip and the first of the new) or by RESET_INDEX in the reset strip.
+
+    :return: (no-reset strip, reset strip) as uint16 arrays.
+    """
+    n = len(tris)
+    if n == 0:
+        return np.zeros(0, dtype=np.uint16), np.zeros(0, dtype=np.uint16)
+
+    continues = _strip_continues(tris)
+    starts = ~continues
+    is_first = np.zeros(n, dtype=bool)
+    is_first[0] = True
+    restarts = starts & ~is_first
+
+    t0, t1, t2 = tris[:, 0], tris[:, 1], tris[:, 2]
+    prev_t2 = np.zeros(n, dtype=np.int64)
+    prev_t2[1:] = t2[:-1]
+
+    # Each triangle contributes a subset of these columns, in order
+    noreset_candidates = np.stack([prev_t2, t0, t0, t1, t2], axis=1)
+    noreset_mask = np.zeros((n, 5), dtype=bool)
+    noreset_mask[:, 4] = True
+    noreset_mask[starts, 2:4] = True
+    noreset_mask[restarts, 0:2] = True
+
+    reset_candidates = np.stack([np.full(n, RESET_INDEX, dtype=np.int64), t0, t1, t2], axis=1)
+    reset_mask = np.zeros((n, 4), dtype=bool)
+    reset_mask[:, 3] = True
+    reset_mask[starts, 1:3] = True
+    reset_mask[restarts, 0] = True
+
+    return (
+        noreset_candidates[noreset_mask].astype(np.uint16),
+        reset_candidates[reset_mask].astype(np.uint16),
+    )
+
+
+def build_optimized_triangle_strips(tris: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build no-reset and reset triangle strips for an (N, 3) array of triangles using a greedy stripifier.
+
+    Unlike build_triangle_strips, this doesn't keep the input triangle order:
+    it grows each strip through any unused neighbouring triangle, so meshes generally need fewer, longer strips,
+    and so fewer degenerate triangles/reset indices.
+    Strips respect winding - triangle i of a strip is (s[i], s[i+1], s[i+2]) for even i and
+    (s[i+1], s[i], s[i+2]) for odd i, and always matches the winding of the input triangle.
+    In the no-reset strip, each strip starts on an even index so the winding is kept across degenerate joins.
+
+    :return: (no-reset strip, reset strip) as uint16 arrays.
+    """
+    n = len(tris)
+    if n == 0:
+        return np.zeros(0, dtype=np.uint16), np.zeros(0, dtype=np.uint16)
+
+    tri_list: List[Tuple[int, int, int]] = [tuple(t) for t in tris.tolist()]
+    # Map each directed edge (a -> b) to the triangles containing it, and the third vertex of that triangle
+    edge_to_tris: Dict[Tuple[int, int], List[Tuple[int, int]]] = defaultdict(list)
+    for i, (a, b, c) in enumerate(tri_list):
+        edge_to_tris[(a, b)].append((i, c))
+        edge_to_tris[(b, c)].append((i, a))
+        edge_to_tris[(c, a)].append((i, b))
+
+    used = np.zeros(n, dtype=bool)
+
+    def find_next(strip: List[int], tentative: set) -> Optional[Tuple[int, int]]:
+        # The next triangle is at index len(strip) - 2 of the strip
+        if (len(strip) - 2) % 2 == 0:
+            edge = (strip[-2], strip[-1])
+        else:
+            edge = (strip[-1], strip[-2])
+        for tri_idx, third in edge_to_tris.get(edge, ()):
+            if not used[tri_idx] and tri_idx not in tentative:
+                return tri_idx, third
+        return None
+
+    def grow(start_tri: int, rotation: int) -> Tuple[List[int], List[int]]:
+        a, b, c = tri_list[start_tri]
+        strip = [a, b, c][rotation:] + [a, b, c][:rotation]
+        strip_tris = [start_tri]
+        tentative = {start_tri}
+        while True:
+            next_tri = find_next(strip, tentative)
+            if next_tri is None:
+                break
+            tri_idx, third = next_tri
+            strip.append(third)
+            strip_tris.append(tri_idx)
+            tentative.add(tri_idx)
+        return strip, strip_tris
+
+    strips: List[List[int]] = []
+    for start_tri in range(n):
+        if used[start_tri]:
+            continue
+        # Try each rotation of the starting triangle, keep the longest strip
+        best_strip, best_tris = max((grow(start_tri, rotation) for rotation in range(3)),
+                                    key=lambda strip_and_tris: len(strip_and_tris[1]))
+        used[best_tris] = True
+        strips.append(best_strip)
+
+    noreset: List[int] = []
+    reset: List[int] = []
+    for strip in strips:
+        if noreset:
+            # Degenerate join, padded so the new strip starts on an even index
+            noreset.append(noreset[-1])
+            noreset.append(strip[0])
+            if len(noreset) % 2 == 1:
+                noreset.append(strip[0])
+            reset.append(RESET_INDEX)
+        noreset += strip
+        reset += strip
+
+    return np.array(noreset, dtype=np.uint16), np.array(reset, dtype=np.uint16)
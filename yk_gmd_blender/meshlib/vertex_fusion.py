@@ -1,8 +1,9 @@
 import array
 from collections import defaultdict
-from typing import List, Dict, Tuple, Set, DefaultDict, Iterable, Sequence
+from typing import List, Dict, Tuple, Set, DefaultDict, Sequence, Optional
+
+import numpy as np
 
-from mathutils import Vector
 from yk_gmd_blender.gmdlib.abstract.gmd_mesh import GMDSkinnedMesh
 from yk_gmd_blender.gmdlib.abstract.gmd_shader import GMDVertexBuffer, GMDSkinnedVertexBuffer
 from yk_gmd_blender.gmdlib.abstract.nodes.gmd_bone import GMDBone
@@ -103,93 +104,238 @@ def make_bone_indices_consistent(
     # Start from the first mesh's bone list, then grow from there
     remapped_vertices = [gmd_meshes[0].vertices_data]
     relevant_bones = gmd_meshes[0].relevant_bones[:]
+    # Index of each bone in relevant_bones, keyed on identity because GMDBone isn't hashable
+    relevant_bone_idx = {id(bone): i for i, bone in enumerate(relevant_bones)}
     # The first mesh doesn't need remapping, because we start from its bone list, but subsequent ones do
     for i_mesh in range(1, len(gmd_meshes)):
         gmd_mesh = gmd_meshes[i_mesh]
 
-        # Mapping of gmd_meshes[i] bone indices to relevant_bones indices
-        bone_index_mapping = {}
+        # Lookup table of gmd_meshes[i] bone indices to relevant_bones indices
+        bone_index_lut = np.zeros(len(gmd_mesh.relevant_bones), dtype=np.int64)
         for i, bone in enumerate(gmd_mesh.relevant_bones):
-            if bone not in relevant_bones:
-                relevant_bones.append(bone)
-            bone_index_mapping[i] = relevant_bones.index(bone)
-
-        def remap_weight(bone: int, weight: float) -> int:
-            # If the weight is 0 the bone is unused, so map it to a consistent 0.
-            if weight == 0:
-                return 0
-            else:
-                return bone_index_mapping[bone]
+            idx = relevant_bone_idx.get(id(bone))
+            if idx is None:
+                # Fall back to equality, in case an equal bone object is already in the list
+                if bone in relevant_bones:
+                    idx = relevant_bones.index(bone)
+                else:
+                    idx = len(relevant_bones)
+                    relevant_bones.append(bone)
+                relevant_bone_idx[id(bone)] = idx
+            bone_index_lut[i] = idx
 
         # Copy the vertex buffer
         verts_to_remap = gmd_mesh.vertices_data.copy_as_skinned()
-        # Remap the bones in the vertices
-        for i_vtx in range(len(verts_to_remap)):
-            old_weights = verts_to_remap.weight_data[i_vtx]
-            old_bones = verts_to_remap.bone_data[i_vtx]
-            new_bones = (
-                remap_weight(old_bones[0], old_weights[0]),
-                remap_weight(old_bones[1], old_weights[1]),
-                remap_weight(old_bones[2], old_weights[2]),
-                remap_weight(old_bones[3], old_weights[3]),
-            )
-            verts_to_remap.bone_data[i_vtx] = Vector(new_bones)
+        # Remap the bones in the vertices.
+        # If the weight is 0 the bone is unused, so map it to a consistent 0.
+        old_bones = verts_to_remap.bone_data.astype(np.int64)
+        used = verts_to_remap.weight_data != 0
+        if used.any() and old_bones[used].max() >= len(bone_index_lut):
+            raise IndexError(f"Mesh vertices reference bone {old_bones[used].max()}, "
+                             f"but the mesh only has {len(bone_index_lut)} relevant bones")
+        new_bones = np.zeros_like(old_bones)
+        new_bones[used] = bone_index_lut[old_bones[used]]
+        verts_to_remap.bone_data[:] = new_bones
         remapped_vertices.append(verts_to_remap)
 
     # Done, return the full list of relevant bones.
     return relevant_bones, remapped_vertices
 
 
-def fuse_adjacent_vertices(
-        vertices: Sequence[GMDVertexBuffer]
-) -> Tuple[List[List[NotRemappedVertIdx]], List[List[VertIdx]], List[List[bool]]]:
+def _fusion_key_columns(buf: GMDVertexBuffer) -> List[Tuple[int, Optional[np.ndarray]]]:
+    # The per-vertex data compared by fuse_adjacent_vertices, as (expected width, (N, width) array or None) pairs
+    return [
+        (3, None if buf.pos is None else _as_rows(buf.pos, len(buf))[:, :3]),
+        (3, None if buf.normal is None else _as_rows(buf.normal, len(buf))[:, :3]),
+        (4, None if buf.bone_data is None else _as_rows(buf.bone_data, len(buf))),
+        (4, None if buf.weight_data is None else _as_rows(buf.weight_data, len(buf))),
+    ]
+
+
+def _as_rows(data, n: int) -> np.ndarray:
+    return np.asarray(data, dtype=np.float32).reshape(n, -1)
+
+
+# Internally, vertex fusion works on flat arrays indexed by "global" vertex index,
+# where the vertices of each buffer follow on from the vertices of the previous buffer.
+# The list/tuple/dict representations used by the public functions are only created for their outputs.
+
+def _buf_offsets(buf_lens: List[int]) -> np.ndarray:
+    # The global index of the first vertex in each buffer
+    return np.cumsum([0] + buf_lens[:-1]).astype(np.int64)
+
+
+def _global_to_buf_idx(buf_lens: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+    # (i_buf, i_vertex_in_buf) for each global vertex index
+    buf_idx = np.repeat(np.arange(len(buf_lens), dtype=np.int64), buf_lens)
+    vtx_idx = np.arange(sum(buf_lens), dtype=np.int64) - _buf_offsets(buf_lens)[buf_idx]
+    return buf_idx, vtx_idx
+
+
+def _flatten_triangles(idx_bufs: List[array.ArrayType], buf_lens: List[int]) -> Tuple[np.ndarray, np.ndarray]:
     """
-    Given a set of vertices, fuse those that are "adjacent" (see vertex_fusion() docs for definition).
-    Returns data on the vertices that need to be fused.
+    Combine the triangles from each index buffer.
 
-    :param vertices: Vertex buffers
-    :return: (fused_idx_to_buf_idx, buf_idx_to_fused_idx, is_fused)
+    :return: ((T, 3) global vertex indices of each triangle, (T,) buffer index of each triangle)
     """
+    local_tris = [np.asarray(idx_buf, dtype=np.int64).reshape(-1, 3) for idx_buf in idx_bufs]
+    if not local_tris:
+        return np.zeros((0, 3), dtype=np.int64), np.zeros(0, dtype=np.int64)
+    tri_buf = np.repeat(np.arange(len(local_tris), dtype=np.int64), [len(tris) for tris in local_tris])
+    tri_verts = np.concatenate(local_tris) + _buf_offsets(buf_lens)[tri_buf][:, np.newaxis]
+    return tri_verts, tri_buf
+
+
+def _flatten_fusions(fused_idx_to_buf_idx: List[List[NotRemappedVertIdx]]) \
+        -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Flatten a fused_idx_to_buf_idx mapping.
+
+    :return: (i_buf, i_vertex_in_buf, fused index) for each vertex in each fusion, in order.
+    """
+    buf_idxs = np.array([buf_idx for fused_verts in fused_idx_to_buf_idx for buf_idx in fused_verts],
+                        dtype=np.int64).reshape(-1, 2)
+    fused = np.repeat(np.arange(len(fused_idx_to_buf_idx), dtype=np.int64),
+                      [len(fused_verts) for fused_verts in fused_idx_to_buf_idx])
+    return buf_idxs[:, 0], buf_idxs[:, 1], fused
+
+
+def _sorted_unique(values: np.ndarray) -> np.ndarray:
+    # Equivalent to np.unique(values) for integer arrays
+    values = np.sort(values)
+    if len(values):
+        values = values[np.concatenate([[True], values[1:] != values[:-1]])]
+    return values
+
+
+def _renumber_by_first_occurrence(labels: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Renumber arbitrary labels to 0..N-1 in order of their first occurrence.
+
+    :return: (new label of each element, whether each element is the first with its label)
+    """
+    if len(labels) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool)
+    _, first_index, inverse = np.unique(labels, return_index=True, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    rank = np.empty(len(first_index), dtype=np.int64)
+    rank[np.argsort(first_index)] = np.arange(len(first_index))
+    return rank[inverse], first_index[inverse] == np.arange(len(labels))
+
+
+def _fusion_outputs(
+        fused: np.ndarray,
+        is_first: np.ndarray,
+        buf_lens: List[int]
+) -> Tuple[List[List[NotRemappedVertIdx]], List[List[VertIdx]], List[List[bool]]]:
+    """
+    Convert the fused index of each global vertex to (fused_idx_to_buf_idx, buf_idx_to_fused_idx, is_fused).
+    Fused indices must be numbered in order of first occurrence.
+    """
+    n_fused = int(fused.max()) + 1 if len(fused) else 0
 
-    vert_indices: Dict[Tuple[Vector, Vector, Vector, Vector], VertIdx] = {}
     # fused_idx_to_buf_idx[i] contains (i_buf, i_vertex_in_buf) indices that are all fused into vertex [i]
     # each element of this list defines an adjacency relation - all vertices in fused_idx_to_buf_idx[i] are "adjacent"
+    buf_idx, vtx_idx = _global_to_buf_idx(buf_lens)
+    grouped = np.argsort(fused, kind="stable")
+    group_pairs = list(zip(buf_idx[grouped].tolist(), vtx_idx[grouped].tolist()))
     fused_idx_to_buf_idx: List[List[NotRemappedVertIdx]] = []
+    group_start = 0
+    for group_end in np.cumsum(np.bincount(fused, minlength=n_fused)).tolist():
+        fused_idx_to_buf_idx.append(group_pairs[group_start:group_end])
+        group_start = group_end
+
     # buf_idx_to_fused_idx[i_buf][i_vertex_in_buf] contains the fused index
-    buf_idx_to_fused_idx: List[List[VertIdx]] = [
-        [-1] * len(buf)
-        for buf in vertices
-    ]
     # is_fused[i_buf][i_vertex_in_buf] = was that vertex fused into a previous vertex, or did it create a new one.
     # NOTE: is_fused will be FALSE for the first vertex in a fusion
     # i.e. if vertices [0, 1, 2] are fused into a single vertex, is_fused[0] will be FALSE because vertex 0 was not fused into anything before it.
-    is_fused: List[List[bool]] = [
-        [False] * len(buf)
-        for buf in vertices
+    buf_idx_to_fused_idx: List[List[VertIdx]] = []
+    is_fused: List[List[bool]] = []
+    for buf_start, buf_len in zip(_buf_offsets(buf_lens).tolist(), buf_lens):
+        buf_idx_to_fused_idx.append(fused[buf_start:buf_start + buf_len].tolist())
+        is_fused.append((~is_first[buf_start:buf_start + buf_len]).tolist())
+
+    return fused_idx_to_buf_idx, buf_idx_to_fused_idx, is_fused
+
+
+def _fuse_adjacent_vertex_indices(vertices: Sequence[GMDVertexBuffer]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Array implementation of fuse_adjacent_vertices.
+
+    :return: (fused index of each global vertex, whether each global vertex is the first in its fusion)
+    """
+    buf_lens = [len(buf) for buf in vertices]
+    n_verts = sum(buf_lens)
+    if n_verts == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool)
+
+    # Build one key row per vertex across all buffers.
+    # Each component gets a "width" column, which is 0 if the buffer doesn't have that component,
+    # so vertices from buffers with different layouts are never adjacent.
+    column_sets = [(len(buf), _fusion_key_columns(buf)) for buf in vertices if len(buf)]
+    widths = [
+        max([expected] + [cols[i][1].shape[1] for _, cols in column_sets if cols[i][1] is not None])
+        for i, (expected, _) in enumerate(column_sets[0][1])
     ]
+    key_values = np.zeros((n_verts, sum(widths) + len(widths)), dtype=np.float32)
+    row = 0
+    for n, cols in column_sets:
+        col = 0
+        for (_, data), width in zip(cols, widths):
+            if data is not None:
+                key_values[row:row + n, col] = data.shape[1]
+                key_values[row:row + n, col + 1:col + 1 + data.shape[1]] = data
+            col += width + 1
+        row += n
+    # Compare floats by value, not by bit pattern: -0.0 == 0.0, and NaN is never equal to anything
+    key_values += np.float32(0.0)
+    nan_rows = np.isnan(key_values).any(axis=1)
+
+    key_dtype = np.dtype([("values", np.float32, (key_values.shape[1],)), ("nan_id", np.int64)])
+    keys = np.empty(n_verts, dtype=key_dtype)
+    keys["values"] = np.where(nan_rows[:, np.newaxis], 0, key_values)
+    keys["nan_id"] = np.where(nan_rows, np.arange(n_verts), -1)
+
+    return _renumber_by_first_occurrence(keys.view(np.dtype((np.void, key_dtype.itemsize))))
 
-    for i_buf, buf in enumerate(vertices):
-        for i in range(len(buf)):
-            vert_info = (
-                Vector(buf.pos[i][:3]).freeze(),
-                Vector(buf.normal[i][:3]).freeze() if buf.normal is not None else None,
-                Vector(buf.bone_data[i]).freeze() if buf.bone_data is not None else None,
-                Vector(buf.weight_data[i]).freeze() if buf.weight_data is not None else None,
-            )
-            if vert_info in vert_indices:
-                # Fuse this into a previous vertex
-                fusion_idx = vert_indices[vert_info]
-                fused_idx_to_buf_idx[fusion_idx].append((i_buf, i))
-                buf_idx_to_fused_idx[i_buf][i] = fusion_idx
-                is_fused[i_buf][i] = True
-            else:
-                fusion_idx = len(fused_idx_to_buf_idx)
-                vert_indices[vert_info] = fusion_idx
-                fused_idx_to_buf_idx.append([(i_buf, i)])
-                buf_idx_to_fused_idx[i_buf][i] = fusion_idx
-                is_fused[i_buf][i] = False
 
-    return fused_idx_to_buf_idx, buf_idx_to_fused_idx, is_fused
+def fuse_adjacent_vertices(
+        vertices: Sequence[GMDVertexBuffer]
+) -> Tuple[List[List[NotRemappedVertIdx]], List[List[VertIdx]], List[List[bool]]]:
+    """
+    Given a set of vertices, fuse those that are "adjacent" (see vertex_fusion() docs for definition).
+    Returns data on the vertices that need to be fused.
+
+    Vertices are adjacent if they have exactly equal (position, normal, bone, weight) data.
+    Each vertex is packed into a fixed-size binary key, and np.unique finds the groups of identical keys.
+    Fused vertices are numbered in order of their first occurrence.
+
+    :param vertices: Vertex buffers
+    :return: (fused_idx_to_buf_idx, buf_idx_to_fused_idx, is_fused)
+    """
+
+    fused, is_first = _fuse_adjacent_vertex_indices(vertices)
+    return _fusion_outputs(fused, is_first, [len(buf) for buf in vertices])
+
+
+def _group_fused_triangles(tri_verts: np.ndarray, fused: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Group triangles by the fused triangle they result in, ignoring winding.
+    Groups are numbered in order of their first triangle.
+
+    :param tri_verts: (T, 3) global vertex indices of each triangle
+    :param fused: Fused index of each global vertex
+    :return: ((G, 3) sorted fused triangle of each group, (T,) group of each triangle, (G,) triangles in each group)
+    """
+    if len(tri_verts) == 0:
+        return np.zeros((0, 3), dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    fused_tris = np.ascontiguousarray(np.sort(fused[tri_verts], axis=1))
+    tri_keys = fused_tris.view(np.dtype((np.void, fused_tris.itemsize * 3))).reshape(-1)
+    tri_group, is_first = _renumber_by_first_occurrence(tri_keys)
+    # The first triangles of each group are in group order
+    group_fused_tris = fused_tris[is_first]
+    group_size = np.bincount(tri_group, minlength=len(group_fused_tris))
+    return group_fused_tris, tri_group, group_size
 
 
 def detect_fully_fused_triangles(
@@ -205,102 +351,72 @@ def detect_fully_fused_triangles(
     Fully fused dupe triangles cannot be represented in Blender, because it cannot represent
     two triangles between the same three vertices.
 
+    Triangles are grouped with array operations, and only the returned triangles are converted to tuples.
+
     :param idx_bufs: Index buffers in triangle format (not triangle strips) for the meshes.
     :param fused_idx_to_buf_idx: Mapping of (fused vertex index) to list(raw indices that were fused)
     :param buf_idx_to_fused_idx: Mapping of (raw vertex index) to (index in overall fused buffer). Should be inverse of fused_idx_to_buf_idx.
     :return: Mapping of (triangle with fused indices T) to (triangles of raw indices which result in T after fusion).
     """
 
-    # Maps each (remapped triangle indices) to a list of their (i_buf, (i_vtx0, i_vtx1, i_vtx2)) non-remapped triangles
-    fully_fused_tri_set: DefaultDict[Tri, List[NotRemappedTri]] = defaultdict(list)
-
-    def was_fused_to_anything(fused_idx: int) -> bool:
-        return len(fused_idx_to_buf_idx[fused_idx]) > 1
-
-    for i_buf, tri_idxs in enumerate(idx_bufs):
-        buf_idx_to_fused_idx_for_mesh = buf_idx_to_fused_idx[i_buf]
-        for i_tri_start in range(0, len(tri_idxs), 3):
-            non_remapped_tri: Tuple[int, int, int] = (
-                tri_idxs[i_tri_start + 0],
-                tri_idxs[i_tri_start + 1],
-                tri_idxs[i_tri_start + 2],
-            )
-            remapped_tri = (
-                buf_idx_to_fused_idx_for_mesh[non_remapped_tri[0]],
-                buf_idx_to_fused_idx_for_mesh[non_remapped_tri[1]],
-                buf_idx_to_fused_idx_for_mesh[non_remapped_tri[2]],
-            )
-            remapped_tri = tuple(sorted(remapped_tri))
-            fully_fused_tri_set[remapped_tri].append((i_buf, non_remapped_tri))
-
-    return {remapped_tri: tri_set for (remapped_tri, tri_set) in fully_fused_tri_set.items() if
-            len(tri_set) > 1 or (was_fused_to_anything(remapped_tri[0]) and
-                                 was_fused_to_anything(remapped_tri[1]) and
-                                 was_fused_to_anything(remapped_tri[2]))}
+    buf_lens = [len(buf) for buf in buf_idx_to_fused_idx]
+    fused = np.array([i for buf in buf_idx_to_fused_idx for i in buf], dtype=np.int64)
+    tri_verts, tri_buf = _flatten_triangles(idx_bufs, buf_lens)
+    group_fused_tris, tri_group, group_size = _group_fused_triangles(tri_verts, fused)
 
+    was_fused_to_anything = np.array([len(buf_idxs) > 1 for buf_idxs in fused_idx_to_buf_idx], dtype=bool)
+    keep_group = (group_size > 1) | was_fused_to_anything[group_fused_tris].all(axis=1)
 
-def decide_on_unfusions(
-        idx_bufs: List[array.ArrayType],
-        fused_idx_to_buf_idx: List[List[NotRemappedVertIdx]],
-        fully_fused_tri_set: Dict[Tri, List[NotRemappedTri]]
-) -> Dict[NotRemappedVertIdx, Set[NotRemappedVertIdx]]:
-    """
-    Given a set of fused vertices, the meshes they came from, and which triangles are "fully fused" with other triangles
-    i.e. impossible to represent in Blender, decide which vertices to *un*-fuse to resolve the issue.
+    # Convert the kept triangles, sorted by group then by triangle order
+    kept_tris = np.nonzero(keep_group[tri_group])[0]
+    kept_tris = kept_tris[np.argsort(tri_group[kept_tris], kind="stable")]
+    local_tris = (tri_verts[kept_tris] - _buf_offsets(buf_lens)[tri_buf[kept_tris]][:, np.newaxis]).tolist()
 
-    :param idx_bufs: Index buffers in triangle format (not triangle strips) for the meshes.
-    :param fused_idx_to_buf_idx: Mapping of (fused vertex index) to list(raw indices that were fused)
-    :param buf_idx_to_fused_idx: Mapping of (raw vertex index) to (index in overall fused buffer). Should be inverse of fused_idx_to_buf_idx.
-    :param fully_fused_tri_set: Mapping of (triangle with fused indices T) to (triangles of raw indices which result in T after fusion).
-    :return: A dictionary mapping x -> ys, representing "x should not be merged with vertices ys".
-    """
+    # Maps each (remapped triangle indices) to a list of their (i_buf, (i_vtx0, i_vtx1, i_vtx2)) non-remapped triangles
+    fully_fused_tri_set: Dict[Tri, List[NotRemappedTri]] = {}
+    for i_buf, group, non_remapped_tri in zip(tri_buf[kept_tris].tolist(), tri_group[kept_tris].tolist(), local_tris):
+        remapped_tri = tuple(group_fused_tris[group].tolist())
+        if remapped_tri not in fully_fused_tri_set:
+            fully_fused_tri_set[remapped_tri] = []
+        fully_fused_tri_set[remapped_tri].append((i_buf, tuple(non_remapped_tri)))
+    return fully_fused_tri_set
 
-    # Mapping of all fully-fused non-remapped dupe triangles to the triangle they were fused into
-    non_remapped_dupe_tris: Set[NotRemappedTri] = {
-        non_remapped_tri
-        for fused_tri, fused_non_remapped_tris in fully_fused_tri_set.items()
-        for non_remapped_tri in fused_non_remapped_tris
-        if len(fused_non_remapped_tris) > 1
-    }
-
-    # Set of all non-remapped vertices that are present in any entirely-fused triangle
-    # These vertices will all be fused with at least one other vertex
-    non_remapped_verts_in_dupe_tris = set(
-        (i_buf, i_vtx)
-        for i_buf, i_vtxs in non_remapped_dupe_tris
-        for i_vtx in i_vtxs
-    )
 
-    # Set of triangles that connect to vertices in our fully-fused-dupe-triangles
-    non_remapped_tris_connected_to_verts_in_dupe_tris = set(
-        (i_buf, tuple(tri_idxs[i_tri_start:i_tri_start + 3]))
-        for i_buf, tri_idxs in enumerate(idx_bufs)  # foreach mesh
-        for i_tri_start in range(0, len(tri_idxs), 3)  # foreach triangle in mesh
-        # if any vertex in this triangle is included in a dupe triangle, include the triangle in the set
-        if any(
-            (i_buf, i_vtx) in non_remapped_verts_in_dupe_tris
-            for i_vtx in tri_idxs[i_tri_start:i_tri_start + 3]
-        )
-    )
+def _interior_vertices(tri_verts: np.ndarray, is_dupe_tri: np.ndarray, n_verts: int) -> np.ndarray:
+    """
+    Find the "interior" vertices, which are only connected to fully-fused-dupe-triangles.
+    (see _decide_unfusion_corner_sets())
 
-    # safety - all non-remapped-dupe-triangles are connected to verts in dupe tris
-    assert non_remapped_tris_connected_to_verts_in_dupe_tris.issuperset(non_remapped_dupe_tris)
-
-    # Decide which vertices are "interior" vs. "exterior"
-    # interior vertices are only connected to other fully-fused-dupe-triangles
-    interior_non_remapped_verts = set()
-    # Foreach vertex in our fully-fused-dupe-triangles
-    for i_buf, i_vtx in non_remapped_verts_in_dupe_tris:
-        # Find the triangles that connect to it
-        connected_non_remapped_tris = set(
-            (i_buf, i_vtxs)
-            for (i_buf_tri, i_vtxs) in non_remapped_tris_connected_to_verts_in_dupe_tris
-            if i_buf_tri == i_buf and (i_vtx in i_vtxs)
-        )
-        # If all of those triangles are fully-fused-dupe-triangles...
-        if connected_non_remapped_tris.issubset(non_remapped_dupe_tris):
-            # ... this vertex is an interior vertex.
-            interior_non_remapped_verts.add((i_buf, i_vtx))
+    :param tri_verts: (T, 3) global vertex indices of every triangle
+    :param is_dupe_tri: (T,) whether each triangle is a fully-fused-dupe-triangle
+    :param n_verts: Total number of global vertices
+    :return: (n_verts,) whether each global vertex is interior
+    """
+    in_dupe_tri = np.zeros(n_verts, dtype=bool)
+    in_dupe_tri[tri_verts[is_dupe_tri].reshape(-1)] = True
+    in_other_tri = np.zeros(n_verts, dtype=bool)
+    in_other_tri[tri_verts[~is_dupe_tri].reshape(-1)] = True
+    return in_dupe_tri & ~in_other_tri
+
+
+def _decide_unfusion_corner_sets(
+        dupe_tri_verts: np.ndarray,
+        dupe_tri_group: np.ndarray,
+        group_fused_tris: np.ndarray,
+        fused: np.ndarray,
+        is_interior: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Array implementation of the decisions in decide_on_unfusions.
+
+    :param dupe_tri_verts: (D, 3) global vertex indices of each fully-fused-dupe-triangle
+    :param dupe_tri_group: (D,) index of the fused triangle each dupe triangle results in
+    :param group_fused_tris: (G, 3) each fused triangle
+    :param fused: Fused index of each global vertex
+    :param is_interior: Whether each global vertex is interior
+    :return: (global vertex index, corner set index) for each vertex in each corner set to unfuse.
+    Every vertex should be unfused from the other vertices in the same corner set.
+    """
 
     # The unfusion algorithm targets "layers" - where the same mesh and the same triangles are overlaid on each
     # other at least once.
@@ -378,66 +494,219 @@ def decide_on_unfusions(
     #     else:
     #         unfuse not-exterior corner sets
 
-    unfuse_verts_with: DefaultDict[NotRemappedVertIdx, Set[NotRemappedVertIdx]] = defaultdict(set)
-    for fused_tri, not_remapped_tris in fully_fused_tri_set.items():
-        # If this isn't a dupe, ignore it
-        if len(not_remapped_tris) < 2:
-            continue
-
-        # List of not-remapped vertices within this fused triangle
-        not_remapped_vtxs = [
-            (i_buf, i_vtx)
-            for i_buf, i_vtxs in not_remapped_tris
-            for i_vtx in i_vtxs
-        ]
-
-        # First, build the corner sets
-        # Three sets, each mapping to a corner of the fused triangle,
-        # containing the un-remapped vtxs from this triangle that were fused into that corner
-        corner_sets = (
-            [
-                # Each vertex that fuses into this corner
-                vtx for vtx in fused_idx_to_buf_idx[fused_tri[0]]
-                # If it is contained in one of our fully-fused-dupe-triangles.
-                if vtx in not_remapped_vtxs
-            ],
-            [vtx for vtx in fused_idx_to_buf_idx[fused_tri[1]] if vtx in not_remapped_vtxs],
-            [vtx for vtx in fused_idx_to_buf_idx[fused_tri[2]] if vtx in not_remapped_vtxs],
-        )
-        # Decide which corner sets are exterior
-        is_exterior = (
-            any((vtx not in interior_non_remapped_verts) for vtx in corner_sets[0]),
-            any((vtx not in interior_non_remapped_verts) for vtx in corner_sets[1]),
-            any((vtx not in interior_non_remapped_verts) for vtx in corner_sets[2]),
-        )
-        # Decide which corners to unfuse
-        corners_to_unfuse: Iterable[List[Tuple[int, int]]]
-        if all(is_exterior):
-            # Unfuse all corner sets
-            corners_to_unfuse = corner_sets
-        else:
-            # Unfuse only interior sets
-            corners_to_unfuse = (
-                corner_sets[i]
-                for i in range(3)
-                if not is_exterior[i]
-            )
-
-        # Set up unfusions:
-        # for each corner to unfuse i.e. {D, C'}, {E, E'}, {F, F'}
-        #     for each vtx  (D or C')
-        #         unfuse_verts_with[vtx] += (D, C')
-        #         (we remove the cases of "unfuse D from D" later)
-        for corner_set in corners_to_unfuse:
-            for vtx in corner_set:
-                unfuse_verts_with[vtx].update(corner_set)
-
-    for vtx in unfuse_verts_with.keys():
-        unfuse_verts_with[vtx].remove(vtx)
+    #
+    # Here, the corner sets are found for every fully-fused-dupe-triangle at once.
+    # A corner set is identified by (fused triangle, fused vertex), and contains the vertices of the fused triangle's
+    # dupe triangles that were fused into that vertex.
+
+    n_fused = int(fused.max()) + 1 if len(fused) else 0
+    n_verts = len(fused)
+
+    # Each (fused triangle, vertex) pair, once
+    membership_keys = _sorted_unique(np.repeat(dupe_tri_group, 3) * n_verts + dupe_tri_verts.reshape(-1))
+    member_group = membership_keys // n_verts
+    member_vtx = membership_keys % n_verts
+
+    corner_set_keys, member_corner_set = np.unique(member_group * n_fused + fused[member_vtx], return_inverse=True)
+    member_corner_set = member_corner_set.reshape(-1)
+    # If any element in the corner set is exterior, mark corner set as exterior
+    corner_set_exterior = np.bincount(member_corner_set, weights=~is_interior[member_vtx],
+                                      minlength=len(corner_set_keys)) > 0
+    # Look up the corner sets for each corner of each fused triangle
+    group_corner_sets = np.searchsorted(
+        corner_set_keys,
+        np.arange(len(group_fused_tris), dtype=np.int64)[:, np.newaxis] * n_fused + group_fused_tris
+    )
+    group_all_exterior = corner_set_exterior[group_corner_sets].all(axis=1)
+
+    # If all corner sets are exterior unfuse all corner sets, else only unfuse not-exterior corner sets
+    unfuse_corner_set = group_all_exterior[corner_set_keys // n_fused] | ~corner_set_exterior
+    unfuse_member = unfuse_corner_set[member_corner_set]
+    return member_vtx[unfuse_member], member_corner_set[unfuse_member]
+
+
+def _unfusion_pairs(member_vtx: np.ndarray, member_corner_set: np.ndarray, n_verts: int) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert corner sets to unfuse into pairs of global vertex indices (x, y), representing "x should not be merged
+    with y". Each vertex in a corner set is paired with every other vertex in the set, and each pair appears once.
+    """
+    if len(member_vtx) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    order = np.argsort(member_corner_set, kind="stable")
+    set_vtxs = member_vtx[order]
+    vtx_set = member_corner_set[order]
+    set_size = np.bincount(vtx_set)
+    set_start = np.cumsum(set_size) - set_size
+
+    # for each corner to unfuse i.e. {D, C'}, {E, E'}, {F, F'}
+    #     for each vtx  (D or C')
+    #         pair vtx with each vtx in the corner (D/D, D/C')
+    #         (we remove the cases of "unfuse D from D" later)
+    n_partners = set_size[vtx_set]
+    pair_x = np.repeat(set_vtxs, n_partners)
+    partner_offset = np.arange(len(pair_x)) - np.repeat(np.cumsum(n_partners) - n_partners, n_partners)
+    pair_y = set_vtxs[np.repeat(set_start[vtx_set], n_partners) + partner_offset]
+
+    pair_keys = _sorted_unique((pair_x * n_verts + pair_y)[pair_x != pair_y])
+    return pair_keys // n_verts, pair_keys % n_verts
+
+
+def decide_on_unfusions(
+        idx_bufs: List[array.ArrayType],
+        fused_idx_to_buf_idx: List[List[NotRemappedVertIdx]],
+        fully_fused_tri_set: Dict[Tri, List[NotRemappedTri]]
+) -> Dict[NotRemappedVertIdx, Set[NotRemappedVertIdx]]:
+    """
+    Given a set of fused vertices, the meshes they came from, and which triangles are "fully fused" with other triangles
+    i.e. impossible to represent in Blender, decide which vertices to *un*-fuse to resolve the issue.
+    See _decide_unfusion_corner_sets() for an explanation of the decisions.
+
+    :param idx_bufs: Index buffers in triangle format (not triangle strips) for the meshes.
+    :param fused_idx_to_buf_idx: Mapping of (fused vertex index) to list(raw indices that were fused)
+    :param fully_fused_tri_set: Mapping of (triangle with fused indices T) to (triangles of raw indices which result in T after fusion).
+    :return: A dictionary mapping x -> ys, representing "x should not be merged with vertices ys".
+    """
+
+    # Only dupes (fused triangles with more than one constituent triangle) need unfusing
+    dupe_fused_tris = [
+        (fused_tri, non_remapped_tris)
+        for fused_tri, non_remapped_tris in fully_fused_tri_set.items()
+        if len(non_remapped_tris) > 1
+    ]
+
+    # Reconstruct the buffer lengths and the fused index of each global vertex
+    fusion_buf, fusion_vtx, fusion_idx = _flatten_fusions(fused_idx_to_buf_idx)
+    buf_lens_np = np.zeros(max(len(idx_bufs), int(fusion_buf.max()) + 1 if len(fusion_buf) else 0), dtype=np.int64)
+    np.maximum.at(buf_lens_np, fusion_buf, fusion_vtx + 1)
+    for i_buf, idx_buf in enumerate(idx_bufs):
+        if len(idx_buf):
+            buf_lens_np[i_buf] = max(buf_lens_np[i_buf], int(np.max(np.asarray(idx_buf))) + 1)
+    buf_lens = buf_lens_np.tolist()
+    offsets = _buf_offsets(buf_lens)
+    fused = np.full(sum(buf_lens), -1, dtype=np.int64)
+    fused[offsets[fusion_buf] + fusion_vtx] = fusion_idx
+
+    dupe_tri_buf = np.array([i_buf for _, non_remapped_tris in dupe_fused_tris for i_buf, _ in non_remapped_tris],
+                            dtype=np.int64)
+    dupe_tri_verts = np.array([i_vtxs for _, non_remapped_tris in dupe_fused_tris for _, i_vtxs in non_remapped_tris],
+                              dtype=np.int64).reshape(-1, 3) + offsets[dupe_tri_buf][:, np.newaxis]
+    dupe_tri_group = np.repeat(np.arange(len(dupe_fused_tris), dtype=np.int64),
+                               [len(non_remapped_tris) for _, non_remapped_tris in dupe_fused_tris])
+    group_fused_tris = np.array([fused_tri for fused_tri, _ in dupe_fused_tris], dtype=np.int64).reshape(-1, 3)
+
+    # Find which triangles in the index buffers are dupes, by value
+    tri_verts, _ = _flatten_triangles(idx_bufs, buf_lens)
+    all_tri_verts = np.ascontiguousarray(np.concatenate([tri_verts, dupe_tri_verts]))
+    _, tri_ids = np.unique(all_tri_verts.view(np.dtype((np.void, all_tri_verts.itemsize * 3))).reshape(-1),
+                           return_inverse=True)
+    tri_ids = tri_ids.reshape(-1)
+    is_dupe_tri = np.isin(tri_ids[:len(tri_verts)], tri_ids[len(tri_verts):])
+
+    member_vtx, member_corner_set = _decide_unfusion_corner_sets(
+        dupe_tri_verts,
+        dupe_tri_group,
+        group_fused_tris,
+        fused,
+        _interior_vertices(tri_verts, is_dupe_tri, len(fused))
+    )
+    pair_x, pair_y = _unfusion_pairs(member_vtx, member_corner_set, len(fused))
 
+    buf_idx, vtx_idx = _global_to_buf_idx(buf_lens)
+
+    def to_buf_idxs(vtxs: np.ndarray) -> List[NotRemappedVertIdx]:
+        return list(zip(buf_idx[vtxs].tolist(), vtx_idx[vtxs].tolist()))
+
+    # Every vertex in an unfused corner set is included, even if the corner set has no other vertices.
+    unfuse_verts_with: DefaultDict[NotRemappedVertIdx, Set[NotRemappedVertIdx]] = defaultdict(set)
+    for vtx in to_buf_idxs(_sorted_unique(member_vtx)):
+        unfuse_verts_with[vtx] = set()
+    for x, y in zip(to_buf_idxs(pair_x), to_buf_idxs(pair_y)):
+        unfuse_verts_with[x].add(y)
     return unfuse_verts_with
 
 
+def _solve_unfusion_buckets(
+        old_fusion: np.ndarray,
+        member_order: np.ndarray,
+        pair_x: np.ndarray,
+        pair_y: np.ndarray
+) -> np.ndarray:
+    """
+    Array implementation of solve_unfusion.
+    Previous fusions which don't contain any unfused vertices are left untouched.
+    If every vertex in a previous fusion must be unfused from every other vertex in it (e.g. two overlaid layers),
+    the greedy bucketing puts each vertex in its own bucket, so that is done with array operations.
+    Other previous fusions containing unfused vertices are bucketed one vertex at a time.
+
+    :param old_fusion: Index of the previous fusion each global vertex was in
+    :param member_order: Global vertex indices, in the order the members of each previous fusion are processed
+    :param pair_x: Global vertex indices x of the unfusions U "x should not be merged with y". Pairs must be unique.
+    :param pair_y: Global vertex indices y of the unfusions U.
+    :return: A label for each global vertex, where vertices with the same label should be fused.
+    """
+
+    # Unfusions between vertices in different fusions don't change anything
+    same_fusion = (old_fusion[pair_x] == old_fusion[pair_y]) & (pair_x != pair_y)
+    pair_x = pair_x[same_fusion]
+    pair_y = pair_y[same_fusion]
+    if len(pair_x) == 0:
+        return old_fusion
+
+    n_verts = len(old_fusion)
+    n_fusions = int(old_fusion.max()) + 1
+    fusion_size = np.bincount(old_fusion, minlength=n_fusions)
+
+    # The index of each vertex in the processing order of its fusion
+    member_order = member_order[np.argsort(old_fusion[member_order], kind="stable")]
+    rank_in_fusion = np.empty(n_verts, dtype=np.int64)
+    rank_in_fusion[member_order] = np.arange(n_verts) - (np.cumsum(fusion_size) - fusion_size)[old_fusion[member_order]]
+
+    # Find the fusions where every vertex must be unfused from every other vertex in the fusion
+    n_unfuse_with = np.bincount(pair_x, minlength=n_verts)
+    unfuse_with_all = n_unfuse_with == fusion_size[old_fusion] - 1
+    fully_conflicting = np.bincount(old_fusion, weights=unfuse_with_all, minlength=n_fusions) == fusion_size
+    has_conflicts = np.zeros(n_fusions, dtype=bool)
+    has_conflicts[old_fusion[pair_x]] = True
+
+    bucket = np.where(fully_conflicting[old_fusion] & has_conflicts[old_fusion], rank_in_fusion, 0)
+
+    # Greedy bucketing (see solve_unfusion()) for the other fusions containing unfused vertices
+    partially_conflicting = has_conflicts & ~fully_conflicting
+    if partially_conflicting.any():
+        relevant_pairs = partially_conflicting[old_fusion[pair_x]]
+        unfuse_verts_with: DefaultDict[int, Set[int]] = defaultdict(set)
+        for x, y in zip(pair_x[relevant_pairs].tolist(), pair_y[relevant_pairs].tolist()):
+            unfuse_verts_with[x].add(y)
+
+        to_bucket = member_order[partially_conflicting[old_fusion[member_order]]]
+        buckets: DefaultDict[int, List[Set[int]]] = defaultdict(list)
+        for vert, fusion in zip(to_bucket.tolist(), old_fusion[to_bucket].tolist()):
+            relevant_U = unfuse_verts_with[vert]
+            fusion_buckets = buckets[fusion]
+            for i_bucket, b in enumerate(fusion_buckets):
+                # If we aren't allowed to be with any vertex already in this bucket, skip this bucket
+                if not relevant_U.isdisjoint(b):
+                    continue
+                # else, take this bucket! (and only take this bucket, don't take any other buckets)
+                b.add(vert)
+                bucket[vert] = i_bucket
+                break
+            else:
+                # If we couldn't find a bucket, create a new one
+                bucket[vert] = len(fusion_buckets)
+                fusion_buckets.append({vert})
+
+        # consistency check
+        for fusion_buckets in buckets.values():
+            for b in fusion_buckets:
+                for v in b:
+                    assert unfuse_verts_with[v].isdisjoint(b)
+
+    return old_fusion * (int(bucket.max()) + 1) + bucket
+
+
 def solve_unfusion(
         vert_bufs: Sequence[GMDVertexBuffer],
         old_fused_idx_to_buf_idx: List[List[NotRemappedVertIdx]],
@@ -447,114 +716,65 @@ def solve_unfusion(
     Given a set of previous vertex fusions F and a set of vertex *un*fusions U,
     return a new set of fusions F' taking all fusions in F except for those prevented by U
 
+    Each vertex should be in a fusion group with
+    (1) the vertices F said they should be fused with
+    (2) except the vertices U says it *shouldn't* be fused with
+    (3) except some other vertices in group F that U says shouldn't be fused together
+
+    Evaluating just (1) and (2) is guaranteed to be "consistent"
+    i.e. for all v' in fusion_group_for[v], fusion_group_for[v'] contains v,
+    IF AND ONLY IF unfuse_verts_with is consistent, i.e. for all v' in unfuse_verts_with[v], unfuse_verts_with[v'] contains v.
+    BUT it isn't guaranteed to be *correct* i.e. no fusions prevented by U are present
+    Consider: AB
+              |
+             A'B'
+    fused_verts = [A, B, A', B']
+    unfuse_verts_with = [A/A', A'/A, B/B', B'/B]
+    fusion_group_for = [
+        A -> (A, B, B'),
+        A' -> (A', B, B'),
+        B -> (A, A', B),
+        B' -> (A, A', B'),
+    ]
+
+    Instead, this uses greedy bucketing.
+    Maintain a list of buckets for each group of previously-fused verts
+    Foreach previously-fused vert, add to the first bucket without any conflicts
+       if all the buckets have conflicts i.e. they have vertices that we can't be fused with...
+           create a new bucket!
+    This is guaranteed to be correct, i.e. no fusions prevented by U are present,
+    but I don't think it's guaranteed to be *minimal*
+
     :param vert_bufs: Vertex buffers, used to iterate over buffer/vertex indices. Not modified or read directly.
     :param old_fused_idx_to_buf_idx: Fused index -> original index mapping representing the previous fusions F.
     :param unfuse_verts_with: The set of vertex unfusions U
     :return: (fused_idx_to_buf_idx, buf_idx_to_fused_idx, is_fused) representing F' = F - U.
     """
 
-    # Create a set of "vertices this is fused with" for each vertex
-    # fusion_group_for[v] always contains v - it may just be [v] if no fusion is performed.
-    fusion_group_for: Dict[NotRemappedVertIdx, Tuple[NotRemappedVertIdx, ...]] = {}
-    for fused_verts in old_fused_idx_to_buf_idx:
-        # Each not-remapped vert appears exactly once in fused_idx_to_buf_idx
-        # Each bucket will contain at least one vertex
-        # Overall, all vertices in fused_verts will appear in buckets exactly once
-        buckets: List[List[NotRemappedVertIdx]] = []
-        for vert in fused_verts:
-            # Each vertex should be in a fusion group with
-            # (1) the vertices F said they should be fused with
-            # (2) except the vertices U says it *shouldn't* be fused with
-            # (3) except some other vertices in group F that U says shouldn't be fused together
-
-            # Before, we just evaluated (1) and (2) with
-            # fusion_group_for[vert] = tuple(
-            #     v for v in fused_verts  # (1)
-            #     if v not in unfuse_verts_with[vert]  # (2)
-            # )
-
-            # This is guaranteed to be "consistent" i.e. for all v' in fusion_group_for[v], fusion_group_for[v'] contains v
-            # IF AND ONLY IF unfuse_verts_with is consistent, i.e. for all v' in unfuse_verts_with[v], unfuse_verts_with[v'] contains v
-            # BUT it isn't guaranteed to be *correct* i.e. no fusions prevented by U are present
-            # Consider: AB
-            #           |
-            #          A'B'
-            # fused_verts = [A, B, A', B']
-            # unfuse_verts_with = [A/A', A'/A, B/B', B'/B]
-            # fusion_group_for = [
-            #     A -> (A, B, B'),
-            #     A' -> (A', B, B'),
-            #     B -> (A, A', B),
-            #     B' -> (A, A', B'),
-            # ]
-
-            # New version: greedy bucketing
-            # Maintain a list of buckets for each group of previously-fused verts
-            # Foreach previously-fused vert, add to the first bucket without any conflicts
-            #    if all the buckets have conflicts i.e. they have vertices that we can't be fused with...
-            #        create a new bucket!
-            # Then once we have the buckets construct fusion_group_for[v] based on the buckets
-            # This is guarantees to be correct, i.e. no fusions prevents by U are present,
-            # but I don't think it's guaranteed to be *minimal*
-
-            relevant_U = unfuse_verts_with[vert]
-            placed_in_bucket = False
-            for b in buckets:
-                # If we aren't allowed to be with any vertex already in this bucket...
-                if any(b_v in relevant_U for b_v in b):
-                    # ...skip this bucket
-                    continue
-                # else, take this bucket!
-                b.append(vert)
-                placed_in_bucket = True
-                # (and only take this bucket, don't take any other buckets)
-                break
-            # If we couldn't find a bucket, create a new one
-            if not placed_in_bucket:
-                buckets.append([vert])
-        # Create the fusion_group_for entries for each vertex now the fusion groups are complete
-        for b in buckets:
-            b_t = tuple(b)
-            for v in b_t:
-                # consistency check
-                assert not any(b_v in unfuse_verts_with[v] for b_v in b_t)
-                fusion_group_for[v] = b_t
-
-    # TODO - consistency check?
-
-    # We can now turn "vertices this is fused with" into a full definition of the fusions
-
-    # Map a fusion group to the fused vertex index it has
-    encountered_fusion_groups: Dict[Tuple[NotRemappedVertIdx, ...], int] = {}
-    fused_idx_to_buf_idx: List[List[NotRemappedVertIdx]] = []
-    buf_idx_to_fused_idx: List[List[VertIdx]] = [
-        [-1] * len(buf)
-        for buf in vert_bufs
-    ]
-    is_fused: List[List[bool]] = [
-        [False] * len(buf)
-        for buf in vert_bufs
-    ]
-
-    for i_buf, buf in enumerate(vert_bufs):
-        for i_vtx in range(len(buf)):
-            vert = (i_buf, i_vtx)
-            fusion_group = fusion_group_for[vert]
-
-            # If we should be fused to a previous vertex,
-            if fusion_group in encountered_fusion_groups:
-                # This has been fused into a previous vertex (fused_idx_to_buf_idx has already been set to the full group)
-                fusion_idx = encountered_fusion_groups[fusion_group]
-                buf_idx_to_fused_idx[i_buf][i_vtx] = fusion_idx
-                is_fused[i_buf][i_vtx] = True
-            else:
-                fusion_idx = len(fused_idx_to_buf_idx)
-                encountered_fusion_groups[fusion_group] = fusion_idx
-                fused_idx_to_buf_idx.append(sorted(fusion_group))
-                buf_idx_to_fused_idx[i_buf][i_vtx] = fusion_idx
-                is_fused[i_buf][i_vtx] = False
-
-    return fused_idx_to_buf_idx, buf_idx_to_fused_idx, is_fused
+    buf_lens = [len(buf) for buf in vert_bufs]
+    offsets = _buf_offsets(buf_lens)
+    n_verts = sum(buf_lens)
+
+    # Each not-remapped vert appears exactly once in old_fused_idx_to_buf_idx
+    fusion_buf, fusion_vtx, fusion_idx = _flatten_fusions(old_fused_idx_to_buf_idx)
+    member_order = offsets[fusion_buf] + fusion_vtx
+    old_fusion = np.full(n_verts, -1, dtype=np.int64)
+    old_fusion[member_order] = fusion_idx
+    # Vertices which weren't in any previous fusion are left on their own
+    unfused = old_fusion < 0
+    old_fusion[unfused] = len(old_fused_idx_to_buf_idx) + np.arange(np.count_nonzero(unfused))
+    member_order = np.concatenate([member_order, np.nonzero(unfused)[0]])
+
+    pairs = np.array([
+        (i_buf, i_vtx, j_buf, j_vtx)
+        for (i_buf, i_vtx), unfuse_with in unfuse_verts_with.items()
+        for j_buf, j_vtx in unfuse_with
+    ], dtype=np.int64).reshape(-1, 4)
+    pair_x = offsets[pairs[:, 0]] + pairs[:, 1]
+    pair_y = offsets[pairs[:, 2]] + pairs[:, 3]
+    labels = _solve_unfusion_buckets(old_fusion, member_order, pair_x, pair_y)
+    fused, is_first = _renumber_by_first_occurrence(labels)
+    return _fusion_outputs(fused, is_first, buf_lens)
 
 
 def vertex_fusion(
@@ -571,32 +791,43 @@ def vertex_fusion(
     - bone mapping
     - weight mapping
 
+    All stages run on flat arrays of global vertex indices. The result is the same as running
+    fuse_adjacent_vertices(), detect_fully_fused_triangles(), decide_on_unfusions() and solve_unfusion() in sequence.
+
     :param idx_bufs: Index buffers in triangle format (not triangle strips) for the meshes.
     :param vertices: Vertex buffers mapping to the index buffers.
     :return: Tuple of (mapping of [i_buf][i_vtx] to fused vertex index, mapping of [i_buf][i_vtx] to whether it was fused with a previous vertex).
     """
 
-    # First pass of simple fusion
-    fused_idx_to_buf_idx, buf_idx_to_fused_idx, is_fused = fuse_adjacent_vertices(vertices)
-
-    # Detect fully fused triangles, and therefore fully fused duplicate triangles
-    fully_fused_tri_set = detect_fully_fused_triangles(idx_bufs, fused_idx_to_buf_idx, buf_idx_to_fused_idx)
-    # There may be triangles where each vertex was fused, but that didn't result in a duplicate or loss of data.
-    # => check if any of the sets of (triangles that were fully-fused into one fused triangle) have >2 elements.
-    has_fully_fused_dupe_tris = any(len(fused_tris) > 1 for fused_tris in fully_fused_tri_set.values())
+    buf_lens = [len(buf) for buf in vertices]
 
-    if has_fully_fused_dupe_tris:
+    # First pass of simple fusion
+    fused, is_first = _fuse_adjacent_vertex_indices(vertices)
+
+    # Detect fully fused duplicate triangles.
+    # There may be triangles where each vertex was fused, but that didn't result in a duplicate or loss of data,
+    # so only groups of >1 triangles are relevant.
+    tri_verts, _ = _flatten_triangles(idx_bufs, buf_lens)
+    group_fused_tris, tri_group, group_size = _group_fused_triangles(tri_verts, fused)
+    is_dupe_group = group_size > 1
+
+    if is_dupe_group.any():
+        is_dupe_tri = is_dupe_group[tri_group]
+        dupe_group_idx = np.cumsum(is_dupe_group) - 1
         # Decide which vertices to unfuse to resolve the fully-fused-dupe-tris
-        unfuse_verts_with = decide_on_unfusions(
-            idx_bufs,
-            fused_idx_to_buf_idx,
-            fully_fused_tri_set
+        member_vtx, member_corner_set = _decide_unfusion_corner_sets(
+            tri_verts[is_dupe_tri],
+            dupe_group_idx[tri_group[is_dupe_tri]],
+            group_fused_tris[is_dupe_group],
+            fused,
+            _interior_vertices(tri_verts, is_dupe_tri, len(fused))
         )
         # Actually perform the unfusion
-        fused_idx_to_buf_idx, buf_idx_to_fused_idx, is_fused = solve_unfusion(
-            vertices,
-            fused_idx_to_buf_idx,
-            unfuse_verts_with
+        labels = _solve_unfusion_buckets(
+            fused,
+            np.argsort(fused, kind="stable"),
+            *_unfusion_pairs(member_vtx, member_corner_set, len(fused))
         )
+        fused, is_first = _renumber_by_first_occurrence(labels)
 
-    return fused_idx_to_buf_idx, buf_idx_to_fused_idx, is_fused
+    return _fusion_outputs(fused, is_first, buf_lens)
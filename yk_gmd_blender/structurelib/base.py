@@ -1,3 +1,4 @@
+import mmap
 import struct
 from dataclasses import dataclass
 from typing import Union, Tuple, Type, Optional, TypeVar, Generic, List, get_type_hints, Dict, Callable
@@ -9,11 +10,15 @@ __all__ = [
     "FixedSizeASCIIUnpacker",
     "ValueAdaptor",
     "structure_data",
+    "UnpackBuffer",
 ]
 
 T = TypeVar('T')
 TPackable = TypeVar('TPackable', bound='BaseUnpackable')
 
+# Anything that can be unpacked from, e.g. the contents of a file or a memory-mapped file
+UnpackBuffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+
 
 class PackingValidationError(Exception):
     pass
@@ -22,13 +27,16 @@ class PackingValidationError(Exception):
 class BaseUnpacker(Generic[T]):
     """ Base class for every type of field that can be packed. """
     python_type: Type[T]
+    # If True, from_flat()/to_flat() return/take the raw struct value unchanged.
+    # StructureUnpacker uses this to skip a method call per field.
+    flat_passthrough: bool = False
 
     def __init__(self, python_type: Type[T]):
         if not isinstance(python_type, type):
             raise TypeError(f"python_type of Unpacker must be a type object, got {python_type}")
         self.python_type = python_type
 
-    def unpack(self, big_endian: bool, data: Union[bytes, bytearray], offset: int) -> Tuple[T, int]:
+    def unpack(self, big_endian: bool, data: UnpackBuffer, offset: int) -> Tuple[T, int]:
         raise NotImplementedError()
 
     def pack(self, big_endian: bool, value: T, append_to: bytearray):
@@ -40,6 +48,20 @@ class BaseUnpacker(Generic[T]):
     def sizeof(self):
         raise NotImplementedError()
 
+    # Flat representation - used by StructureUnpacker to compile a whole structure into a single struct.Struct.
+    # If flat_struct_fmt() returns a format string (without a byte-order prefix), unpacking that format produces a
+    # flat tuple of primitive values, which from_flat() turns back into the python value.
+    # to_flat() does the reverse for packing. Neither function validates - callers should validate_value() first.
+
+    def flat_struct_fmt(self) -> Optional[str]:
+        return None
+
+    def from_flat(self, values: Tuple, idx: int) -> Tuple[T, int]:
+        raise NotImplementedError()
+
+    def to_flat(self, value: T, append_to: List):
+        raise NotImplementedError()
+
     def array_of(self: T, count) -> 'FixedSizeArrayUnpacker[T]':
         return FixedSizeArrayUnpacker(self, count)
 
@@ -60,7 +82,7 @@ class ValueAdaptor(Generic[TFrom, TTo], BaseUnpacker[TTo]):
         self.forwards = forwards
         self.backwards = backwards
 
-    def unpack(self, big_endian: bool, data: Union[bytes, bytearray], offset: int) -> Tuple[TTo, int]:
+    def unpack(self, big_endian: bool, data: UnpackBuffer, offset: int) -> Tuple[TTo, int]:
         from_val, offset = self.base_unpacker.unpack(big_endian, data, offset)
         return self.forwards(from_val), offset
 
@@ -80,11 +102,22 @@ class ValueAdaptor(Generic[TFrom, TTo], BaseUnpacker[TTo]):
     def sizeof(self):
         return self.base_unpacker.sizeof()
 
+    def flat_struct_fmt(self) -> Optional[str]:
+        return self.base_unpacker.flat_struct_fmt()
+
+    def from_flat(self, values: Tuple, idx: int) -> Tuple[TTo, int]:
+        from_val, idx = self.base_unpacker.from_flat(values, idx)
+        return self.forwards(from_val), idx
+
+    def to_flat(self, value: TTo, append_to: List):
+        self.base_unpacker.to_flat(self.backwards(value), append_to)
+
 
 class BasePrimitive(BaseUnpacker[T]):
     struct_fmt: str
     be_struct_fmt: str
     le_struct_fmt: str
+    flat_passthrough = True
 
     def __init__(self, python_type: Type[T], struct_fmt: str):
         super().__init__(python_type)
@@ -97,7 +130,7 @@ class BasePrimitive(BaseUnpacker[T]):
     # pack() -> take a value, pack into bytes
     #    a value may not always be packable (e.g. a string that's too long) so always validate_value() before packing.
 
-    def unpack(self, big_endian: bool, data: Union[bytes, bytearray], offset: int) -> Tuple[T, int]:
+    def unpack(self, big_endian: bool, data: UnpackBuffer, offset: int) -> Tuple[T, int]:
         return struct.unpack_from(self.be_struct_fmt if big_endian else self.le_struct_fmt, data, offset)[
                    0], offset + self.sizeof()
 
@@ -113,6 +146,15 @@ class BasePrimitive(BaseUnpacker[T]):
         # Assumed that be_struct_format is hte same size as le_struct_fmt
         return struct.calcsize(self.be_struct_fmt)
 
+    def flat_struct_fmt(self) -> Optional[str]:
+        return self.struct_fmt
+
+    def from_flat(self, values: Tuple, idx: int) -> Tuple[T, int]:
+        return values[idx], idx + 1
+
+    def to_flat(self, value: T, append_to: List):
+        append_to.append(value)
+
 
 class BoundedPrimitiveUnpacker(BasePrimitive[T]):
     range: Tuple[T, T]
@@ -136,8 +178,8 @@ class FixedSizeASCIIUnpacker(BaseUnpacker[str]):
         self.length = length
         self.encoding = encoding
 
-    def unpack(self, big_endian: bool, data: Union[bytes, bytearray], offset: int) -> Tuple[T, int]:
-        str_data: bytes = data[offset:offset + self.length]
+    def unpack(self, big_endian: bool, data: UnpackBuffer, offset: int) -> Tuple[T, int]:
+        str_data: bytes = bytes(data[offset:offset + self.length])
         return str_data.decode(self.encoding).rstrip('\x00'), offset + self.length
 
     def pack(self, big_endian: bool, value: T, append_to: bytearray):
@@ -155,6 +197,16 @@ class FixedSizeASCIIUnpacker(BaseUnpacker[str]):
     def sizeof(self):
         return self.length
 
+    def flat_struct_fmt(self) -> Optional[str]:
+        # "s" null-pads on pack, same as pack()
+        return f"{self.length}s"
+
+    def from_flat(self, values: Tuple, idx: int) -> Tuple[str, int]:
+        return values[idx].decode(self.encoding).rstrip('\x00'), idx + 1
+
+    def to_flat(self, value: str, append_to: List):
+        append_to.append(value.encode(self.encoding))
+
 
 class FixedSizeArrayUnpacker(Generic[T], BaseUnpacker[List[T]]):
     elem_type: BaseUnpacker[T]
@@ -165,13 +217,39 @@ class FixedSizeArrayUnpacker(Generic[T], BaseUnpacker[List[T]]):
         self.elem_type = elem_type
         self.count = count
 
-    def unpack(self, big_endian: bool, data: Union[bytes, bytearray], offset: int) -> Tuple[List[T], int]:
-        value = []
+    def unpack(self, big_endian: bool, data: UnpackBuffer, offset: int) -> Tuple[List[T], int]:
+        elem_fmt = self.elem_type.flat_struct_fmt()
+        if elem_fmt:
+            return self._unpack_bulk(big_endian, elem_fmt, data, offset)
+
+        value: List[T] = []
         while len(value) < self.count:
             next_val, offset = self.elem_type.unpack(big_endian, data, offset)
             value.append(next_val)
         return value, offset
 
+    def _unpack_bulk(self, big_endian: bool, elem_fmt: str, data: UnpackBuffer, offset: int) \
+            -> Tuple[List[T], int]:
+        # Decode the whole array in one pass instead of calling elem_type.unpack() for every element.
+        byte_order = ">" if big_endian else "<"
+        if self.elem_type.flat_passthrough:
+            # Primitives: a single unpack of "{count}{fmt}" returns the final values
+            compiled = struct.Struct(f"{byte_order}{self.count}{elem_fmt}")
+            return list(compiled.unpack_from(data, offset)), offset + compiled.size
+
+        # Records: iter_unpack yields the flat tuple for each element, which from_flat() turns into the element value
+        compiled = struct.Struct(f"{byte_order}{elem_fmt}")
+        end = offset + compiled.size * self.count
+        if len(data) < end:
+            raise struct.error(f"unpacking {self.count} elements requires a buffer of at least {end} bytes, "
+                               f"got {len(data)}")
+        from_flat = self.elem_type.from_flat
+        value = [
+            from_flat(flat_values, 0)[0]
+            for flat_values in compiled.iter_unpack(memoryview(data)[offset:end])
+        ]
+        return value, end
+
     def pack(self, big_endian: bool, value: List[TPackable], append_to: bytearray):
         self.validate_value(value)
         for item in value:
@@ -192,6 +270,28 @@ class FixedSizeArrayUnpacker(Generic[T], BaseUnpacker[List[T]]):
                 raise PackingValidationError(f"Element {i}: {e}")
         return True
 
+    def flat_struct_fmt(self) -> Optional[str]:
+        elem_fmt = self.elem_type.flat_struct_fmt()
+        if elem_fmt is None:
+            return None
+        return elem_fmt * self.count
+
+    def from_flat(self, values: Tuple, idx: int) -> Tuple[List[T], int]:
+        if self.elem_type.flat_passthrough:
+            return list(values[idx:idx + self.count]), idx + self.count
+        value: List[T] = []
+        while len(value) < self.count:
+            next_val, idx = self.elem_type.from_flat(values, idx)
+            value.append(next_val)
+        return value, idx
+
+    def to_flat(self, value: List[T], append_to: List):
+        if self.elem_type.flat_passthrough:
+            append_to.extend(value)
+        else:
+            for item in value:
+                self.elem_type.to_flat(item, append_to)
+
 
 TDataclass = TypeVar("TDataclass")
 
@@ -207,6 +307,11 @@ class StructureUnpacker(BaseUnpacker[TDataclass]):
     _fields: List[Tuple[str, BaseUnpacker]]
     _exported_fields: Dict[str, BaseUnpacker]
     _load_validate: Optional[Callable[[TDataclass], None]]
+    # If every field has a flat representation, the whole structure is (un)packed with one struct call
+    # and nested structures/adaptors are applied to the flat tuple afterwards.
+    _flat_fmt: Optional[str]
+    _be_struct: Optional[struct.Struct]
+    _le_struct: Optional[struct.Struct]
 
     def __init__(self, python_type: Type[TDataclass], fields: List[Tuple[str, BaseUnpacker]],
                  base_class_unpackers: Dict[Type, 'StructureUnpacker'] = None,
@@ -270,7 +375,40 @@ class StructureUnpacker(BaseUnpacker[TDataclass]):
         self._exported_fields = _exported_fields
         self._load_validate = load_validate
 
-    def unpack(self, big_endian: bool, data: Union[bytes, bytearray], offset: int) -> Tuple[TDataclass, int]:
+        field_fmts = [field_unpacker.flat_struct_fmt() for _, field_unpacker in fields]
+        flat_field_fmts = [fmt for fmt in field_fmts if fmt is not None]
+        if len(flat_field_fmts) == len(field_fmts):
+            self._flat_fmt = "".join(flat_field_fmts)
+            self._be_struct = struct.Struct(f">{self._flat_fmt}")
+            self._le_struct = struct.Struct(f"<{self._flat_fmt}")
+        else:
+            self._flat_fmt = None
+            self._be_struct = None
+            self._le_struct = None
+
+    def unpack(self, big_endian: bool, data: UnpackBuffer, offset: int) -> Tuple[TDataclass, int]:
+        compiled = self._be_struct if big_endian else self._le_struct
+        if compiled is None:
+            return self.unpack_per_field(big_endian, data, offset)
+        value, _ = self.from_flat(compiled.unpack_from(data, offset), 0)
+        return value, offset + compiled.size
+
+    def pack(self, big_endian: bool, value: TDataclass, append_to: bytearray):
+        compiled = self._be_struct if big_endian else self._le_struct
+        if compiled is None:
+            self.pack_per_field(big_endian, value, append_to)
+            return
+        self.validate_value(value)
+        flat_values: List = []
+        self.to_flat(value, flat_values)
+        append_to += compiled.pack(*flat_values)
+
+    def unpack_per_field(self, big_endian: bool, data: UnpackBuffer, offset: int) -> Tuple[
+        TDataclass, int]:
+        """
+        Unpack each field with its own unpacker, without using the compiled struct.
+        Used as a fallback for structures that can't be flattened, and as a reference for the compiled path.
+        """
         items_dict = {}
         for field_name, field_unpacker in self._fields:
             value, offset = field_unpacker.unpack(big_endian, data, offset)
@@ -282,7 +420,11 @@ class StructureUnpacker(BaseUnpacker[TDataclass]):
             self._load_validate(value)
         return value, offset
 
-    def pack(self, big_endian: bool, value: TDataclass, append_to: bytearray):
+    def pack_per_field(self, big_endian: bool, value: TDataclass, append_to: bytearray):
+        """
+        Pack each field with its own unpacker, without using the compiled struct.
+        Used as a fallback for structures that can't be flattened, and as a reference for the compiled path.
+        """
         self.validate_value(value)
         for field_name, field_unpacker in self._fields:
             field_unpacker.pack(big_endian, getattr(value, field_name), append_to)
@@ -300,3 +442,29 @@ class StructureUnpacker(BaseUnpacker[TDataclass]):
 
     def sizeof(self):
         return sum(unpacker.sizeof() for _, unpacker in self._fields)
+
+    def flat_struct_fmt(self) -> Optional[str]:
+        return self._flat_fmt
+
+    def from_flat(self, values: Tuple, idx: int) -> Tuple[TDataclass, int]:
+        items_dict = {}
+        for field_name, field_unpacker in self._fields:
+            if field_unpacker.flat_passthrough:
+                value = values[idx]
+                idx += 1
+            else:
+                value, idx = field_unpacker.from_flat(values, idx)
+            if field_name in self._exported_fields:
+                items_dict[field_name] = value
+
+        value = self.python_type(**items_dict)
+        if self._load_validate:
+            self._load_validate(value)
+        return value, idx
+
+    def to_flat(self, value: TDataclass, append_to: List):
+        for field_name, field_unpacker in self._fields:
+            if field_unpacker.flat_passthrough:
+                append_to.append(getattr(value, field_name))
+            else:
+                field_unpacker.to_flat(getattr(value, field_name), append_to)
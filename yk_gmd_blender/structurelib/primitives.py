@@ -15,7 +15,7 @@ __all__ = [
 
 from typing import *
 
-from yk_gmd_blender.structurelib.base import BoundedPrimitiveUnpacker, BasePrimitive
+from yk_gmd_blender.structurelib.base import BoundedPrimitiveUnpacker, BasePrimitive, UnpackBuffer
 
 c_uint8 = BoundedPrimitiveUnpacker(struct_fmt="B", python_type=int, range=(0, 255))
 c_uint16 = BoundedPrimitiveUnpacker(struct_fmt="H", python_type=int, range=(0, 65_535))
@@ -34,30 +34,39 @@ c_float32 = BasePrimitive(struct_fmt="f", python_type=float)
 
 class U8ConverterPrimitive(BoundedPrimitiveUnpacker[float]):
     to_range: Tuple[float, float]
+    flat_passthrough = False
 
     def __init__(self, to_range: Tuple[float, float]):
         super().__init__(python_type=float, struct_fmt=c_uint8.struct_fmt, range=to_range)
         self.start = to_range[0]
         self.width = to_range[1] - to_range[0]
 
-    def unpack(self, big_endian: bool, data: Union[bytes, bytearray], offset: int) -> Tuple[float, int]:
-        value, offset = c_uint8.unpack(big_endian, data, offset)
-
+    def _u8_to_float(self, value: int) -> float:
         float_0_1 = value / 255.0
-        target_range_float = (float_0_1 * self.width) + self.start
+        return (float_0_1 * self.width) + self.start
+
+    def _float_to_u8(self, value: float) -> int:
+        independent_float = (value - self.start) / self.width
+        float_0_255 = independent_float * 255
+        return int(round(float_0_255))
 
-        return target_range_float, offset
+    def unpack(self, big_endian: bool, data: UnpackBuffer, offset: int) -> Tuple[float, int]:
+        value, offset = c_uint8.unpack(big_endian, data, offset)
+        return self._u8_to_float(value), offset
 
     def pack(self, big_endian: bool, value: float, append_to: bytearray):
         self.validate_value(value)
-
-        independent_float = (value - self.start) / self.width
-        float_0_255 = independent_float * 255
-        c_uint8.pack(big_endian, int(round(float_0_255)), append_to)
+        c_uint8.pack(big_endian, self._float_to_u8(value), append_to)
 
     def sizeof(self):
         return c_uint8.sizeof()
 
+    def from_flat(self, values: Tuple, idx: int) -> Tuple[float, int]:
+        return self._u8_to_float(values[idx]), idx + 1
+
+    def to_flat(self, value: float, append_to: List):
+        append_to.append(self._float_to_u8(value))
+
 
 c_unorm8 = U8ConverterPrimitive(to_range=(0, 1))
 c_u8_Minus1_1 = U8ConverterPrimitive(to_range=(-1.0, 1.0))